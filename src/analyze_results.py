@@ -1,190 +1,470 @@
 """
 Script para analizar resultados y generar tablas y figuras para el articulo.
-Lee los JSON de resultados de pyperplan y Fast Downward, genera:
+Lee los almacenes JSONL de pyperplan y Fast Downward (o los JSON antiguos si
+aun no hay almacen), genera:
 - Tablas en formato markdown
-- Figuras con matplotlib (tiempo, nodos, longitud de plan)
+- Figuras con matplotlib (tiempo, nodos, longitud de plan, CPU, memoria,
+  curvas anytime y telemetria de la busqueda), una por metrica de FIGURES y dominio. Se dibujan en un
+  pool de procesos y una figura cuyo slice de datos no ha cambiado desde la
+  ultima vez no se redibuja (cache en figures/.render_cache.json).
+
+Con pyarrow instalado (extra `columnar`: uv sync --extra columnar), los
+almacenes se compactan antes a Parquet (ver results_store.compact) y solo se
+leen las metricas: los logs de cada ejecucion quedan en un fichero aparte y
+solo se consultan los incumbentes de las ejecuciones anytime. Las tablas salen de una sola pasada de pivot/groupby
+sobre todos los dominios.
+
+Con repeticiones (--repeat en los runners) cada celda de las tablas es la
+mediana de las muestras, se anaden tablas con n, IQR e IC95 bootstrap del
+tiempo y un test de Mann-Whitney del mejor planificador de cada problema
+contra el resto; las figuras dibujan la banda del IC95 alrededor de la mediana.
 """
 
+import argparse
+import hashlib
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import matplotlib.pyplot as plt
 import pandas as pd
 
+import results_store
+import stats
+import telemetry
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RESULTS_DIR = os.path.join(BASE_DIR, "results")
 FIGURES_DIR = os.path.join(BASE_DIR, "figures")
+STORES = ("pyperplan_results", "fast_downward_results")
+RENDER_CACHE = ".render_cache.json"  # figure name -> hash of its inputs, in FIGURES_DIR
+DPI = 300
+
+MARKERS = ["o", "s", "^", "D", "v", "p"]
+COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b"]
+# x axis label per domain ("Numero de ..."); other domains get a generic one
+DOMAIN_LABELS = {"blocksworld": "Bloques", "gripper": "Pelotas"}
+
+# Significance level for the planner comparison
+ALPHA = 0.05
+
+# Table suffix -> metric, aggregated with the median over repetitions
+METRICS = {
+    "time": "time",
+    "length": "plan_length",
+    "nodes": "nodes_expanded",
+    "cpu": "cpu_time",
+    "memory_mb": "peak_rss_kb",
+    "bytes_per_node": "bytes_per_node",
+}
+
+
+def _traced(df, has_telemetry):
+    """Runs whose telemetry is plotted: first repetition on the largest traced instance of each domain."""
+    candidates = df[has_telemetry & (df["rep"] == 0 if "rep" in df else True)]
+    if candidates.empty:
+        return has_telemetry & False
+    largest = candidates.sort_values(["complexity", "problem"]).groupby("domain")["problem"].last()
+    return has_telemetry & (df["rep"] == 0 if "rep" in df else True) & (df["problem"] == df["domain"].map(largest))
+
+
+def _load_store(store, domains=None, planners=None):
+    """Metricas de un almacen: columnar si hay pyarrow, si no el JSONL completo."""
+    if results_store.columnar_available() and os.path.exists(store):
+        results_store.compact(store)
+        df = results_store.read_metrics(store, domains=domains, planners=planners)
+        if df.empty:
+            return df
+        # From the logs file only the incumbents of anytime runs and the telemetry that gets plotted
+        anytime = df["n_incumbents"] > 1 if "n_incumbents" in df else pd.Series(False, df.index)
+        traced = _traced(df, df["telemetry_points"] > 0) if "telemetry_points" in df else anytime & False
+        logs = results_store.read_logs(store, df.loc[anytime | traced, "run_id"], fields=("incumbents", "telemetry"))
+        for field, mask in (("incumbents", anytime), ("telemetry", traced)):
+            df[field] = [logs.get(rid, {}).get(field) if keep else None for rid, keep in zip(df["run_id"], mask)]
+        return df
+
+    records = results_store.latest(results_store.load_any(store))
+    records = [r for r in records
+               if (domains is None or r["domain"] in domains) and (planners is None or r["planner"] in planners)]
+    df = pd.DataFrame(records)
+    if "telemetry" in df:
+        traced = _traced(df, df["telemetry"].notna())
+        df["telemetry"] = df["telemetry"].where(traced, None)
+    return df.drop(columns=[c for c in results_store.LOG_FIELDS if c not in ("incumbents", "telemetry") and c in df])
+
+
+def load_results(domains=None, planners=None):
+    """Cargar todos los resultados de ambos planificadores.
+
+    De cada almacen se toma el ultimo resultado por (planner, domain, problem,
+    repeticion), opcionalmente solo de algunos dominios o planificadores.
+    Un plan que no pasa la validacion no cuenta como resuelto.
+    """
+    if not results_store.columnar_available():
+        print("Sin pyarrow se lee el JSONL completo (formato columnar: uv sync --extra columnar)")
+    frames = [_load_store(os.path.join(RESULTS_DIR, f"{name}.jsonl"), domains, planners) for name in STORES]
+    frames = [f for f in frames if not f.empty]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if "plan_valid" in df:
+        invalid = df["plan_valid"] == False  # noqa: E712 (None = not validated)
+        df.loc[invalid, "solved"] = False
+        df.loc[invalid, "plan_length"] = None
+    return df
+
+
+def repeated_domains(df):
+    """Dominios donde alguna (planner, problem) tiene mas de una muestra."""
+    sizes = df.groupby(["domain", "planner", "problem"]).size()
+    most = sizes.groupby(level="domain").max()
+    return set(most[most > 1].index)
+
+
+def time_stats_table(df, metric="time"):
+    """n, mediana, IQR e IC95 de `metric` por dominio, problema y planificador."""
+    keys = ["domain", "problem", "complexity", "planner"]
+    rows = {key: stats.summarize(group.dropna().tolist()) for key, group in df.groupby(keys)[metric]}
+    table = pd.DataFrame.from_dict(rows, orient="index")
+    table.index.names = keys
+    return table.round(4)
+
+
+def significance_table(df, metric="time"):
+    """Mejor planificador (menor mediana) de cada problema contra los demas.
+
+    speedup = mediana del otro / mediana del mejor; significativo si el
+    p-valor de Mann-Whitney es menor que ALPHA.
+    """
+    samples = df.dropna(subset=[metric]).groupby(["domain", "problem", "complexity", "planner"])[metric].agg(list)
+    medians = samples.map(lambda s: float(pd.Series(s).median()))
+    rows = []
+    for (domain, problem, complexity), by_planner in samples.groupby(level=["domain", "problem", "complexity"]):
+        if len(by_planner) < 2:
+            continue
+        by_planner = by_planner.droplevel(["domain", "problem", "complexity"])
+        median = medians.loc[(domain, problem, complexity)]
+        best = median.idxmin()
+        for planner, s in by_planner.items():
+            if planner == best:
+                continue
+            _, p_value = stats.mann_whitney(by_planner[best], s)
+            rows.append({
+                "domain": domain,
+                "problem": problem,
+                "complexity": complexity,
+                "mejor": best,
+                "frente_a": planner,
+                "speedup": round(median[planner] / median[best], 2) if median[best] > 0 else None,
+                "p_valor": round(p_value, 4),
+                "significativo": p_value < ALPHA,
+            })
+    return pd.DataFrame(rows).set_index(["domain", "problem", "complexity"]) if rows else pd.DataFrame()
+
+
+def _median_bands(domain_df, metric, scale=1.0):
+    """Mediana e IC95 de `metric` por (planner, complejidad)."""
+    values = (domain_df[metric] * scale).dropna()
+    grouped = values.groupby([domain_df["planner"], domain_df["complexity"]])
+    rows = [{"planner": planner, "complexity": complexity, **stats.summarize(group.tolist())}
+            for (planner, complexity), group in grouped]
+    return pd.DataFrame(rows, columns=["planner", "complexity", "n", "median", "iqr", "ci_lo", "ci_hi"])
+
+
+def _plot_band(ax, band, marker, color, label):
+    """Linea de medianas con la banda del IC95 si hay mas de una muestra."""
+    ax.plot(
+        band["complexity"],
+        band["median"],
+        marker=marker,
+        color=color,
+        label=label,
+        linewidth=2,
+        markersize=8,
+    )
+    if (band["n"] > 1).any():
+        ax.fill_between(band["complexity"], band["ci_lo"], band["ci_hi"], color=color, alpha=0.2)
+
+
+def _domain_slice(table, domain):
+    """Filas de un dominio de una tabla indexada por dominio, sin filas/columnas vacias."""
+    if domain not in table.index.get_level_values("domain"):
+        return pd.DataFrame()
+    return table.xs(domain, level="domain").dropna(how="all").dropna(axis=1, how="all")
 
 
-def load_results():
-    """Cargar todos los resultados de ambos planificadores."""
-    all_results = []
+def generate_tables(df):
+    """Generar tablas en formato markdown (un solo pivot para todos los dominios)."""
+    tables = {}
 
-    pp_file = os.path.join(RESULTS_DIR, "pyperplan_results.json")
-    if os.path.exists(pp_file):
-        with open(pp_file) as f:
-            all_results.extend(json.load(f))
+    values = [m for m in METRICS.values() if m in df and df[m].notna().any()]
+    pivot = df.pivot_table(
+        index=["domain", "problem", "complexity"],
+        columns="planner",
+        values=values,
+        aggfunc="median",
+    )
+
+    # Punto de ruptura: mayor tamano resuelto y menor tamano sin resolver
+    solved = df["solved"] == True  # noqa: E712
+    breaking = pd.DataFrame({
+        "max_resuelto": df[solved].groupby(["domain", "planner"])["complexity"].max(),
+        "min_fallido": df[~solved].groupby(["domain", "planner"])["complexity"].min(),
+    })
+
+    # Repeticiones: dispersion del tiempo y si las diferencias son reales
+    repeated = repeated_domains(df)
+    repeated_df = df[df["domain"].isin(repeated)]
+    time_stats = time_stats_table(repeated_df) if repeated else None
+    significance = significance_table(repeated_df) if repeated else pd.DataFrame()
 
-    fd_file = os.path.join(RESULTS_DIR, "fast_downward_results.json")
-    if os.path.exists(fd_file):
-        with open(fd_file) as f:
-            all_results.extend(json.load(f))
+    for domain in df["domain"].unique():
+        for name, metric in METRICS.items():
+            if metric not in values:
+                continue
+            table = _domain_slice(pivot[metric], domain)
+            if name == "memory_mb":
+                table = (table / 1024).round(1)
+            tables[f"{domain}_{name}"] = table
+            if name == "cpu" and "time" in values:
+                # CPU / pared: muy por debajo de 1 indica que el proceso esperaba
+                # (contencion con los vecinos en paralelo, arranque de Docker...)
+                tables[f"{domain}_cpu_util"] = (table / _domain_slice(pivot["time"], domain)).round(2)
+
+        tables[f"{domain}_breaking_point"] = breaking.xs(domain, level="domain")
+        if domain in repeated:
+            tables[f"{domain}_time_stats"] = time_stats.xs(domain, level="domain")
+            if not significance.empty and domain in significance.index.get_level_values("domain"):
+                tables[f"{domain}_significance"] = significance.xs(domain, level="domain")
 
-    return pd.DataFrame(all_results)
+    return tables
 
 
-def generate_tables(df):
-    """Generar tablas en formato markdown."""
-    tables = {}
+def _gripper_optimal(n):
+    return 3 * n + 1
 
-    for domain in df["domain"].unique():
-        domain_df = df[df["domain"] == domain]
-
-        # Tabla de tiempo y longitud
-        pivot_time = domain_df.pivot_table(
-            index=["problem", "complexity"],
-            columns="planner",
-            values="time",
-            aggfunc="first",
-        )
-        pivot_length = domain_df.pivot_table(
-            index=["problem", "complexity"],
-            columns="planner",
-            values="plan_length",
-            aggfunc="first",
-        )
-        pivot_nodes = domain_df.pivot_table(
-            index=["problem", "complexity"],
-            columns="planner",
-            values="nodes_expanded",
-            aggfunc="first",
-        )
 
-        tables[f"{domain}_time"] = pivot_time
-        tables[f"{domain}_length"] = pivot_length
-        tables[f"{domain}_nodes"] = pivot_nodes
+# Reference curves drawn over a (domain, metric) figure: (label, n -> value)
+REFERENCES = {
+    ("gripper", "plan_length"): ("Optimo teorico (3n+1)", _gripper_optimal),
+}
 
-    return tables
+
+def _axis_label(domain):
+    label = DOMAIN_LABELS.get(domain)
+    return f"Numero de {label}" if label else "Tamano de la instancia"
 
 
-def plot_time_comparison(df, domain, output_path):
-    """Grafica de tiempo vs complejidad para un dominio."""
-    domain_df = df[df["domain"] == domain]
+def plot_metric_comparison(domain_df, domain, metric, ylabel, title, output_path, scale=1.0, log=True):
+    """Grafica generica de una metrica vs complejidad para un dominio."""
+    domain_df = domain_df.dropna(subset=[metric])
+    if domain_df.empty:
+        return
 
     fig, ax = plt.subplots(figsize=(10, 6))
 
-    markers = ["o", "s", "^", "D", "v", "p"]
-    colors = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b"]
+    bands = _median_bands(domain_df, metric, scale=scale)
+    for i, (planner, band) in enumerate(bands.groupby("planner")):
+        _plot_band(ax, band, MARKERS[i % len(MARKERS)], COLORS[i % len(COLORS)], planner)
 
-    for i, planner in enumerate(sorted(domain_df["planner"].unique())):
-        planner_df = domain_df[domain_df["planner"] == planner].sort_values("complexity")
+    if (domain, metric) in REFERENCES:
+        label, reference = REFERENCES[(domain, metric)]
+        complexities = sorted(domain_df["complexity"].unique())
         ax.plot(
-            planner_df["complexity"],
-            planner_df["time"],
-            marker=markers[i % len(markers)],
-            color=colors[i % len(colors)],
-            label=planner,
-            linewidth=2,
-            markersize=8,
+            complexities, [reference(n) for n in complexities],
+            "k--", label=label,
+            linewidth=2, alpha=0.7,
         )
 
-    domain_label = "Bloques" if domain == "blocksworld" else "Pelotas"
-    ax.set_xlabel(f"Numero de {domain_label}", fontsize=12)
-    ax.set_ylabel("Tiempo de ejecucion (s)", fontsize=12)
-    ax.set_title(f"Tiempo de ejecucion vs. complejidad — {domain.capitalize()}", fontsize=14)
+    ax.set_xlabel(_axis_label(domain), fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+    ax.set_title(f"{title} — {domain.capitalize()}", fontsize=14)
     ax.legend(fontsize=10)
     ax.grid(True, alpha=0.3)
-    ax.set_yscale("log")
+    if log:
+        ax.set_yscale("log")
 
     plt.tight_layout()
-    plt.savefig(output_path, dpi=300, bbox_inches="tight")
+    plt.savefig(output_path, dpi=DPI, bbox_inches="tight")
     plt.close()
     print(f"Figura guardada: {output_path}")
 
 
-def plot_nodes_comparison(df, domain, output_path):
-    """Grafica de nodos expandidos vs complejidad."""
-    domain_df = df[df["domain"] == domain].dropna(subset=["nodes_expanded"])
+def plot_anytime(domain_df, domain, output_path):
+    """Curvas coste-tiempo de las ejecuciones con mas de un plan incumbente."""
+    if "incumbents" not in domain_df:
+        return
+    domain_df = domain_df[domain_df["incumbents"].apply(lambda inc: isinstance(inc, list) and len(inc) > 1)]
+    if domain_df.empty:
+        return
 
     fig, ax = plt.subplots(figsize=(10, 6))
 
-    markers = ["o", "s", "^", "D", "v", "p"]
-    colors = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b"]
-
-    for i, planner in enumerate(sorted(domain_df["planner"].unique())):
-        planner_df = domain_df[domain_df["planner"] == planner].sort_values("complexity")
-        ax.plot(
-            planner_df["complexity"],
-            planner_df["nodes_expanded"],
-            marker=markers[i % len(markers)],
-            color=colors[i % len(colors)],
-            label=planner,
-            linewidth=2,
-            markersize=8,
-        )
-
-    domain_label = "Bloques" if domain == "blocksworld" else "Pelotas"
-    ax.set_xlabel(f"Numero de {domain_label}", fontsize=12)
-    ax.set_ylabel("Nodos expandidos", fontsize=12)
-    ax.set_title(f"Nodos expandidos vs. complejidad — {domain.capitalize()}", fontsize=14)
-    ax.legend(fontsize=10)
+    for i, (_, row) in enumerate(domain_df.sort_values(["planner", "complexity"]).iterrows()):
+        times = [inc["time"] for inc in row["incumbents"]]
+        costs = [inc["cost"] for inc in row["incumbents"]]
+        # Extend the last incumbent up to the end of the run
+        times.append(max(row["time"], times[-1]))
+        costs.append(costs[-1])
+        ax.step(times, costs, where="post", color=COLORS[i % len(COLORS)],
+                label=f"{row['planner']} {row['problem']}", linewidth=2)
+
+    ax.set_xlabel("Tiempo (s)", fontsize=12)
+    ax.set_ylabel("Coste del mejor plan", fontsize=12)
+    ax.set_title(f"Calidad del plan a lo largo del tiempo — {domain.capitalize()}", fontsize=14)
+    ax.legend(fontsize=9)
     ax.grid(True, alpha=0.3)
-    ax.set_yscale("log")
 
     plt.tight_layout()
-    plt.savefig(output_path, dpi=300, bbox_inches="tight")
+    plt.savefig(output_path, dpi=DPI, bbox_inches="tight")
     plt.close()
     print(f"Figura guardada: {output_path}")
 
 
-def plot_plan_length_comparison(df, domain, output_path):
-    """Grafica de longitud del plan vs complejidad."""
-    domain_df = df[df["domain"] == domain].dropna(subset=["plan_length"])
-
-    fig, ax = plt.subplots(figsize=(10, 6))
-
-    markers = ["o", "s", "^", "D", "v", "p"]
-    colors = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b"]
-
-    for i, planner in enumerate(sorted(domain_df["planner"].unique())):
-        planner_df = domain_df[domain_df["planner"] == planner].sort_values("complexity")
-        ax.plot(
-            planner_df["complexity"],
-            planner_df["plan_length"],
-            marker=markers[i % len(markers)],
-            color=colors[i % len(colors)],
-            label=planner,
-            linewidth=2,
-            markersize=8,
-        )
-
-    # Para Gripper, mostrar la solucion optima teorica
-    if domain == "gripper":
-        complexities = sorted(domain_df["complexity"].unique())
-        optimal = [3 * n + 1 for n in complexities]
-        ax.plot(
-            complexities, optimal,
-            "k--", label="Optimo teorico (3n+1)",
-            linewidth=2, alpha=0.7,
-        )
+def plot_telemetry(domain_df, domain, output_path):
+    """Expansiones/s y mejor h a lo largo del tiempo de las ejecuciones con telemetria."""
+    if "telemetry" not in domain_df:
+        return
+    domain_df = domain_df.dropna(subset=["telemetry"])
+    if domain_df.empty:
+        return
 
-    domain_label = "Bloques" if domain == "blocksworld" else "Pelotas"
-    ax.set_xlabel(f"Numero de {domain_label}", fontsize=12)
-    ax.set_ylabel("Longitud del plan (acciones)", fontsize=12)
-    ax.set_title(f"Longitud del plan vs. complejidad — {domain.capitalize()}", fontsize=14)
-    ax.legend(fontsize=10)
-    ax.grid(True, alpha=0.3)
+    fig, (ax_rate, ax_h) = plt.subplots(1, 2, figsize=(14, 6))
+
+    for i, (_, row) in enumerate(domain_df.sort_values(["planner", "complexity"]).iterrows()):
+        series = telemetry.decode(row["telemetry"])
+        label = f"{row['planner']} {row['problem']}"
+        color = COLORS[i % len(COLORS)]
+        times, rates = telemetry.expansion_rates(series)
+        if rates:
+            ax_rate.plot(times, rates, color=color, label=label, linewidth=2)
+        points = [(t, h) for t, h in zip(series["t"], series["h"]) if t is not None and h is not None]
+        if points:
+            ax_h.step(*zip(*points), where="post", color=color, label=label, linewidth=2)
+
+    ax_rate.set_xlabel("Tiempo (s)", fontsize=12)
+    ax_rate.set_ylabel("Expansiones por segundo", fontsize=12)
+    ax_rate.set_yscale("log")
+    ax_h.set_xlabel("Tiempo (s)", fontsize=12)
+    ax_h.set_ylabel("Mejor valor heuristico (h)", fontsize=12)
+    for ax in (ax_rate, ax_h):
+        ax.grid(True, alpha=0.3)
+        ax.legend(fontsize=9)
+    fig.suptitle(f"Progreso de la busqueda — {domain.capitalize()} "
+                 f"({domain_df['problem'].iloc[0]})", fontsize=14)
 
     plt.tight_layout()
-    plt.savefig(output_path, dpi=300, bbox_inches="tight")
+    plt.savefig(output_path, dpi=DPI, bbox_inches="tight")
     plt.close()
     print(f"Figura guardada: {output_path}")
 
 
-def main():
+# Figures per domain: (file prefix, metric, y label, title, scale, log y axis).
+# A metric missing from the results is skipped; every domain gets every figure.
+FIGURES = [
+    ("tiempo", "time", "Tiempo de ejecucion (s)", "Tiempo de ejecucion vs. complejidad", 1.0, True),
+    ("nodos", "nodes_expanded", "Nodos expandidos", "Nodos expandidos vs. complejidad", 1.0, True),
+    ("plan_length", "plan_length", "Longitud del plan (acciones)", "Longitud del plan vs. complejidad", 1.0, False),
+    ("cpu", "cpu_time", "Tiempo de CPU user+sys (s)", "Tiempo de CPU vs. complejidad", 1.0, True),
+    ("memoria", "peak_rss_kb", "Pico de memoria residente (MB)", "Memoria vs. complejidad", 1 / 1024, True),
+]
+
+
+def _code_hash():
+    """Hash of the plotting code: changing it invalidates every cached figure."""
+    h = hashlib.sha256()
+    for module in (__file__, stats.__file__, telemetry.__file__):
+        with open(module, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def figure_tasks(df, figures_dir=None):
+    """(fichero, funcion, slice de datos, args) de cada figura del informe."""
+    figures_dir = figures_dir or FIGURES_DIR
+    keys = [c for c in ("planner", "problem", "rep", "complexity") if c in df]
+    tasks = []
+    for domain, domain_df in df.groupby("domain", sort=False):
+        for prefix, metric, ylabel, title, scale, log in FIGURES:
+            if metric not in domain_df or domain_df[metric].isna().all():
+                continue
+            data = domain_df[keys + [metric]].sort_values(keys)
+            tasks.append((os.path.join(figures_dir, f"{prefix}_{domain}.png"), plot_metric_comparison, data,
+                          (domain, metric, ylabel, title), {"scale": scale, "log": log}))
+        # Empty slices draw nothing, so they would never be cached: skip them here
+        if "incumbents" in domain_df:
+            improved = domain_df["incumbents"].apply(lambda inc: isinstance(inc, list) and len(inc) > 1)
+            data = domain_df.loc[improved, keys + ["time", "incumbents"]].sort_values(keys)
+            if not data.empty:
+                tasks.append((os.path.join(figures_dir, f"anytime_{domain}.png"), plot_anytime, data, (domain,), {}))
+        if "telemetry" in domain_df:
+            data = domain_df[keys + ["telemetry"]].dropna(subset=["telemetry"]).sort_values(keys)
+            if not data.empty:
+                tasks.append((os.path.join(figures_dir, f"telemetria_{domain}.png"), plot_telemetry, data, (domain,), {}))
+    return tasks
+
+
+def _render(func, data, args, output_path, kwargs):
+    func(data, *args, output_path, **kwargs)
+    return output_path
+
+
+def render_figures(df, figures_dir=None, workers=None, force=False):
+    """Dibujar las figuras en un pool de procesos, saltando las que no han cambiado.
+
+    Cada figura se identifica por el hash de su slice de datos, sus
+    parametros y el codigo de dibujo; si coincide con el de la cache y el
+    PNG existe, no se redibuja. Devuelve (dibujadas, en cache).
+    """
+    figures_dir = figures_dir or FIGURES_DIR
+    cache_file = os.path.join(figures_dir, RENDER_CACHE)
+    cache = {}
+    if os.path.exists(cache_file) and not force:
+        with open(cache_file) as f:
+            cache = json.load(f)
+
+    code = _code_hash()
+    pending = {}
+    cached = 0
+    for output_path, func, data, args, kwargs in figure_tasks(df, figures_dir):
+        h = hashlib.sha256(code.encode())
+        h.update(json.dumps([func.__name__, args, kwargs, DPI]).encode())
+        h.update(data.to_json(orient="split", index=False, double_precision=15).encode())
+        name = os.path.basename(output_path)
+        if cache.get(name) == h.hexdigest() and os.path.exists(output_path):
+            cached += 1
+            continue
+        pending[name] = (h.hexdigest(), func, data, args, output_path, kwargs)
+
+    rendered = 0
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_render, func, data, args, output_path, kwargs): name
+                       for name, (_, func, data, args, output_path, kwargs) in pending.items()}
+            for future in as_completed(futures):
+                name = futures[future]
+                future.result()
+                cache[name] = pending[name][0]
+                rendered += 1
+    tmp = cache_file + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp, cache_file)
+    return rendered, cached
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--domains", nargs="+", default=None, help="analizar solo estos dominios")
+    parser.add_argument("--planners", nargs="+", default=None, help="analizar solo estas configuraciones")
+    parser.add_argument("--workers", type=int, default=None, help="procesos para dibujar figuras")
+    parser.add_argument("--force", action="store_true", help="redibujar todas las figuras (ignorar la cache)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
     os.makedirs(FIGURES_DIR, exist_ok=True)
 
-    df = load_results()
+    df = load_results(args.domains, args.planners)
     if df.empty:
         print("No hay resultados. Ejecuta primero run_pyperplan.py y/o run_fast_downward.py")
         return
@@ -200,28 +480,24 @@ def main():
         print(f"\n=== {name.upper()} ===")
         print(table.to_markdown())
 
-    # Generar figuras
-    for domain in df["domain"].unique():
-        plot_time_comparison(
-            df, domain,
-            os.path.join(FIGURES_DIR, f"tiempo_{domain}.png"),
-        )
-        plot_nodes_comparison(
-            df, domain,
-            os.path.join(FIGURES_DIR, f"nodos_{domain}.png"),
-        )
-        plot_plan_length_comparison(
-            df, domain,
-            os.path.join(FIGURES_DIR, f"plan_length_{domain}.png"),
-        )
+    # Generar figuras (en paralelo; las que no han cambiado salen de la cache)
+    rendered, cached = render_figures(df, workers=args.workers, force=args.force)
+    print(f"Figuras: {rendered} dibujadas, {cached} sin cambios")
 
     # Resumen general
     print("\n\n=== RESUMEN GENERAL ===")
-    summary = df.groupby("planner").agg(
-        problemas_resueltos=("solved", "sum"),
-        tiempo_medio=("time", "mean"),
-        plan_medio=("plan_length", "mean"),
-    ).round(4)
+    aggs = {
+        "problemas_resueltos": ("solved", "sum"),
+        "tiempo_medio": ("time", "mean"),
+        "plan_medio": ("plan_length", "mean"),
+    }
+    if "plan_valid" in df:
+        aggs["planes_invalidos"] = ("plan_valid", lambda v: int((v == False).sum()))  # noqa: E712
+    if "cpu_time" in df:
+        aggs["cpu_medio"] = ("cpu_time", "mean")
+    if "peak_rss_kb" in df:
+        aggs["memoria_max_kb"] = ("peak_rss_kb", "max")
+    summary = df.groupby("planner").agg(**aggs).round(4)
     print(summary.to_markdown())
 
     # Guardar resumen como CSV
@@ -0,0 +1,349 @@
+"""
+Runner asincrono para barridos de ejecuciones por subproceso: un solo bucle
+asyncio lanza las ejecuciones con `asyncio.create_subprocess_exec`, sin un
+hilo ni un proceso del pool bloqueado por cada ejecucion en curso.
+
+- La concurrencia la limita un semaforo (--jobs), asi que se pueden encolar
+  miles de trabajos ligeros sin coste por trabajo en espera.
+- Cada ejecucion va en su propia sesion: en timeout, cancelacion o cualquier
+  error mientras corre se mata el grupo de procesos entero (el driver de FD
+  lanza traductor y busqueda como nietos) y, con Docker, el contenedor por
+  su nombre (`docker rm -f`). Los contenedores que siguen vivos al salir
+  (p.ej. Ctrl-C) se borran todos antes de terminar, asi que no quedan
+  contenedores huerfanos.
+- La salida se lee linea a linea con log_parser mientras el planificador se
+  ejecuta, y CPU y pico de RSS salen de measure.RUSAGE_WRAPPER (dentro del
+  contenedor con Docker, alrededor del planificador en local).
+- Cada --progress segundos se imprime el progreso del barrido.
+
+Es una alternativa a los runners sincronos para ejecuciones de un proceso
+por trabajo, no su sustituto: solo el lanzamiento, el timeout y el kill son
+propios. Los adaptadores usan las mismas piezas que el `run_single` de cada
+runner (entradas y comando: `run_pyperplan.cli_command` /
+`run_fast_downward.search_command`; diccionario de resultado y log:
+`run_base`, `run_result`, `error_result`), y la lista de trabajos, la
+validacion, el almacen JSONL y el cache de ejecuciones (run_cache.py) son
+los de run_pyperplan / run_fast_downward. Quedan solo en los runners
+sincronos: las configuraciones de pyperplan en proceso (anytime, PP-*-NP,
+PP-*-CS, que aqui se saltan), el backend `pool`, --translate-cache, el
+predictor (--adaptive-timeout, --skip-hopeless, --early-abort) y los lotes
+(--batch); portfolio.py y distributed.py usan tambien el `run_single`
+sincrono.
+
+Uso:
+    python src/async_runner.py --planner pyperplan --jobs 8
+    python src/async_runner.py --planner fd-docker --jobs 4 --suite suites/scaling.json
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+from importlib.metadata import version
+
+import log_parser
+import measure
+import results_store
+import run_cache
+import run_fast_downward
+import run_pyperplan
+import scheduler
+import suites
+
+PROGRESS_INTERVAL = 5.0  # seconds between progress lines
+LINE_LIMIT = 1 << 20  # longest planner output line read at once
+REMOVE_TIMEOUT = 30  # seconds allowed for `docker rm -f`
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+# -- adapters -----------------------------------------------------------------
+
+class PyperplanAdapter:
+    """pyperplan por su CLI, en un directorio temporal por ejecucion."""
+
+    name = "pyperplan"
+    runner = run_pyperplan
+    setup = {"mode": "subprocess"}  # runner options that enter the store and cache keys
+
+    def __init__(self, args):
+        self.memory = args.memory
+
+    def version(self):
+        return version("pyperplan")
+
+    def runnable(self, job):
+        return not run_pyperplan.inprocess_only(job[4])
+
+    def base(self, job):
+        return run_pyperplan.run_base(job)
+
+    def launch(self, job):
+        domain_file, problem_file, search, heuristic, config_name, prob_id, domain_name, complexity = job
+        cmd, tmpdir, plan_file = run_pyperplan.cli_command(job)
+        return {
+            "cmd": [sys.executable, "-c", measure.RUSAGE_WRAPPER] + cmd,
+            "cwd": None, "workdir": tmpdir, "output": plan_file, "container": None,
+            "preexec_fn": scheduler.memory_limiter(self.memory),
+            "describe": f"{domain_name}, {complexity} objs, {search}+{heuristic}",
+        }
+
+
+class FastDownwardAdapter:
+    """Fast Downward con un `docker run` por ejecucion o con fast-downward.py local."""
+
+    name = "fast_downward"
+    runner = run_fast_downward
+
+    def __init__(self, args, backend):
+        self.backend = backend
+        self.setup = {"backend": backend}
+        run_fast_downward.MEMORY_LIMIT = args.memory
+
+    def version(self):
+        return run_fast_downward.planner_version(self.backend)
+
+    def runnable(self, job):
+        return True
+
+    def base(self, job):
+        return run_fast_downward.run_base(job, self.backend)
+
+    def launch(self, job):
+        domain_name, complexity = job[6], job[7]
+        container = f"fd-{uuid.uuid4().hex[:12]}" if self.backend == "docker" else None
+        cmd, cwd, workdir, _, _ = run_fast_downward.search_command(job, self.backend, name=container)
+        if self.backend == "native":
+            cmd = [sys.executable, "-c", measure.RUSAGE_WRAPPER] + cmd
+        return {
+            "cmd": cmd, "cwd": cwd, "workdir": workdir, "output": workdir, "container": container,
+            "preexec_fn": None, "describe": f"{domain_name}, {complexity} objs, {self.backend}",
+        }
+
+
+ADAPTERS = {
+    "pyperplan": PyperplanAdapter,
+    "fd-docker": lambda args: FastDownwardAdapter(args, "docker"),
+    "fd-native": lambda args: FastDownwardAdapter(args, "native"),
+}
+
+
+# -- core ---------------------------------------------------------------------
+
+class Sweep:
+    """Estado compartido de un barrido: limite de concurrencia, contenedores vivos y progreso."""
+
+    def __init__(self, adapter, jobs, timeout):
+        self.adapter = adapter
+        self.timeout = timeout
+        self.limit = asyncio.Semaphore(jobs)
+        self.containers = set()
+        self.total = 0
+        self.running = 0
+        self.done = 0
+        self.solved = 0
+
+    async def _remove_container(self, name):
+        try:
+            proc = await asyncio.create_subprocess_exec(run_fast_downward.DOCKER, "rm", "-f", name,
+                                                        stdout=asyncio.subprocess.DEVNULL,
+                                                        stderr=asyncio.subprocess.DEVNULL)
+            await asyncio.wait_for(proc.wait(), REMOVE_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            return  # still listed: removed again on exit
+        self.containers.discard(name)
+
+    async def _kill(self, proc, container):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+        if container is not None:
+            # Killing the docker CLI leaves the container running
+            await self._remove_container(container)
+
+    def remove_containers(self):
+        """Borrar los contenedores que sigan vivos (al salir, tambien tras Ctrl-C)."""
+        if self.containers:
+            subprocess.run([run_fast_downward.DOCKER, "rm", "-f", *self.containers], capture_output=True, timeout=REMOVE_TIMEOUT)
+            self.containers.clear()
+
+    async def run(self, job, rep):
+        """Ejecutar un trabajo (esperando turno en el semaforo) -> (job, rep, resultado)."""
+        async with self.limit:
+            self.running += 1
+            try:
+                return job, rep, await self._run(job)
+            finally:
+                self.running -= 1
+                self.done += 1
+
+    async def _run(self, job):
+        adapter, runner = self.adapter, self.adapter.runner
+        label = f"{job[4]}/{job[5]}"
+        base = adapter.base(job)
+        launch = proc = None
+        start = time.perf_counter()
+        try:
+            launch = adapter.launch(job)
+            log(f"START  {label} ({launch['describe']})")
+            usage = []
+
+            def report(inc):
+                log(f"PLAN   {label} -> cost={inc['cost']} a los {inc['time']:.2f}s")
+
+            parser = log_parser.LogParser(on_incumbent=report)
+            proc = await asyncio.create_subprocess_exec(
+                *launch["cmd"], stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+                cwd=launch["cwd"], start_new_session=True, preexec_fn=launch["preexec_fn"], limit=LINE_LIMIT)
+            if launch["container"] is not None:
+                self.containers.add(launch["container"])
+
+            async def pump():
+                async for raw in proc.stdout:
+                    line = raw.decode(errors="replace")
+                    found = measure.wrapper_usage(line)
+                    if found is not None:
+                        usage[:] = [found]
+                    else:
+                        parser.feed(line, time.perf_counter() - start)
+                await proc.wait()
+
+            status = None
+            try:
+                await asyncio.wait_for(pump(), self.timeout)
+            except asyncio.TimeoutError:
+                status = "TIMEOUT"
+            elapsed = time.perf_counter() - start  # the kill and `docker rm` are not charged
+            if status is not None:
+                await self._kill(proc, launch["container"])
+            elif launch["container"] is not None:
+                self.containers.discard(launch["container"])  # `docker run --rm` removed it
+            proc = None  # finished or killed: nothing left to clean up
+            usage = {"wall_time": elapsed, **(usage[0] if usage else measure.NO_USAGE)}
+            return runner.run_result(label, base, parser, usage, launch["output"], status)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return runner.error_result(label, base, time.perf_counter() - start, e)
+        finally:
+            if proc is not None:
+                # Cancelled or failed while running (e.g. a line over LINE_LIMIT): do not leave it behind
+                await self._kill(proc, launch["container"])
+            if launch is not None and launch["workdir"] is not None:
+                shutil.rmtree(launch["workdir"], ignore_errors=True)
+
+    async def progress(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            log(f"PROGRESO {self.done}/{self.total} terminadas, {self.running} en curso, {self.solved} resueltas")
+
+
+async def sweep(adapter, jobs, store, planner_version, args, cache_dir):
+    """Lanzar todos los (job, rep) y anadir cada resultado al almacen en cuanto termina."""
+    runner = adapter.runner
+    state = Sweep(adapter, args.jobs, runner.TIMEOUT)
+    state.total = len(jobs)
+    try:
+        # SIGTERM cancels the sweep like Ctrl-C does
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:  # Windows
+        pass
+    tasks = [asyncio.create_task(state.run(job, rep)) for job, rep in jobs]
+    progress = asyncio.create_task(state.progress(args.progress))
+    try:
+        for done in asyncio.as_completed(tasks):
+            job, rep, r = await done
+            r = runner.finish(r, job, rep, planner_version, **adapter.setup)
+            state.solved += bool(r["solved"])
+            results_store.append(store, r)
+            if cache_dir:
+                run_cache.put(cache_dir, runner.cache_key(job, rep, planner_version, **adapter.setup), r)
+    finally:
+        progress.cancel()
+        pending = [t for t in tasks if not t.done()]
+        for t in pending:
+            t.cancel()
+        # Cancelled runs kill their process group and container before returning
+        await asyncio.gather(*pending, return_exceptions=True)
+        state.remove_containers()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--planner", choices=ADAPTERS, required=True,
+                        help="pyperplan (CLI), fd-docker (un `docker run` por ejecucion) o fd-native")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="ejecuciones simultaneas (por defecto segun cores y RAM disponibles)")
+    parser.add_argument("--memory", default=run_pyperplan.MEMORY_LIMIT,
+                        help="limite de memoria por ejecucion/contenedor (p.ej. 4g)")
+    parser.add_argument("--suite", default=suites.DEFAULT_SUITE,
+                        help="suite de instancias (JSON, ver suites/)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="repeticiones de cada ejecucion (cada muestra se guarda con su `rep`)")
+    parser.add_argument("--rerun", action="store_true",
+                        help="repetir tambien las ejecuciones que ya estan en el almacen")
+    parser.add_argument("--progress", type=float, default=PROGRESS_INTERVAL,
+                        help="segundos entre lineas de progreso")
+    run_cache.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    adapter = ADAPTERS[args.planner](args)
+    runner = adapter.runner
+    os.makedirs(runner.RESULTS_DIR, exist_ok=True)
+    if args.planner != "pyperplan" and not run_fast_downward.check_backend(adapter.backend):
+        log(f"ERROR: backend {adapter.backend} no disponible"); return
+
+    store = os.path.join(runner.RESULTS_DIR, runner.STORE_FILE)
+    planner_version = adapter.version()
+    jobs, keys = runner.build_jobs(args.suite, args.repeat, store, planner_version, rerun=args.rerun,
+                                   **adapter.setup)
+    skipped = [jr for jr in jobs if not adapter.runnable(jr[0])]
+    if skipped:
+        jobs = [jr for jr in jobs if adapter.runnable(jr[0])]
+        log(f"{len(skipped)} ejecuciones solo en proceso se saltan (run_pyperplan.py --mode inprocess)")
+    cache_dir = None if args.no_cache else os.path.join(runner.RESULTS_DIR, run_cache.CACHE_DIR)
+    if cache_dir and not args.rerun:
+        jobs, hits = run_cache.split(cache_dir, jobs,
+                                     lambda job, rep: runner.cache_key(job, rep, planner_version, **adapter.setup))
+        for job, rep, r in hits:
+            results_store.append(store, runner.from_cache(r, job, rep, planner_version, **adapter.setup))
+        if hits:
+            log(f"{len(hits)} ejecuciones servidas desde {cache_dir}")
+    args.jobs = args.jobs or scheduler.pool_size(args.memory)
+    log(f"Lanzando {len(jobs)} ejecuciones ({args.planner}, hasta {args.jobs} a la vez, "
+        f"{args.memory}/ejecucion, {args.repeat} rep.), {len(keys) - len(jobs) - len(skipped)} ya en {store}...")
+
+    try:
+        asyncio.run(sweep(adapter, jobs, store, planner_version, args, cache_dir))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        log("Interrumpido: los resultados terminados ya estan en el almacen")
+        raise
+    finally:
+        if run_fast_downward._GEN_DIR:
+            shutil.rmtree(run_fast_downward.gen_dir(), ignore_errors=True)
+            run_fast_downward._GEN_DIR.clear()
+    if cache_dir and (args.cache_max_age is not None or args.cache_max_size is not None):
+        removed, freed = run_cache.evict(cache_dir, args.cache_max_age, args.cache_max_size)
+        log(f"Cache: {removed} entradas borradas ({freed / 1024 / 1024:.1f} MB)")
+
+    results = [r for r in results_store.load(store) if results_store.result_key(r) in keys]
+    solved = sum(1 for r in results if r["solved"])
+    log(f"\nRESUMEN: {solved}/{len(results)} resueltos")
+    log(f"Guardado en {store}")
+
+
+if __name__ == "__main__":
+    main()
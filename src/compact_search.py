@@ -0,0 +1,147 @@
+"""
+Backend de busqueda compacto para pyperplan: mismos algoritmos (A*, weighted
+A*, GBF) y mismo orden de expansion que pyperplan.search, con menos memoria
+por nodo.
+
+- Los estados son enteros usados como bitsets sobre el indice de hechos de la
+  tarea grounded (bit i = i-esimo hecho de `sorted(task.facts)`); aplicar un
+  operador es `(estado & ~del) | add`, como en validate.py.
+- La lista cerrada es un dict estado -> id del mejor nodo, y padre, operador
+  y g de cada nodo viven en arrays (`array`), no en objetos SearchNode.
+- La heuristica recibe un nodo transitorio con `state` (frozenset, decodificado
+  solo si se pide), `bits`, `g` y `parent`, asi que valen tanto las de
+  pyperplan como las de fast_ground (que leen `bits` directamente).
+
+Solo los estados guardados son compactos. hadd y hff de pyperplan leen
+`state`, asi que cada estado evaluado se decodifica a un frozenset temporal
+(_Node.state): el ahorro es de memoria, no del coste de evaluar.
+
+Lo usan las configuraciones con `"search_backend": "compact"` de run_pyperplan.
+"""
+
+import heapq
+import logging
+from array import array
+
+
+class CompactTask:
+    """Tarea grounded con estados enteros y la interfaz de pyperplan.task.Task."""
+
+    def __init__(self, task):
+        self.name = task.name
+        self.facts = sorted(task.facts)
+        bit = {fact: 1 << i for i, fact in enumerate(self.facts)}
+
+        def mask(facts):
+            m = 0
+            for fact in facts:
+                m |= bit[fact]
+            return m
+
+        self.operators = task.operators
+        self.ops = [(mask(op.preconditions), mask(op.add_effects), ~mask(op.del_effects))
+                    for op in task.operators]
+        self.initial_state = mask(task.initial_state)
+        self.goals = mask(task.goals)
+
+    def goal_reached(self, state):
+        return state & self.goals == self.goals
+
+    def get_successor_states(self, state):
+        """[(indice de operador, estado sucesor)] de los operadores aplicables."""
+        return [(i, (state & keep) | add) for i, (pre, add, keep) in enumerate(self.ops)
+                if state & pre == pre]
+
+    def decode(self, state):
+        """frozenset de hechos de un estado entero."""
+        facts = []
+        while state:
+            low = state & -state
+            facts.append(self.facts[low.bit_length() - 1])
+            state ^= low
+        return frozenset(facts)
+
+
+class _Node:
+    """Transient node handed to the heuristic; not kept by the search."""
+
+    __slots__ = ("task", "bits", "g", "parent", "h", "_state")
+
+    def __init__(self, task, bits, g, parent=None, h=None):
+        self.task = task
+        self.bits = bits
+        self.g = g
+        self.parent = parent
+        self.h = h
+        self._state = None
+
+    @property
+    def state(self):
+        if self._state is None:
+            self._state = self.task.decode(self.bits)
+        return self._state
+
+
+def astar_search(task, heuristic, weight=1, greedy=False):
+    """Best-first search over a CompactTask -> list of pyperplan Operators or None.
+
+    Same open list ordering as pyperplan's astar_search: (f, h, tiebreaker),
+    with f = g + weight * h, or f = h when `greedy`.
+    """
+    parents = array("l", [-1])
+    actions = array("l", [-1])
+    costs = array("l", [0])
+    states = [task.initial_state]
+    best = {task.initial_state: 0}  # state -> id of its cheapest node
+
+    init_h = heuristic(_Node(task, task.initial_state, 0))
+    logging.info("Initial h value: %f" % init_h)
+    open_list = [(init_h if greedy else weight * init_h, init_h, 0)]
+    expansions = 0
+
+    while open_list:
+        _f, h, node = heapq.heappop(open_list)
+        state = states[node]
+        # Skip entries superseded by a cheaper path to the same state
+        if best[state] != node:
+            continue
+        expansions += 1
+        if task.goal_reached(state):
+            logging.info("Goal reached. Start extraction of solution.")
+            logging.info("%d Nodes expanded" % expansions)
+            plan = []
+            while parents[node] != -1:
+                plan.append(task.operators[actions[node]])
+                node = parents[node]
+            plan.reverse()
+            return plan
+        g = costs[node] + 1
+        parent = _Node(task, state, costs[node], h=h)
+        for op, succ in task.get_successor_states(state):
+            succ_h = heuristic(_Node(task, succ, g, parent))
+            if succ_h == float("inf"):
+                continue
+            old = best.get(succ)
+            if old is None or g < costs[old]:
+                child = len(states)
+                states.append(succ)
+                parents.append(node)
+                actions.append(op)
+                costs.append(g)
+                best[succ] = child
+                heapq.heappush(open_list, (succ_h if greedy else g + weight * succ_h, succ_h, child))
+    logging.info("No operators left. Task unsolvable.")
+    logging.info("%d Nodes expanded" % expansions)
+    return None
+
+
+def weighted_astar_search(task, heuristic, weight=5):
+    return astar_search(task, heuristic, weight=weight)
+
+
+def greedy_best_first_search(task, heuristic):
+    return astar_search(task, heuristic, greedy=True)
+
+
+# Same names as pyperplan.planner.SEARCHES
+SEARCHES = {"astar": astar_search, "wastar": weighted_astar_search, "gbf": greedy_best_first_search}
@@ -0,0 +1,457 @@
+"""
+Ejecucion distribuida en varias maquinas a traves de una cola de trabajos en
+un fichero SQLite (en almacenamiento compartido, p.ej. NFS, o local para
+probar con varios workers en la misma maquina).
+
+- coordinator: construye la lista de trabajos de un runner (los mismos
+  (job, rep) que su main(), con --suite y --repeat), la publica en la cola y
+  va anadiendo los resultados terminados al almacen del runner hasta que no
+  queda nada pendiente. Es el unico que escribe en el almacen JSONL.
+- worker: en cualquier maquina con el repositorio, toma trabajos de la cola,
+  los ejecuta con el run_single del runner (--workers en paralelo) y devuelve
+  el resultado ya validado a la cola. Termina cuando la cola esta vacia.
+- status: recuento de trabajos por estado y worker.
+- check: prueba en esta maquina; publica el barrido en una cola y un almacen
+  temporales, lanza --workers procesos worker y comprueba que cada trabajo
+  llega al almacen una sola vez.
+
+Cada trabajo tomado tiene un lease que el worker renueva mientras lo
+ejecuta; si el worker muere, el trabajo vuelve a estar disponible cuando el
+lease caduca (hasta MAX_ATTEMPTS intentos, despues queda como `failed`).
+Las rutas de pyperplan viajan relativas a domains/ para que cada maquina las
+resuelva contra su copia. Todos los workers deben tener la misma version del
+planificador que el coordinador, que es la que entra en la clave del almacen,
+y el mismo --mode de pyperplan (tambien forma parte de la clave).
+
+Uso:
+    python src/distributed.py coordinator --runner pyperplan --suite suites/scaling.json --repeat 3 --mode inprocess
+    python src/distributed.py worker --runner pyperplan --workers 4 --mode inprocess
+    python src/distributed.py worker --runner fast_downward --workers 2 --backend pool
+    python src/distributed.py status
+    python src/distributed.py check --runner pyperplan --workers 2 --suite suites/default.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+from importlib.metadata import version
+
+import generators
+import results_store
+import run_fast_downward
+import run_pyperplan
+import scheduler
+import suites
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BASE_DIR, "results")
+QUEUE_FILE = os.path.join(RESULTS_DIR, "queue.db")
+LEASE = 60  # seconds a claimed job stays owned without a heartbeat
+MAX_ATTEMPTS = 3  # claims per job before it is marked failed
+POLL = 2.0  # seconds between queue polls
+
+RUNNERS = {
+    "pyperplan": run_pyperplan,
+    "fast_downward": run_fast_downward,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    runner TEXT NOT NULL,
+    key TEXT NOT NULL UNIQUE,
+    position INTEGER NOT NULL,
+    job TEXT NOT NULL,
+    rep INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    collected INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (runner, state, position);
+"""
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+def connect(path=QUEUE_FILE):
+    """Conexion en autocommit; las transacciones se abren con BEGIN IMMEDIATE."""
+    conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _portable(runner, job):
+    """pyperplan jobs carry absolute paths: send them relative to domains/."""
+    if runner != "pyperplan":
+        return list(job)
+    domain_file, problem_file = job[0], job[1]
+    if not generators.is_generated(problem_file):
+        problem_file = os.path.relpath(problem_file, run_pyperplan.DOMAINS_DIR)
+    return [os.path.relpath(domain_file, run_pyperplan.DOMAINS_DIR), problem_file, *job[2:]]
+
+
+def _local(runner, job):
+    if runner != "pyperplan":
+        return tuple(job)
+    return (os.path.join(run_pyperplan.DOMAINS_DIR, job[0]), suites.resolve(job[1], run_pyperplan.DOMAINS_DIR),
+            *job[2:])
+
+
+def publish(conn, runner, jobs, setup):
+    """Encolar (job, rep) en orden de lanzamiento; devuelve cuantos quedan pendientes.
+
+    Un trabajo ya encolado solo se reinicia si fallo o si su resultado ya se
+    recogio (y el coordinador lo vuelve a pedir: --rerun o resultado con ERROR).
+    """
+    hashes = RUNNERS[runner].config_hashes(**setup)
+    conn.execute("BEGIN IMMEDIATE")
+    for position, (job, rep) in enumerate(jobs):
+        key = json.dumps([runner, job[4], job[6], job[5], hashes[job[4]], rep])
+        conn.execute(
+            "INSERT INTO jobs (runner, key, position, job, rep) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET state = 'pending', position = excluded.position, "
+            "job = excluded.job, worker = NULL, lease = NULL, attempts = 0, result = NULL, collected = 0 "
+            "WHERE jobs.state = 'failed' OR (jobs.state = 'done' AND jobs.collected = 1)",
+            (runner, key, position, json.dumps(_portable(runner, job)), rep),
+        )
+    conn.execute("COMMIT")
+    return counts(conn, runner).get("pending", 0)
+
+
+def claim(conn, runner, worker):
+    """Tomar el siguiente trabajo pendiente (o con lease caducado) -> (id, job, rep) o None."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("UPDATE jobs SET state = 'failed' WHERE runner = ? AND state = 'running' "
+                     "AND lease < ? AND attempts >= ?", (runner, now, MAX_ATTEMPTS))
+        row = conn.execute(
+            "SELECT id, job, rep FROM jobs WHERE runner = ? "
+            "AND (state = 'pending' OR (state = 'running' AND lease < ?)) "
+            "ORDER BY position, id LIMIT 1", (runner, now)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE jobs SET state = 'running', worker = ?, lease = ?, attempts = attempts + 1 "
+                         "WHERE id = ?", (worker, now + LEASE, row[0]))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    if row is None:
+        return None
+    return row[0], _local(runner, json.loads(row[1])), row[2]
+
+
+def complete(conn, job_id, result):
+    conn.execute("UPDATE jobs SET state = 'done', result = ?, lease = NULL WHERE id = ? AND state = 'running'",
+                 (json.dumps(result), job_id))
+
+
+def release(conn, job_ids):
+    """Devolver trabajos a la cola (Ctrl-C o fallo del worker, no del planificador)."""
+    conn.executemany("UPDATE jobs SET state = 'pending', worker = NULL, lease = NULL "
+                     "WHERE id = ? AND state = 'running'", [(i,) for i in job_ids])
+
+
+def counts(conn, runner=None):
+    """{estado: n} de un runner (o de toda la cola)."""
+    if runner is None:
+        rows = conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state")
+    else:
+        rows = conn.execute("SELECT state, COUNT(*) FROM jobs WHERE runner = ? GROUP BY state", (runner,))
+    return dict(rows.fetchall())
+
+
+def collect(conn, runner, store):
+    """Anadir al almacen los resultados terminados que aun no se han recogido."""
+    rows = conn.execute("SELECT id, result FROM jobs WHERE runner = ? AND state = 'done' AND collected = 0",
+                        (runner,)).fetchall()
+    collected = []
+    for job_id, result in rows:
+        r = json.loads(result)
+        # A crash between append and the update only duplicates the line: load() keeps the last
+        results_store.append(store, r)
+        conn.execute("UPDATE jobs SET collected = 1 WHERE id = ?", (job_id,))
+        collected.append(r)
+    return collected
+
+
+class _Heartbeat(threading.Thread):
+    """Renew the lease of the jobs this worker is running."""
+
+    def __init__(self, path, worker):
+        super().__init__(daemon=True)
+        self.path = path
+        self.worker = worker
+        self.ids = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def run(self):
+        conn = connect(self.path)
+        while not self.stopped.wait(LEASE / 3):
+            with self.lock:
+                ids = list(self.ids)
+            conn.executemany("UPDATE jobs SET lease = ? WHERE id = ? AND worker = ? AND state = 'running'",
+                             [(time.time() + LEASE, i, self.worker) for i in ids])
+        conn.close()
+
+
+def _open_runner(runner, args):
+    """(submit(job) -> future, planner version, close()) for the selected runner."""
+    if runner == "pyperplan":
+        executor = ProcessPoolExecutor(max_workers=args.workers, initializer=run_pyperplan.init_worker,
+                                       initargs=(args.memory, args.mode == "inprocess"))
+        return (lambda job: executor.submit(run_pyperplan.runner_for(job, args.mode), *job),
+                version("pyperplan"), executor.shutdown)
+
+    if not run_fast_downward.check_backend(args.backend):
+        raise RuntimeError(f"backend {args.backend} no disponible")
+    run_fast_downward.MEMORY_LIMIT = args.memory
+    os.makedirs(run_fast_downward.SAS_CACHE_DIR, exist_ok=True)
+    pool = run_fast_downward.ContainerPool(args.workers).start() if args.backend == "pool" else None
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+
+    def close():
+        executor.shutdown()
+        if pool is not None:
+            pool.close()
+        shutil.rmtree(run_fast_downward.gen_dir(), ignore_errors=True)
+        run_fast_downward._GEN_DIR.clear()
+
+    return (lambda job: executor.submit(run_fast_downward.run_single, *job, backend=args.backend, pool=pool),
+            run_fast_downward.planner_version(args.backend), close)
+
+
+def work(args):
+    """Bucle de un worker: tomar, ejecutar y devolver trabajos hasta vaciar la cola."""
+    module = RUNNERS[args.runner]
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    conn = connect(args.queue)
+    submit, planner_version, close = _open_runner(args.runner, args)
+    heartbeat = _Heartbeat(args.queue, worker)
+    heartbeat.start()
+    log(f"Worker {worker}: {args.workers} ejecuciones en paralelo ({args.runner}) desde {args.queue}")
+    running = {}
+    done = 0
+    try:
+        while True:
+            while len(running) < args.workers:
+                claimed = claim(conn, args.runner, worker)
+                if claimed is None:
+                    break
+                job_id, job, rep = claimed
+                with heartbeat.lock:
+                    heartbeat.ids.add(job_id)
+                running[submit(job)] = claimed
+            if not running:
+                # Others may still die and leave expired leases behind: wait for them
+                state = counts(conn, args.runner)
+                if not state.get("pending") and not state.get("running"):
+                    break
+                time.sleep(POLL)
+                continue
+            finished, _ = wait(running, timeout=POLL, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job_id, job, rep = running.pop(future)
+                with heartbeat.lock:
+                    heartbeat.ids.discard(job_id)
+                try:
+                    r = module.finish(future.result(), job, rep, planner_version, **_setup(args))
+                except Exception as e:
+                    log(f"ERROR  trabajo {job_id}: {e}; se devuelve a la cola")
+                    release(conn, [job_id])
+                    continue
+                r["worker"] = worker
+                complete(conn, job_id, r)
+                done += 1
+    except KeyboardInterrupt:
+        log("Interrumpido: los trabajos en curso vuelven a la cola")
+        release(conn, [claimed[0] for claimed in running.values()])
+        raise
+    finally:
+        heartbeat.stopped.set()
+        close()
+    log(f"Worker {worker}: {done} ejecuciones terminadas, cola vacia")
+
+
+def _planner_version(runner, backend):
+    return version("pyperplan") if runner == "pyperplan" else run_fast_downward.planner_version(backend)
+
+
+def _setup(args):
+    """Runner options that enter the configuration hash, and so the store and queue keys."""
+    return {"mode": args.mode} if args.runner == "pyperplan" else {"backend": args.backend}
+
+
+def _collect_until_done(conn, runner, store, poll):
+    """Anadir resultados al almacen hasta que no quede nada pendiente ni en curso."""
+    while True:
+        # Counts first: a job completed after them is still picked up by this collect
+        state = counts(conn, runner)
+        for r in collect(conn, runner, store):
+            s = "INVALID" if r.get("plan_valid") is False else ("OK" if r["solved"] else "TIMEOUT/FAIL")
+            log(f"  {r['planner']:15s} {r['problem']:5s} #{r.get('rep', 0)} -> {s:12s} "
+                f"plan={str(r['plan_length']):>5s} t={r['time']:.2f}s [{r.get('worker')}]")
+        if not state.get("pending") and not state.get("running"):
+            return state
+        time.sleep(poll)
+
+
+def coordinate(args):
+    """Publicar el barrido de un runner y recoger sus resultados hasta que termine."""
+    module = RUNNERS[args.runner]
+    os.makedirs(module.RESULTS_DIR, exist_ok=True)
+    store = os.path.join(module.RESULTS_DIR, module.STORE_FILE)
+    planner_version = _planner_version(args.runner, args.backend)
+    jobs, keys = module.build_jobs(args.suite, args.repeat, store, planner_version, rerun=args.rerun,
+                                   **_setup(args))
+    conn = connect(args.queue)
+    pending = publish(conn, args.runner, jobs, _setup(args))
+    log(f"Publicados {len(jobs)} trabajos en {args.queue} ({pending} pendientes), "
+        f"{len(keys) - len(jobs)} ya en {store}")
+
+    state = _collect_until_done(conn, args.runner, store, args.poll)
+    log(f"Cola vacia: {state.get('done', 0)} terminados, {state.get('failed', 0)} fallidos. Guardado en {store}")
+
+
+def local_check(args):
+    """Coordinador y --workers workers en esta maquina sobre una cola y un almacen temporales.
+
+    Devuelve 0 si cada trabajo llega al almacen exactamente una vez, 1 si no.
+    """
+    module = RUNNERS[args.runner]
+    tmp = tempfile.mkdtemp(prefix="distributed_check_")
+    queue_file = os.path.join(tmp, "queue.db")
+    store = os.path.join(tmp, module.STORE_FILE)
+    jobs, _ = module.build_jobs(args.suite, args.repeat, store, _planner_version(args.runner, args.backend),
+                                **_setup(args))
+    conn = connect(queue_file)
+    publish(conn, args.runner, jobs, _setup(args))
+    log(f"Comprobacion local: {len(jobs)} trabajos, {args.workers} workers, cola en {queue_file}")
+
+    cmd = [sys.executable, os.path.abspath(__file__), "--queue", queue_file, "worker", "--runner", args.runner,
+           "--workers", "1", "--memory", args.memory, "--mode", args.mode, "--backend", args.backend]
+    workers = [subprocess.Popen(cmd) for _ in range(args.workers)]
+    try:
+        state = _collect_until_done(conn, args.runner, store, args.poll)
+    finally:
+        for p in workers:
+            try:
+                p.wait(timeout=LEASE)
+            except subprocess.TimeoutExpired:
+                p.kill()
+                p.wait()
+
+    lines = 0
+    if os.path.exists(store):
+        with open(store) as f:
+            lines = sum(1 for line in f if line.strip())
+    records = results_store.load(store)
+    per_worker = Counter(r.get("worker") for r in records)
+    problems = []
+    if len(records) != len(jobs):
+        problems.append(f"{len(records)} resultados en el almacen para {len(jobs)} trabajos")
+    if lines != len(records):
+        problems.append(f"{lines - len(records)} resultados duplicados")
+    if state.get("failed"):
+        problems.append(f"{state['failed']} trabajos fallidos")
+    if conn.execute("SELECT COUNT(*) FROM jobs WHERE state = 'done' AND collected = 0").fetchone()[0]:
+        problems.append("resultados terminados sin recoger")
+    if any(p.returncode for p in workers):
+        problems.append("workers con codigo de salida " + ", ".join(str(p.returncode) for p in workers))
+
+    log("Resultados por worker: " + ", ".join(f"{w}={n}" for w, n in sorted(per_worker.items())))
+    if len(per_worker) < min(args.workers, len(jobs)):
+        log("Aviso: no todos los workers llegaron a tomar trabajos (barrido demasiado corto)")
+    if problems:
+        for problem in problems:
+            log(f"FALLO  {problem}")
+        log(f"Cola y almacen conservados en {tmp}")
+        return 1
+    shutil.rmtree(tmp, ignore_errors=True)
+    log("OK: cada trabajo llego al almacen una sola vez")
+    return 0
+
+
+def show_status(args):
+    conn = connect(args.queue)
+    for runner in RUNNERS:
+        state = counts(conn, runner)
+        if state:
+            log(f"{runner}: " + ", ".join(f"{k}={v}" for k, v in sorted(state.items())))
+    for worker, n in conn.execute("SELECT worker, COUNT(*) FROM jobs WHERE state = 'running' GROUP BY worker"):
+        log(f"  {worker}: {n} en curso")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queue", default=QUEUE_FILE, help="fichero SQLite de la cola")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    coord = sub.add_parser("coordinator", help="publicar un barrido y recoger sus resultados")
+    coord.add_argument("--runner", choices=tuple(RUNNERS), required=True)
+    coord.add_argument("--suite", default=suites.DEFAULT_SUITE,
+                       help="suite de instancias (JSON, ver suites/)")
+    coord.add_argument("--repeat", type=int, default=1, help="repeticiones de cada ejecucion")
+    coord.add_argument("--rerun", action="store_true",
+                       help="volver a ejecutar aunque ya haya resultados en el almacen")
+    coord.add_argument("--backend", choices=run_fast_downward.BACKENDS, default="docker",
+                       help="backend con el que se obtiene la version de Fast Downward")
+    coord.add_argument("--mode", choices=tuple(run_pyperplan.RUNNERS), default="subprocess",
+                       help="modo de ejecucion de pyperplan de los workers (forma parte de la clave)")
+    coord.add_argument("--poll", type=float, default=POLL, help="segundos entre recogidas")
+
+    worker = sub.add_parser("worker", help="ejecutar trabajos de la cola")
+    worker.add_argument("--runner", choices=tuple(RUNNERS), required=True)
+    worker.add_argument("--workers", type=int, default=None,
+                        help="ejecuciones en paralelo (por defecto segun CPU y RAM)")
+    worker.add_argument("--memory", default="4g", help="limite de memoria por ejecucion")
+    worker.add_argument("--mode", choices=tuple(run_pyperplan.RUNNERS), default="subprocess",
+                        help="modo de ejecucion de pyperplan")
+    worker.add_argument("--backend", choices=run_fast_downward.BACKENDS, default="docker",
+                        help="backend de Fast Downward")
+
+    sub.add_parser("status", help="estado de la cola")
+
+    check = sub.add_parser("check", help="probar coordinador y varios workers en esta maquina")
+    check.add_argument("--runner", choices=tuple(RUNNERS), default="pyperplan")
+    check.add_argument("--suite", default=suites.DEFAULT_SUITE,
+                       help="suite de instancias (JSON, ver suites/)")
+    check.add_argument("--repeat", type=int, default=1, help="repeticiones de cada ejecucion")
+    check.add_argument("--workers", type=int, default=2, help="procesos worker a lanzar")
+    check.add_argument("--memory", default="4g", help="limite de memoria por ejecucion")
+    check.add_argument("--mode", choices=tuple(run_pyperplan.RUNNERS), default="subprocess",
+                       help="modo de ejecucion de pyperplan")
+    check.add_argument("--backend", choices=run_fast_downward.BACKENDS, default="docker",
+                       help="backend de Fast Downward")
+    check.add_argument("--poll", type=float, default=POLL, help="segundos entre recogidas")
+    args = parser.parse_args(argv)
+    if args.command == "worker":
+        args.workers = args.workers or scheduler.pool_size(args.memory)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(os.path.dirname(os.path.abspath(args.queue)), exist_ok=True)
+    return {"coordinator": coordinate, "worker": work, "status": show_status, "check": local_check}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
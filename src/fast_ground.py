@@ -0,0 +1,330 @@
+"""
+Front end acelerado de pyperplan para las instancias grandes: grounding por
+alcanzabilidad y heuristicas h_add / h_FF vectorizadas con NumPy.
+
+- `ground` instancia cada accion solo con las asignaciones cuyas
+  precondiciones son alcanzables (punto fijo relajado, sin borrados): une las
+  precondiciones contra los atomos ya alcanzados en lugar de recorrer el
+  producto de objetos por tipo como hace el grounder de pyperplan. Devuelve un
+  `pyperplan.task.Task` normal, asi que las busquedas, la validacion y la
+  telemetria no cambian.
+- `HEURISTICS` internan los hechos como enteros y guardan los operadores en
+  arrays (precondiciones y efectos aplanados). h_add se calcula como punto
+  fijo de Bellman-Ford en el que cada iteracion es un par de operaciones NumPy
+  sobre todos los operadores a la vez; h_FF extrae el plan relajado desde los
+  mejores productores. h_add da los mismos valores que pyperplan; en h_FF los
+  empates entre productores pueden romperse distinto. Con los nodos de
+  compact_search leen el estado directamente de sus bits.
+
+Lo usan las configuraciones `PP-*-NP` de run_pyperplan (siempre en proceso).
+"""
+
+from collections import defaultdict, deque
+
+import numpy as np
+
+INF = float("inf")
+
+
+# -- grounding ----------------------------------------------------------------
+
+def _atom(name, args):
+    """Fact string in pyperplan's lisp notation, e.g. "(on a b)"."""
+    return f"({name} {' '.join(args)})" if args else f"({name})"
+
+
+def _objects_of(types, type_map):
+    objects = set()
+    for t in types:
+        objects |= type_map[t]
+    return objects
+
+
+class _Atoms:
+    """Reached atoms per predicate, indexed by (predicate, position, object)."""
+
+    def __init__(self):
+        self.by_pred = defaultdict(set)
+        self.by_arg = defaultdict(list)
+
+    def add(self, name, args):
+        if args in self.by_pred[name]:
+            return False
+        self.by_pred[name].add(args)
+        for pos, obj in enumerate(args):
+            self.by_arg[name, pos, obj].append(args)
+        return True
+
+    def matching(self, name, terms, params, binding):
+        """Candidate tuples for an atom: the index of its first bound term, if any."""
+        for pos, term in enumerate(terms):
+            if term not in params:
+                return self.by_arg.get((name, pos, term), ())
+            if term in binding:
+                return self.by_arg.get((name, pos, binding[term]), ())
+        return self.by_pred[name]
+
+
+def _join_order(params, pre, bound=()):
+    """Preconditions in join order: next the atom with fewest parameters still unbound."""
+    order, bound, left = [], set(bound), list(pre)
+    while left:
+        atom = min(left, key=lambda a: len({t for t in a[1] if t in params} - bound))
+        left.remove(atom)
+        order.append(atom)
+        bound.update(t for t in atom[1] if t in params)
+    return order
+
+
+def _unify(terms, args, params, domains):
+    """Binding that maps the atom `terms` onto `args`, or None if they don't match."""
+    if len(terms) != len(args):
+        return None
+    binding = {}
+    for term, obj in zip(terms, args):
+        if term not in params:
+            if term != obj:  # constant
+                return None
+        elif term in binding:
+            if binding[term] != obj:
+                return None
+        elif obj in domains[term]:
+            binding[term] = obj
+        else:
+            return None
+    return binding
+
+
+def _bindings(params, order, atoms, domains, binding):
+    """Extensions of `binding` under which every atom of `order` has been reached.
+
+    Joins the preconditions in `order` (see _join_order); parameters no
+    precondition mentions range over their type.
+    """
+    results = []
+
+    def extend(i):
+        if i == len(order):
+            free = [p for p in params if p not in binding]
+            if not free:
+                results.append(dict(binding))
+                return
+            p = free[0]
+            for obj in domains[p]:
+                binding[p] = obj
+                extend(i)
+            del binding[p]
+            return
+        name, terms = order[i]
+        for args in atoms.matching(name, terms, params, binding):
+            if len(args) != len(terms):
+                continue
+            added = []
+            for term, obj in zip(terms, args):
+                if term not in params:
+                    ok = term == obj
+                elif term in binding:
+                    ok = binding[term] == obj
+                else:
+                    ok = obj in domains[term]
+                    if ok:
+                        binding[term] = obj
+                        added.append(term)
+                if not ok:
+                    break
+            else:
+                extend(i + 1)
+            for term in added:
+                del binding[term]
+
+    extend(0)
+    return results
+
+
+def _substitute(schema_atoms, binding):
+    return {(name, tuple(binding.get(t, t) for t in terms)) for name, terms in schema_atoms}
+
+
+class _Schema:
+    """Accion sin instanciar, con un orden de join por cada precondicion disparadora."""
+
+    def __init__(self, action, type_map, statics):
+        def terms(atom):
+            return tuple(name for name, _ in atom.signature)
+
+        self.name = action.name
+        self.params = [name for name, _ in action.signature]
+        self.domains = {name: _objects_of(types, type_map) for name, types in action.signature}
+        self.pre = [(p.name, terms(p)) for p in action.precondition]
+        self.add = [(p.name, terms(p)) for p in action.effect.addlist]
+        self.delete = [(p.name, terms(p)) for p in action.effect.dellist]
+        # Once precondition k matches a new atom, the rest are joined in this order
+        self.rest = [_join_order(self.params, self.pre[:k] + self.pre[k + 1:], bound=self.pre[k][1])
+                     for k in range(len(self.pre))]
+        # Fact strings as format templates over the argument tuple; statics are implied
+        self.pre_facts = [self._template(a) for a in self.pre if a[0] not in statics]
+        self.add_facts = [self._template(a) for a in self.add]
+        self.del_facts = [self._template(a) for a in self.delete]
+
+    def _template(self, atom):
+        name, terms = atom
+        return _atom(name, ["{%d}" % self.params.index(t) if t in self.params else t for t in terms])
+
+    def operator(self, args):
+        """(pre, add, del) de la instancia con argumentos `args`, como en pyperplan."""
+        pre = {t.format(*args) for t in self.pre_facts}
+        add = {t.format(*args) for t in self.add_facts}
+        # del \ add, add \ pre
+        return pre, add - pre, {t.format(*args) for t in self.del_facts} - add
+
+
+def ground(problem):
+    """Tarea STRIPS grounded (pyperplan Task) con solo los operadores alcanzables."""
+    from pyperplan.grounding import _create_type_map, _get_statics, _relevance_analysis
+    from pyperplan.task import Operator, Task
+
+    domain = problem.domain
+    actions = list(domain.actions.values())
+    objects = dict(problem.objects)
+    objects.update(domain.constants)
+    type_map = _create_type_map(objects)
+    statics = set(_get_statics(domain.predicates.values(), actions))
+    schemas = [_Schema(action, type_map, statics) for action in actions]
+    triggers = defaultdict(list)
+    for schema in schemas:
+        for k, (name, _) in enumerate(schema.pre):
+            triggers[name].append((schema, k))
+
+    atoms = _Atoms()
+    queue = deque()
+    seen = set()
+    operators = []
+
+    def reach(name, args):
+        if atoms.add(name, args):
+            queue.append((name, args))
+
+    def instantiate(schema, binding):
+        args = tuple(binding[p] for p in schema.params)
+        if (schema.name, args) in seen:
+            return
+        seen.add((schema.name, args))
+        for atom in _substitute(schema.add, binding):
+            reach(*atom)
+        operators.append(Operator(_atom(schema.name, args), *schema.operator(args)))
+
+    # Relaxed reachability as a worklist: every newly reached atom seeds the
+    # joins of the preconditions it matches, against the atoms reached so far
+    for atom in problem.initial_state:
+        reach(atom.name, tuple(name for name, _ in atom.signature))
+    init = {_atom(name, args) for name, args in queue}
+    for schema in schemas:
+        if not schema.pre:
+            for binding in _bindings(schema.params, [], atoms, schema.domains, {}):
+                instantiate(schema, binding)
+    while queue:
+        name, args = queue.popleft()
+        for schema, k in triggers[name]:
+            seed = _unify(schema.pre[k][1], args, schema.params, schema.domains)
+            if seed is not None:
+                for binding in _bindings(schema.params, schema.rest[k], atoms, schema.domains, seed):
+                    instantiate(schema, binding)
+
+    goals = frozenset(_atom(atom.name, tuple(name for name, _ in atom.signature)) for atom in problem.goal)
+    facts = set(goals)
+    for op in operators:
+        facts |= op.preconditions | op.add_effects | op.del_effects
+    operators = _relevance_analysis(operators, goals)
+    return Task(problem.name, facts, frozenset(init & facts), goals, operators)
+
+
+# -- heuristics ---------------------------------------------------------------
+
+class _NumpyRelaxation:
+    """Delete relaxation over integer facts and flat operator arrays.
+
+    `pre_ops`/`pre_facts` list every (operator, precondition) pair; the add
+    effects are sorted by fact so one `minimum.reduceat` gives the cheapest
+    achiever cost of every fact.
+    """
+
+    def __init__(self, task):
+        self.index = {fact: i for i, fact in enumerate(sorted(task.facts))}
+        n_facts = len(self.index)
+        self.n_ops = len(task.operators)
+        self.pre = [[self.index[f] for f in op.preconditions] for op in task.operators]
+        self.pre_ops = np.array([o for o, pre in enumerate(self.pre) for _ in pre], dtype=np.intp)
+        self.pre_facts = np.array([f for pre in self.pre for f in pre], dtype=np.intp)
+        adds = sorted((self.index[f], o) for o, op in enumerate(task.operators) for f in op.add_effects)
+        self.add_facts = np.array([f for f, _ in adds], dtype=np.intp)
+        self.add_ops = np.array([o for _, o in adds], dtype=np.intp)
+        # Segment starts of add_facts, one per fact with at least one achiever
+        self.achieved, self.starts = np.unique(self.add_facts, return_index=True)
+        self.goals = np.array([self.index[f] for f in task.goals], dtype=np.intp)
+        self.dist = np.empty(n_facts)
+        self.n_bytes = (n_facts + 7) // 8
+
+    def _state(self, node):
+        """Fact indices of a node's state; compact_search nodes carry it as bits."""
+        bits = getattr(node, "bits", None)
+        if bits is None:
+            return [self.index[f] for f in node.state]
+        # Bit i is the i-th fact of sorted(task.facts), the same order as self.index
+        packed = np.frombuffer(bits.to_bytes(self.n_bytes, "little"), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(packed, bitorder="little"))
+
+    def hadd(self, node):
+        """Distancias h_add de todos los hechos y coste de cada operador."""
+        dist = self.dist
+        dist.fill(INF)
+        dist[self._state(node)] = 0.0
+        while True:
+            cost = np.bincount(self.pre_ops, weights=dist[self.pre_facts], minlength=self.n_ops) + 1.0
+            if not len(self.add_ops):
+                return dist, cost
+            best = np.minimum.reduceat(cost[self.add_ops], self.starts)
+            improved = best < dist[self.achieved]
+            if not improved.any():
+                return dist, cost
+            dist[self.achieved[improved]] = best[improved]
+
+
+class NumpyHAdd(_NumpyRelaxation):
+    """h_add vectorizado: suma de las distancias h_add de las metas."""
+
+    def __call__(self, node):
+        dist, _ = self.hadd(node)
+        return float(dist[self.goals].sum()) if len(self.goals) else 0
+
+
+class NumpyHFF(_NumpyRelaxation):
+    """h_FF vectorizado: tamano del plan relajado de los productores h_add."""
+
+    def __call__(self, node):
+        dist, cost = self.hadd(node)
+        if not len(self.goals):
+            return 0
+        if np.isinf(dist[self.goals]).any():
+            return INF
+        # Cheapest achiever of every fact: first operator of its segment with cost == dist
+        costs = cost[self.add_ops]
+        cheapest = np.flatnonzero(costs == dist[self.add_facts])
+        facts, first = np.unique(self.add_facts[cheapest], return_index=True)
+        achiever = dict(zip(facts.tolist(), self.add_ops[cheapest[first]].tolist()))
+
+        plan = set()
+        closed = set(self.goals.tolist())
+        queue = list(closed)
+        while queue:
+            op = achiever.get(queue.pop())
+            if op is None or op in plan:
+                continue
+            plan.add(op)
+            for f in self.pre[op]:
+                if f not in closed:
+                    closed.add(f)
+                    queue.append(f)
+        return len(plan)
+
+
+HEURISTICS = {"hadd": NumpyHAdd, "hff": NumpyHFF}
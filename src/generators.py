@@ -0,0 +1,107 @@
+"""
+Generadores de instancias parametrizadas (tamano, semilla) para los dominios
+de domains/.
+
+Una instancia generada se identifica con una referencia textual del tipo
+`gen:blocksworld?n=50&seed=1`, que viaja por la cola de trabajos en lugar de
+una ruta. El texto PDDL se genera bajo demanda y es determinista para una
+misma referencia, asi que sirve como clave de cache.
+
+- blocksworld: n bloques; estado inicial y meta son dos configuraciones de
+  torres aleatorias independientes (cada bloque va a la mesa o encima de una
+  torre existente).
+- gripper: n pelotas y dos habitaciones; con seed=0 es el gripper clasico
+  (todas de rooma a roomb), con otra semilla cada pelota empieza en una
+  habitacion al azar y su meta es la otra.
+"""
+
+import random
+from urllib.parse import parse_qsl
+
+PREFIX = "gen:"
+
+
+def _towers(blocks, rng):
+    """Random tower configuration -> {block: block below it or None (table)}."""
+    below = {}
+    tops = []
+    for block in rng.sample(blocks, len(blocks)):
+        # Table with the same probability as each existing tower
+        k = rng.randrange(len(tops) + 1)
+        if k == len(tops):
+            below[block] = None
+            tops.append(block)
+        else:
+            below[block] = tops[k]
+            tops[k] = block
+    return below
+
+
+def blocksworld(n, seed=0):
+    """Problema de Blocksworld con `n` bloques."""
+    rng = random.Random(f"blocksworld-{n}-{seed}")
+    blocks = [f"b{i}" for i in range(1, n + 1)]
+    init = _towers(blocks, rng)
+    goal = _towers(blocks, rng)
+
+    covered = {b for b in init.values() if b}
+    init_facts = [f"(on {b} {u})" if u else f"(ontable {b})" for b, u in init.items()]
+    init_facts += [f"(clear {b})" for b in blocks if b not in covered] + ["(handempty)"]
+    goal_facts = [f"(on {b} {u})" for b, u in goal.items() if u] or [f"(ontable {b})" for b in blocks]
+    return (
+        f"(define (problem blocks-{n}-{seed})\n"
+        "(:domain BLOCKS)\n"
+        f"(:objects {' '.join(blocks)} - block)\n"
+        f"(:init {' '.join(init_facts)})\n"
+        f"(:goal (and {' '.join(goal_facts)}))\n"
+        ")\n"
+    )
+
+
+def gripper(n, seed=0):
+    """Problema de Gripper con `n` pelotas."""
+    rng = random.Random(f"gripper-{n}-{seed}")
+    balls = [f"ball{i}" for i in range(1, n + 1)]
+    rooms = ("rooma", "roomb")
+    start = {b: rng.choice(rooms) if seed else "rooma" for b in balls}
+    init_facts = [f"(room {r})" for r in rooms] + [f"(ball {b})" for b in balls]
+    init_facts += ["(at-robby rooma)", "(free left)", "(free right)", "(gripper left)", "(gripper right)"]
+    init_facts += [f"(at {b} {start[b]})" for b in balls]
+    goal_facts = [f"(at {b} {'roomb' if start[b] == 'rooma' else 'rooma'})" for b in balls]
+    return (
+        f"(define (problem gripper-{n}-{seed})\n"
+        "(:domain gripper-strips)\n"
+        f"(:objects {' '.join(rooms)} {' '.join(balls)} left right)\n"
+        f"(:init {' '.join(init_facts)})\n"
+        f"(:goal (and {' '.join(goal_facts)}))\n"
+        ")\n"
+    )
+
+
+GENERATORS = {
+    "blocksworld": blocksworld,
+    "gripper": gripper,
+}
+
+
+def ref(generator, n, seed=0):
+    """Referencia de una instancia generada."""
+    return f"{PREFIX}{generator}?n={n}&seed={seed}"
+
+
+def is_generated(problem):
+    return problem.startswith(PREFIX)
+
+
+def parse_ref(problem):
+    """`gen:nombre?n=..&seed=..` -> (nombre, {n, seed})."""
+    name, _, query = problem[len(PREFIX):].partition("?")
+    if name not in GENERATORS:
+        raise ValueError(f"generador desconocido: {name}")
+    return name, {k: int(v) for k, v in parse_qsl(query)}
+
+
+def generate(problem):
+    """Texto PDDL de una instancia generada."""
+    name, params = parse_ref(problem)
+    return GENERATORS[name](**params)
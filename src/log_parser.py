@@ -0,0 +1,127 @@
+"""
+Parser incremental de la salida de los planificadores (Fast Downward y pyperplan).
+
+Se alimenta linea a linea mientras el proceso se ejecuta (`feed`), con un unico
+patron precompilado para todas las estadisticas. La memoria esta acotada: de
+la salida solo se guardan la cabecera y la cola, y la serie temporal de
+progreso (lineas `f = ..., N expanded` / `New best heuristic value`, con el
+instante `t=` que imprime el planificador) va a una telemetry.Series, que se
+diezma cuando supera `max_points`.
+"""
+
+import re
+from collections import deque
+
+import telemetry
+
+# One alternation for every statistic; the named group that matched says which
+PATTERN = re.compile(
+    r"(?P<solved>Solution found|Goal reached)"
+    r"|Plan length: (?P<plan_length>\d+)"
+    r"|Plan cost: (?P<plan_cost>\d+)"
+    r"|Expanded (?P<expanded>\d+) state"
+    r"|Generated (?P<generated>\d+) state"
+    r"|Search time: (?P<search_time>\d[\d.e+-]*?)s?$"
+    r"|Total time: (?P<total_time>[\d.]+)s"
+    r"|Peak memory: (?P<peak_memory>\d+) KB"
+    r"|(?P<pp_expanded>\d+) Nodes expanded"
+    r"|(?:f = (?P<f>\d+)|g=(?P<g>\d+))\D+?(?P<p_evaluated>\d+) evaluated, (?P<p_expanded>\d+) expanded"
+    r"|(?:New best|Initial) heuristic value for [^:]+: (?P<best_h>\d+)"
+    r"|Initial h value: (?P<init_h>[\d.]+)"
+    r"|(?P<memout>MemoryError|Memory limit has been reached)"
+)
+
+# Planner-side timestamp of a progress line: "[t=0.01s, ..." (FD >= 20.06) or ", t=0.01s" (older)
+STAMP = re.compile(r"\bt=(?P<t>[\d.]+)s")
+
+_INT = {"plan_length", "plan_cost", "expanded", "generated", "peak_memory"}
+_FLOAT = {"search_time", "total_time"}
+
+
+class LogParser:
+    """Estadisticas, incumbentes y serie de progreso a partir de lineas de log."""
+
+    def __init__(self, head=2000, tail=2000, max_points=256, on_incumbent=None):
+        self.stats = {
+            "solved": False, "plan_length": None, "plan_cost": None,
+            "nodes_expanded": None, "nodes_generated": None,
+            "search_time": None, "total_time": None, "peak_memory_kb": None,
+            "memout": False,
+        }
+        self.incumbents = []
+        self.telemetry = telemetry.Series(max_points)
+        self.on_incumbent = on_incumbent
+        self._best_h = None
+        self._head = []
+        self._head_left = head
+        self._tail = deque()
+        self._tail_size = 0
+        self._tail_max = tail
+        self._dropped = 0
+
+    # -- output buffer --------------------------------------------------------
+
+    def _keep(self, line):
+        if self._head_left > 0:
+            piece = line[:self._head_left]
+            self._head.append(piece)
+            self._head_left -= len(piece)
+            line = line[len(piece):]
+            if not line:
+                return
+        self._tail.append(line)
+        self._tail_size += len(line)
+        while self._tail_size > self._tail_max and len(self._tail) > 1:
+            self._tail_size -= len(self._tail.popleft())
+            self._dropped += 1
+
+    @property
+    def output(self):
+        head = "".join(self._head)
+        tail = "".join(self._tail)
+        if self._dropped:
+            return f"{head}\n[... {self._dropped} lineas omitidas ...]\n{tail}"
+        return head + tail
+
+    # -- parsing --------------------------------------------------------------
+
+    def feed(self, line, t=None):
+        """Procesar una linea; `t` es el instante (s desde el inicio) en que se leyo."""
+        self._keep(line if line.endswith("\n") else line + "\n")
+        m = PATTERN.search(line)
+        if m is None:
+            return
+        key = m.lastgroup
+        value = m.group(key)
+        stats = self.stats
+        if key == "solved":
+            stats["solved"] = True
+        elif key == "memout":
+            stats["memout"] = True
+        elif key == "pp_expanded":
+            # pyperplan logs one count per search; anytime restarts add up
+            stats["nodes_expanded"] = (stats["nodes_expanded"] or 0) + int(value)
+        elif key in ("p_expanded", "g", "f"):
+            # Prefer the planner's own clock: the read time lags when output is buffered
+            stamp = STAMP.search(line)
+            self.telemetry.add(float(stamp.group("t")) if stamp else t, int(m.group("p_expanded")), int(m.group("p_evaluated")),
+                               self._best_h, int(m.group("f")) if m.group("f") else None)
+        elif key in ("best_h", "init_h"):
+            self._best_h = int(float(value))
+        elif key in _INT:
+            name = {"expanded": "nodes_expanded", "generated": "nodes_generated",
+                    "peak_memory": "peak_memory_kb"}.get(key, key)
+            stats[name] = int(value)
+            if key == "plan_cost":
+                self._incumbent(int(value), t)
+        elif key in _FLOAT:
+            stats[key] = float(value)
+
+    def _incumbent(self, cost, t):
+        if self.incumbents and cost >= self.incumbents[-1]["cost"]:
+            return
+        inc = {"time": None if t is None else round(t, 4), "cost": cost,
+               "length": self.stats["plan_length"]}
+        self.incumbents.append(inc)
+        if self.on_incumbent is not None:
+            self.on_incumbent(inc)
@@ -0,0 +1,244 @@
+"""
+Medicion de recursos por ejecucion: tiempo de pared monotono (perf_counter),
+CPU user+sys y pico de memoria residente del proceso hijo.
+
+- Procesos locales: os.wait4 devuelve el rusage exacto del hijo (incluye a
+  sus descendientes ya esperados, p.ej. traductor y busqueda de FD).
+- Contenedores: el mismo wait4 se hace dentro del contenedor con
+  RUSAGE_WRAPPER, que imprime el rusage en una linea marcada de stderr.
+- En proceso (pyperplan inprocess): deltas de getrusage(RUSAGE_SELF) y el
+  pico de RSS reiniciado via /proc/self/clear_refs cuando es posible. Antes
+  se devuelve al sistema la memoria libre del heap (`release_memory`) para
+  que una ejecucion no aproveche la que dejo la anterior.
+"""
+
+import ctypes
+import gc
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    _malloc_trim = ctypes.CDLL("libc.so.6").malloc_trim
+except (OSError, AttributeError):  # not glibc
+    _malloc_trim = None
+
+RUSAGE_MARKER = "@@rusage "
+
+# Runs argv[1:] as a child, waits for it with wait4 and reports its rusage.
+# Executed with the container's own python3, so it must stay self-contained.
+RUSAGE_WRAPPER = (
+    "import json,os,subprocess,sys\n"
+    "p=subprocess.Popen(sys.argv[1:])\n"
+    "_,st,ru=os.wait4(p.pid,0)\n"
+    "sys.stderr.write('" + RUSAGE_MARKER + "'+json.dumps({'cpu_user':ru.ru_utime,"
+    "'cpu_sys':ru.ru_stime,'maxrss':ru.ru_maxrss})+'\\n')\n"
+    "sys.exit(os.waitstatus_to_exitcode(st))\n"
+)
+
+
+# Placeholder when a measurement is not available (e.g. a killed container)
+NO_USAGE = {"cpu_user": None, "cpu_sys": None, "cpu_time": None, "peak_rss_kb": None}
+
+
+class MeasuredTimeout(subprocess.TimeoutExpired):
+    """TimeoutExpired que conserva la salida y el uso de recursos hasta el kill."""
+
+    def __init__(self, cmd, timeout, output, stderr, usage):
+        super().__init__(cmd, timeout, output, stderr)
+        self.usage = usage
+
+
+class MeasuredCancelled(MeasuredTimeout):
+    """El proceso se mato antes del timeout porque se activo `cancel`."""
+
+
+def _maxrss_kb(maxrss):
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+
+def _usage(ru, wall):
+    return {
+        "wall_time": wall,
+        "cpu_user": ru.ru_utime,
+        "cpu_sys": ru.ru_stime,
+        "cpu_time": ru.ru_utime + ru.ru_stime,
+        "peak_rss_kb": _maxrss_kb(ru.ru_maxrss),
+    }
+
+
+def run_measured(cmd, timeout, on_line=None, cancel=None, on_kill=None, **kwargs):
+    """subprocess.run(capture_output=True, text=True) con medicion de recursos.
+
+    Devuelve (CompletedProcess, usage). En timeout mata al hijo y lanza
+    MeasuredTimeout con lo medido hasta entonces. Si se pasa `on_line`, stderr
+    se mezcla con stdout y se llama con (linea, segundos desde el inicio) por
+    cada linea a medida que el hijo la escribe; la salida no se acumula (el
+    CompletedProcess lleva stdout/stderr vacios).
+
+    `cancel` (threading.Event) mata al hijo en cuanto se activa y lanza
+    MeasuredCancelled. `on_kill()` se llama tras matar el grupo de procesos,
+    para limpiar lo que vive fuera de el (p.ej. `docker rm -f`).
+    """
+    if not hasattr(os, "wait4"):
+        start = time.perf_counter()
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, **kwargs)
+        return result, {"wall_time": time.perf_counter() - start, **NO_USAGE}
+
+    start = time.perf_counter()
+    # Own session, so a timeout can kill the whole process group (FD's driver
+    # spawns translator and search as grandchildren that hold our pipes)
+    streaming = on_line is not None
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT if streaming else subprocess.PIPE,
+                            text=True, start_new_session=True, **kwargs)
+    chunks = {"stdout": [], "stderr": []}
+
+    def _read(name, pipe):
+        if streaming:
+            for line in pipe:
+                on_line(line, time.perf_counter() - start)
+        else:
+            chunks[name].append(pipe.read())
+        pipe.close()
+
+    readers = [threading.Thread(target=_read, args=(n, getattr(proc, n)), daemon=True)
+               for n in (("stdout",) if streaming else ("stdout", "stderr"))]
+    for t in readers:
+        t.start()
+    killed = []
+    kill_lock = threading.Lock()
+    finished = threading.Event()
+
+    def _kill(reason):
+        with kill_lock:
+            if killed:
+                return
+            killed.append(reason)
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        if on_kill is not None:
+            on_kill()
+
+    def _watch_cancel():
+        while not finished.wait(0.05):
+            if cancel.is_set():
+                _kill("cancel")
+                return
+
+    timer = threading.Timer(timeout, _kill, args=("timeout",))
+    timer.start()
+    if cancel is not None:
+        threading.Thread(target=_watch_cancel, daemon=True).start()
+    try:
+        _, status, ru = os.wait4(proc.pid, 0)
+    finally:
+        finished.set()
+        timer.cancel()
+    wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    for t in readers:
+        t.join()
+    stdout, stderr = "".join(chunks["stdout"]), "".join(chunks["stderr"])
+    usage = _usage(ru, wall)
+    if killed:
+        error = MeasuredCancelled if killed[0] == "cancel" else MeasuredTimeout
+        raise error(cmd, timeout, stdout, stderr, usage)
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr), usage
+
+
+def wrapper_usage(line):
+    """Uso de recursos de una linea de RUSAGE_WRAPPER, o None si no lo es."""
+    if not line.startswith(RUSAGE_MARKER):
+        return None
+    ru = json.loads(line[len(RUSAGE_MARKER):])
+    return {
+        "cpu_user": ru["cpu_user"], "cpu_sys": ru["cpu_sys"],
+        "cpu_time": ru["cpu_user"] + ru["cpu_sys"],
+        "peak_rss_kb": ru["maxrss"],  # containers are Linux: already KB
+    }
+
+
+def release_memory():
+    """Recoger basura y devolver al sistema el heap libre (glibc malloc_trim)."""
+    gc.collect()
+    if _malloc_trim is not None:
+        _malloc_trim(0)
+
+
+def reset_peak_rss():
+    """Reiniciar el pico de RSS del proceso actual (Linux >= 4.0)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def rss_kb():
+    """RSS actual del proceso (VmRSS), o None si no hay /proc."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_kb():
+    """Pico de RSS del proceso actual: VmHWM si existe, ru_maxrss si no."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    return _maxrss_kb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+class SelfUsage:
+    """Medicion en proceso: CPU y pico de RSS entre start() y stop()."""
+
+    def start(self):
+        release_memory()
+        reset_peak_rss()
+        self._ru = resource.getrusage(resource.RUSAGE_SELF) if resource else None
+        self._t = time.perf_counter()
+        return self
+
+    def elapsed(self):
+        return time.perf_counter() - self._t
+
+    def stop(self):
+        wall = time.perf_counter() - self._t
+        if self._ru is None:
+            return {"wall_time": wall, **NO_USAGE}
+        ru = resource.getrusage(resource.RUSAGE_SELF)
+        user = ru.ru_utime - self._ru.ru_utime
+        sys_ = ru.ru_stime - self._ru.ru_stime
+        return {"wall_time": wall, "cpu_user": user, "cpu_sys": sys_,
+                "cpu_time": user + sys_, "peak_rss_kb": peak_rss_kb()}
+
+
+def rounded(usage, ndigits=4):
+    """Campos de uso listos para el dict de resultado."""
+    return {k: (round(v, ndigits) if isinstance(v, float) else v)
+            for k, v in usage.items() if k != "wall_time"}
@@ -0,0 +1,295 @@
+"""
+Modo portfolio: varias configuraciones de pyperplan y Fast Downward sobre una
+misma instancia, para obtener un plan lo antes posible.
+
+- race: todas las configuraciones a la vez; gana el primer plan (o el primero
+  con coste <= --cost-bound, que con FD se detecta en cuanto aparece en la
+  salida) y el resto de procesos y contenedores se matan en el acto.
+- schedule: las configuraciones en secuencia, cada una con su rodaja de
+  tiempo. El calendario se aprende de los resultados ya guardados con un
+  greedy que en cada paso elige la configuracion y el tiempo que resuelven
+  mas instancias nuevas por segundo.
+
+Cada ejecucion del portfolio se anade a results/portfolio_results.jsonl.
+
+Uso:
+    python src/portfolio.py blocksworld BW-3 --mode race --cost-bound 30
+    python src/portfolio.py gripper GR-4 --mode schedule --budget 120
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import results_store
+import run_fast_downward
+import run_pyperplan
+import suites
+import validate
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BASE_DIR, "results")
+STORE_FILE = "portfolio_results.jsonl"
+HISTORY_FILES = ("pyperplan_results.jsonl", "fast_downward_results.jsonl")
+DEFAULT_CONFIGS = ["FD-LAMA", "FD-GBFS-FF", "PP-GBF-FF"]
+BUDGET = 120  # total time of a sequential schedule
+MIN_SLICE = 1.0  # below this a run is mostly process/container startup
+SLICE_MARGIN = 1.2  # headroom over the observed time of the slowest covered instance
+
+PROBLEMS = suites.load()
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+def _planner_of(config_name):
+    if config_name in run_pyperplan.CONFIGS:
+        if run_pyperplan.inprocess_only(config_name):
+            raise ValueError(f"{config_name} solo se ejecuta en proceso y no se puede cancelar")
+        return "pyperplan"
+    if config_name in run_fast_downward.CONFIGS:
+        return "fd"
+    raise ValueError(f"configuracion desconocida: {config_name}")
+
+
+def _instance(domain_name, prob_id):
+    """(domain path, problem path or gen ref, complexity) from the loaded suite."""
+    info = PROBLEMS.get(domain_name)
+    if info is None:
+        raise ValueError(f"dominio desconocido: {domain_name}")
+    for pid, problem, cx in info["instances"]:
+        if pid == prob_id:
+            return info["domain"], problem, cx
+    raise ValueError(f"problema desconocido: {domain_name}/{prob_id}")
+
+
+def _complexity(domain_name, prob_id):
+    return _instance(domain_name, prob_id)[2]
+
+
+def _launch(config_name, domain_name, prob_id, backend, timeout=None, cancel=None, on_incumbent=None):
+    """Run one member through its planner's runner and validate its plan."""
+    domain_path, problem, complexity = _instance(domain_name, prob_id)
+    domain_file = os.path.join(suites.DOMAINS_DIR, domain_path)
+    problem_file = suites.resolve(problem)
+    if _planner_of(config_name) == "pyperplan":
+        cfg = run_pyperplan.CONFIGS[config_name]
+        r = run_pyperplan.run_single(domain_file, problem_file, cfg["search"], cfg["heuristic"],
+                                     config_name, prob_id, domain_name, complexity,
+                                     timeout=timeout, cancel=cancel)
+    else:
+        cfg = run_fast_downward.CONFIGS[config_name]
+        r = run_fast_downward.run_single(domain_path, problem, cfg["pre"], cfg["post"],
+                                         config_name, prob_id, domain_name, complexity,
+                                         backend=backend, timeout=timeout, cancel=cancel,
+                                         on_incumbent=on_incumbent)
+    r.update(validate.check(domain_file, problem_file, r.get("plan_actions")))
+    return r
+
+
+def plan_cost(r):
+    """Plan cost of a result (pyperplan domains are unit cost: the length)."""
+    cost = r.get("plan_cost")
+    return r.get("plan_length") if cost is None else cost
+
+
+def _within(cost, cost_bound):
+    return cost is not None and (cost_bound is None or cost <= cost_bound)
+
+
+def _accepted(r, cost_bound):
+    return r.get("solved") and r.get("plan_valid") is not False and _within(plan_cost(r), cost_bound)
+
+
+def _summary(mode, domain_name, prob_id, cost_bound, members, winner, elapsed):
+    solved = [r for r in members if r.get("solved") and r.get("plan_valid") is not False]
+    if winner is None and solved:
+        # Nothing met the bound: report the cheapest plan found
+        best = min(solved, key=plan_cost)
+        winner = {"planner": best["planner"], "cost": plan_cost(best), "time": None}
+    return {
+        "planner": f"PORTFOLIO-{mode.upper()}", "domain": domain_name, "problem": prob_id,
+        "complexity": _complexity(domain_name, prob_id), "cost_bound": cost_bound,
+        "solved": winner is not None,
+        "within_bound": winner is not None and _within(winner["cost"], cost_bound),
+        "winner": winner and winner["planner"], "plan_cost": winner and winner["cost"],
+        "plan_valid": winner and next(r.get("plan_valid") for r in members if r["planner"] == winner["planner"]),
+        "time": round(winner["time"] if winner and winner["time"] is not None else elapsed, 4),
+        "members": [
+            {"planner": r["planner"], "solved": r.get("solved"), "plan_cost": plan_cost(r),
+             "plan_valid": r.get("plan_valid"),
+             "time": r.get("time"), "output": r["output"] if r["output"] in ("TIMEOUT", "CANCELLED")
+             or r["output"].startswith("ERROR") else "DONE"}
+            for r in members
+        ],
+    }
+
+
+def race(configs, domain_name, prob_id, cost_bound=None, backend="docker", timeout=None):
+    """Run all `configs` concurrently; the first plan within `cost_bound` wins
+    and every other member is killed."""
+    for name in configs:
+        _planner_of(name)
+    cancel = threading.Event()
+    lock = threading.Lock()
+    winner = []
+    start = time.perf_counter()
+
+    def claim(name, cost):
+        with lock:
+            if winner:
+                return
+            winner.append({"planner": name, "cost": cost, "time": time.perf_counter() - start})
+        log(f"WIN    {name}/{prob_id} -> cost={cost} a los {winner[0]['time']:.2f}s")
+        cancel.set()
+
+    def run(name):
+        def on_incumbent(inc):
+            if _within(inc["cost"], cost_bound):
+                claim(name, inc["cost"])
+
+        r = _launch(name, domain_name, prob_id, backend, timeout=timeout, cancel=cancel, on_incumbent=on_incumbent)
+        if _accepted(r, cost_bound):
+            claim(name, plan_cost(r))
+        return r
+
+    with ThreadPoolExecutor(max_workers=len(configs)) as executor:
+        members = list(executor.map(run, configs))
+    return _summary("race", domain_name, prob_id, cost_bound, members,
+                    winner[0] if winner else None, time.perf_counter() - start)
+
+
+def _total_time(r):
+    # Time to a plan from scratch: add grounding/translation when reported apart
+    return r["time"] + (r.get("ground_time") or 0) + (r.get("translate_time") or 0)
+
+
+def learn_schedule(records, configs, budget=BUDGET, margin=SLICE_MARGIN):
+    """Greedy sequential schedule [(config, seconds)] from past results.
+
+    Each step picks the (config, time) pair that solves the most instances
+    not yet covered per second of budget; a config appears at most once. The
+    unused budget goes to the last slice.
+    """
+    times = {}
+    for r in records:
+        if (r["planner"] in configs and r.get("solved") and r.get("plan_valid") is not False
+                and r.get("time") is not None):
+            times.setdefault(r["planner"], {})[(r["domain"], r["problem"])] = _total_time(r)
+
+    schedule = []
+    covered = set()
+    used = 0.0
+    while times:
+        best = None
+        for name, solved in times.items():
+            for t in sorted(set(solved.values())):
+                length = max(t * margin, MIN_SLICE)
+                if used + length > budget:
+                    break
+                gain = sum(1 for inst, ti in solved.items() if ti <= t and inst not in covered)
+                if gain and (best is None or gain / length > best[0]):
+                    best = (gain / length, name, t, length)
+        if best is None:
+            break
+        _, name, t, length = best
+        covered.update(inst for inst, ti in times.pop(name).items() if ti <= t)
+        schedule.append((name, length))
+        used += length
+    if schedule:
+        name, length = schedule[-1]
+        schedule[-1] = (name, length + budget - used)
+    return [(name, round(length, 2)) for name, length in schedule]
+
+
+def run_schedule(schedule, domain_name, prob_id, cost_bound=None, backend="docker"):
+    """Run the schedule slice by slice until a plan within `cost_bound` appears."""
+    members = []
+    start = time.perf_counter()
+    for name, length in schedule:
+        r = _launch(name, domain_name, prob_id, backend, timeout=length)
+        members.append(r)
+        if _accepted(r, cost_bound):
+            winner = {"planner": name, "cost": plan_cost(r), "time": time.perf_counter() - start}
+            return _summary("schedule", domain_name, prob_id, cost_bound, members, winner, winner["time"])
+    return _summary("schedule", domain_name, prob_id, cost_bound, members, None, time.perf_counter() - start)
+
+
+def history():
+    """Latest stored result of every (planner, domain, problem) of both runners."""
+    records = []
+    for name in HISTORY_FILES:
+        records += results_store.latest(results_store.load_any(os.path.join(RESULTS_DIR, name)))
+    return records
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("domain", help="dominio (clave de PROBLEMS, p.ej. blocksworld)")
+    parser.add_argument("problem", help="id del problema (p.ej. BW-3)")
+    parser.add_argument("--mode", choices=("race", "schedule"), default="race")
+    parser.add_argument("--configs", nargs="+", default=None,
+                        help=f"configuraciones de ambos planificadores (race: {' '.join(DEFAULT_CONFIGS)}; "
+                             "schedule: todas las cancelables)")
+    parser.add_argument("--cost-bound", type=int, default=None,
+                        help="aceptar solo planes con coste <= N (por defecto el primer plan)")
+    parser.add_argument("--budget", type=float, default=BUDGET,
+                        help="tiempo total del calendario secuencial (schedule)")
+    parser.add_argument("--backend", choices=("docker", "native"), default="docker",
+                        help="backend de Fast Downward")
+    parser.add_argument("--suite", default=suites.DEFAULT_SUITE,
+                        help="suite donde buscar la instancia (JSON, ver suites/)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global PROBLEMS
+    args = parse_args(argv)
+    PROBLEMS = suites.load(args.suite)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    os.makedirs(run_fast_downward.SAS_CACHE_DIR, exist_ok=True)
+    _complexity(args.domain, args.problem)
+
+    if args.mode == "race":
+        configs = args.configs or DEFAULT_CONFIGS
+    else:
+        configs = args.configs or [
+            name for name in list(run_pyperplan.CONFIGS) + list(run_fast_downward.CONFIGS)
+            if name in run_fast_downward.CONFIGS
+            or not run_pyperplan.inprocess_only(name)
+        ]
+    if any(_planner_of(name) == "fd" for name in configs) and not run_fast_downward.check_backend(args.backend):
+        log(f"ERROR: backend {args.backend} no disponible"); return
+
+    if args.mode == "race":
+        log(f"Race en {args.domain}/{args.problem}: {', '.join(configs)}")
+        result = race(configs, args.domain, args.problem, args.cost_bound, args.backend)
+        spec = {"mode": "race", "configs": sorted(configs)}
+    else:
+        records = history()
+        # Prefer what was learned on the same domain
+        same = [r for r in records if r["domain"] == args.domain]
+        schedule = learn_schedule(same if any(r.get("solved") for r in same) else records, configs, args.budget)
+        if not schedule:
+            log("ERROR: no hay resultados previos con los que aprender un calendario"); return
+        log(f"Calendario para {args.domain}/{args.problem}: "
+            + ", ".join(f"{name} {length:.1f}s" for name, length in schedule))
+        result = run_schedule(schedule, args.domain, args.problem, args.cost_bound, args.backend)
+        result["schedule"] = schedule
+        spec = {"mode": "schedule", "schedule": schedule}
+
+    result["config_hash"] = results_store.config_hash({**spec, "cost_bound": args.cost_bound, "backend": args.backend})
+    store = os.path.join(RESULTS_DIR, STORE_FILE)
+    results_store.append(store, result)
+    status = f"{result['winner']} cost={result['plan_cost']}" if result["solved"] else "SIN PLAN"
+    log(f"RESULTADO {args.domain}/{args.problem}: {status} en {result['time']:.2f}s "
+        f"({'dentro' if result['within_bound'] else 'fuera'} de la cota)")
+    log(f"Guardado en {store}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Prediccion de tiempo, nodos y probabilidad de resolver por (configuracion,
+dominio, complejidad), entrenada con los resultados acumulados en el almacen.
+
+- Tiempo y nodos expandidos: ajuste log-lineal sobre la complejidad de las
+  ejecuciones resueltas (como scheduler.CostModel) con la dispersion de sus
+  residuos, para dar cotas altas (timeouts) y bajas (abortar).
+- Probabilidad de resolver: regresion logistica sobre la complejidad con
+  todos los desenlaces (TIMEOUT, MEMOUT y ABORTED cuentan como fallo).
+
+Los runners lo usan con tres opciones, todas desactivadas por defecto:
+- --adaptive-timeout: el presupuesto de cada trabajo es la cota alta del
+  tiempo predicho por TIMEOUT_MARGIN, entre MIN_TIMEOUT y TIMEOUT (nunca lo
+  alarga). Hacen falta MIN_SOLVED ejecuciones resueltas de esa configuracion
+  y dominio.
+- --skip-hopeless: no lanza un trabajo si su probabilidad de resolver es
+  menor que SKIP_BELOW y la misma configuracion ya fallo en ese dominio con
+  una complejidad igual o menor; se guarda con output SKIPPED (no cuenta como
+  completado, asi que un barrido sin la opcion lo ejecuta).
+- --early-abort: aborta una ejecucion (output ABORTED) cuando, al ritmo de
+  expansion observado, ni la cota baja de nodos necesarios cabe en lo que
+  queda de presupuesto. Necesita progreso durante la busqueda: FD y pyperplan
+  en proceso, no la CLI de pyperplan.
+"""
+
+import math
+
+import scheduler
+
+MIN_SOLVED = 3  # solved runs of a (config, domain) before timeouts are adapted
+MIN_TIMEOUT = 5.0  # seconds, floor of an adapted timeout
+TIMEOUT_MARGIN = 1.5  # adapted timeout = margin * high estimate of the runtime
+Z = 2.0  # standard deviations of the log residuals for high/low estimates
+SIGMA_MIN = 0.5  # floor of that deviation (log units), for fits on few points
+SKIP_BELOW = 0.05  # solve probability under which a job is hopeless
+ABORT_GRACE = 0.1  # fraction of the budget before a run may be aborted
+RIDGE = 0.1  # L2 penalty on the logistic slope (keeps separable data finite)
+
+# Outcomes that say nothing about whether the configuration can solve the instance
+_NO_OUTCOME = ("ERROR", "CANCELLED", "SKIPPED")
+
+
+class Aborted(Exception):
+    """La ejecucion se corta porque ya no puede terminar dentro del presupuesto."""
+
+
+def _fit_log(points):
+    """(a, b, sigma) de log(y) = a + b * complexity, o None si no hay datos suficientes."""
+    fit = scheduler.fit_log_linear(points)
+    if fit is None:
+        return None
+    a, b = fit
+    residuals = [math.log(max(y, 1e-3)) - (a + b * c) for c, y in points]
+    sigma = math.sqrt(sum(r * r for r in residuals) / len(residuals))
+    return a, b, max(sigma, SIGMA_MIN)
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + math.exp(-max(min(z, 50.0), -50.0)))
+
+
+def _fit_logistic(points, iters=50):
+    """Regresion logistica p(solved | complexity) por Newton; devuelve p(complexity)."""
+    ys = [y for _, y in points]
+    if all(ys) or not any(ys):
+        # One outcome only: no slope to fit
+        p = (sum(ys) + 0.5) / (len(ys) + 1)
+        return lambda c: p
+    xs = [c for c, _ in points]
+    mean = sum(xs) / len(xs)
+    scale = math.sqrt(sum((x - mean) ** 2 for x in xs) / len(xs)) or 1.0
+    xs = [(x - mean) / scale for x in xs]
+    a = b = 0.0
+    for _ in range(iters):
+        g0, g1, h00, h01, h11 = 0.0, -RIDGE * b, 1e-9, 0.0, RIDGE
+        for x, y in zip(xs, ys):
+            p = _sigmoid(a + b * x)
+            w = p * (1 - p)
+            g0 += y - p
+            g1 += (y - p) * x
+            h00 += w
+            h01 += w * x
+            h11 += w * x * x
+        det = h00 * h11 - h01 * h01
+        da, db = (h11 * g0 - h01 * g1) / det, (h00 * g1 - h01 * g0) / det
+        a, b = a + da, b + db
+        if abs(da) + abs(db) < 1e-8:
+            break
+    return lambda c: _sigmoid(a + b * (c - mean) / scale)
+
+
+class Budget:
+    """Presupuesto de una ejecucion para abortarla pronto.
+
+    `nodes` es la cota baja de nodos que necesita la instancia: se aborta si
+    al ritmo observado ni esos caben en el tiempo que queda. Se manda a los
+    workers, asi que solo lleva datos.
+    """
+
+    def __init__(self, timeout, nodes):
+        self.timeout = timeout
+        self.nodes = nodes
+
+    def hopeless(self, elapsed, expanded):
+        if not expanded or elapsed < ABORT_GRACE * self.timeout:
+            return False
+        rate = expanded / elapsed
+        return (self.nodes - expanded) / rate > self.timeout - elapsed
+
+    def check(self, elapsed, expanded):
+        """Como `hopeless`, pero lanzando Aborted (para el probe de pyperplan)."""
+        if self.hopeless(elapsed, expanded):
+            raise Aborted(f"{expanded} nodos en {elapsed:.1f}s, se necesitan al menos {self.nodes:.0f}")
+
+
+class Predictor:
+    """Modelos por (planner, domain) ajustados sobre un historial de resultados."""
+
+    def __init__(self, history):
+        times, nodes, outcomes = {}, {}, {}
+        self.solved_times = {}
+        for r in history:
+            output = str(r.get("output", ""))
+            if output.startswith(_NO_OUTCOME) or r.get("complexity") is None:
+                continue
+            key = (r["planner"], r["domain"])
+            solved = bool(r.get("solved"))
+            outcomes.setdefault(key, []).append((r["complexity"], 1 if solved else 0))
+            # An anytime run that hit the limit solved the instance, but its time is the whole budget
+            if solved and output not in ("TIMEOUT", "ABORTED") and r.get("time") is not None:
+                times.setdefault(key, []).append((r["complexity"], r["time"]))
+                self.solved_times.setdefault(key + (r["complexity"],), []).append(r["time"])
+                if r.get("nodes_expanded"):
+                    nodes.setdefault(key, []).append((r["complexity"], r["nodes_expanded"]))
+        self.outcomes = outcomes
+        self.n_solved = {key: len(points) for key, points in times.items()}
+        self.time_fits = {key: _fit_log(points) for key, points in times.items()}
+        self.node_fits = {key: _fit_log(points) for key, points in nodes.items()}
+        self.solve_fits = {key: _fit_logistic(points) for key, points in outcomes.items()}
+
+    def predict(self, planner, domain, complexity):
+        """{time, time_high, nodes, nodes_low, p_solve}; None donde no hay modelo."""
+        key = (planner, domain)
+        out = dict.fromkeys(("time", "time_high", "nodes", "nodes_low", "p_solve"))
+        if self.time_fits.get(key):
+            a, b, sigma = self.time_fits[key]
+            out["time"] = math.exp(a + b * complexity)
+            out["time_high"] = math.exp(a + b * complexity + Z * sigma)
+        if self.node_fits.get(key):
+            a, b, sigma = self.node_fits[key]
+            out["nodes"] = math.exp(a + b * complexity)
+            out["nodes_low"] = math.exp(a + b * complexity - Z * sigma)
+        if key in self.solve_fits:
+            out["p_solve"] = self.solve_fits[key](complexity)
+        return out
+
+    def timeout_for(self, planner, domain, complexity, timeout):
+        """Timeout adaptado (<= timeout) o `timeout` si no hay datos suficientes."""
+        key = (planner, domain)
+        if self.n_solved.get(key, 0) < MIN_SOLVED or not self.time_fits.get(key):
+            return timeout
+        budget = TIMEOUT_MARGIN * self.predict(planner, domain, complexity)["time_high"]
+        # Never below what this very size already needed
+        budget = max([budget, MIN_TIMEOUT] + [TIMEOUT_MARGIN * t for t in self.solved_times.get(key + (complexity,), [])])
+        return min(budget, timeout)
+
+    def hopeless(self, planner, domain, complexity):
+        """Probabilidad de resolver < SKIP_BELOW, con un fallo observado a este tamano o menor
+        y ningun exito a este tamano o mayor."""
+        points = self.outcomes.get((planner, domain), [])
+        p = self.predict(planner, domain, complexity)["p_solve"]
+        return (p is not None and p < SKIP_BELOW
+                and any(not y and c <= complexity for c, y in points)
+                and not any(y and c >= complexity for c, y in points))
+
+    def budget(self, planner, domain, complexity, timeout):
+        """Budget para abortar pronto, o None sin modelo de nodos."""
+        nodes_low = self.predict(planner, domain, complexity)["nodes_low"]
+        return None if nodes_low is None else Budget(timeout, nodes_low)
+
+
+def add_arguments(parser):
+    """Opciones de prediccion comunes a ambos runners."""
+    parser.add_argument("--adaptive-timeout", action="store_true",
+                        help="timeout por trabajo segun el tiempo predicho con los resultados anteriores")
+    parser.add_argument("--skip-hopeless", action="store_true",
+                        help="no lanzar trabajos que el modelo da por imposibles (se guardan como SKIPPED)")
+    parser.add_argument("--early-abort", action="store_true",
+                        help="abortar ejecuciones cuyo ritmo de expansion no llega dentro del presupuesto")
+
+
+def plan_jobs(model, jobs, describe, timeout, args):
+    """Decidir cada (job, rep): devuelve (a_lanzar, saltados).
+
+    a_lanzar son (job, rep, timeout, budget) y saltados (job, rep, p_solve);
+    `describe(job)` devuelve (planner, domain, complexity). Sin modelo todos
+    se lanzan con `timeout`.
+    """
+    if model is None:
+        return [(job, rep, timeout, None) for job, rep in jobs], []
+    run, skipped = [], []
+    for job, rep in jobs:
+        planner, domain, complexity = describe(job)
+        if args.skip_hopeless and model.hopeless(planner, domain, complexity):
+            skipped.append((job, rep, model.predict(planner, domain, complexity)["p_solve"]))
+            continue
+        budget_time = model.timeout_for(planner, domain, complexity, timeout) if args.adaptive_timeout else timeout
+        budget = model.budget(planner, domain, complexity, budget_time) if args.early_abort else None
+        run.append((job, rep, budget_time, budget))
+    return run, skipped
+
+
+def enabled(args):
+    return args.adaptive_timeout or args.skip_hopeless or args.early_abort
+
+
+def skipped_result(base, p_solve):
+    """Resultado de un trabajo que no se lanzo."""
+    return {**base, "solved": False, "plan_length": None, "time": None, "nodes_expanded": None,
+            "p_solve": None if p_solve is None else round(p_solve, 4),
+            "output": "SKIPPED", "plan_actions": []}
@@ -0,0 +1,392 @@
+"""
+Benchmark de regresion: compara un barrido con una linea base guardada.
+
+- save: guarda como linea base (results/baselines/<nombre>.jsonl) el ultimo
+  resultado de cada (planner, domain, problem, rep) del almacen de uno o
+  ambos runners, sin los logs. Si el almacen JSONL aun no existe se usa el
+  `.json` antiguo, asi que la instantanea del repositorio tambien sirve de
+  linea base. --suite limita a las instancias de una suite y --from toma los
+  registros de otro fichero (JSON o JSONL).
+- check: lanza el barrido de una suite con el runner elegido (su main(), con
+  --suite, --repeat y las opciones que no reconozca este comando) y compara
+  sus resultados con la linea base por (planner, domain, problem):
+  - cobertura: regresion si la fraccion de repeticiones resueltas (con plan
+    valido) baja al menos COVERAGE_DROP;
+  - time, cpu_time, nodes_expanded y plan_length (medianas de las
+    ejecuciones resueltas): regresion si la mediana empeora mas que la
+    tolerancia relativa y que MIN_DELTA. Con al menos MIN_SAMPLES muestras
+    por lado ademas tiene que ser significativa (Mann-Whitney, p < ALPHA);
+    con menos se decide solo por el umbral.
+  Escribe un informe JSON (regresiones, mejoras, instancias que faltan y un
+  resumen por planificador) y sale con codigo 1 si hay regresiones (2 si no
+  habia nada que comparar).
+
+La linea base guarda con que modo (pyperplan) o backend (Fast Downward) se
+midio cada resultado, y check no compara si el barrido usa otro: los tiempos
+no medirian lo mismo. check vuelve a medir siempre; con --reuse (o --no-run)
+toma lo que ya haya en el almacen y el cache con la misma version, y sale con
+codigo 2 si esos resultados son los mismos de los que se guardo la linea base.
+
+Uso:
+    python src/regression.py save antes --suite suites/scaling.json
+    python src/regression.py check antes --runner pyperplan --suite suites/scaling.json --repeat 5
+    python src/regression.py check antes --runner fast_downward --no-run
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+from datetime import datetime
+from importlib.metadata import version
+
+import numpy as np
+
+import results_store
+import run_fast_downward
+import run_pyperplan
+import stats
+import suites
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BASE_DIR, "results")
+BASELINES_DIR = os.path.join(RESULTS_DIR, "baselines")
+
+RUNNERS = {
+    "pyperplan": run_pyperplan,
+    "fast_downward": run_fast_downward,
+}
+
+METRICS = ("time", "cpu_time", "nodes_expanded", "plan_length")
+TOLERANCE = {"time": 0.10, "cpu_time": 0.10, "nodes_expanded": 0.0, "plan_length": 0.0}  # relative
+MIN_DELTA = {"time": 0.05, "cpu_time": 0.05, "nodes_expanded": 1, "plan_length": 1}  # absolute
+ALPHA = 0.05
+MIN_SAMPLES = 5  # per side; with fewer, Mann-Whitney cannot reach ALPHA
+COVERAGE_DROP = 0.5  # drop in the solved fraction that counts as a coverage loss
+
+STATUSES = ("TIMEOUT", "MEMOUT", "ABORTED", "SKIPPED", "CANCELLED")
+# Runs that were never carried out say nothing about coverage
+_NOT_RUN = ("SKIPPED", "CANCELLED")
+
+
+def log(msg):
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+def baseline_path(name):
+    return name if name.endswith(".jsonl") else os.path.join(BASELINES_DIR, name + ".jsonl")
+
+
+def _status(r):
+    """Desenlace corto de una ejecucion ('' si termino con la salida del planificador)."""
+    output = str(r.get("output", ""))
+    if output.startswith("ERROR"):
+        return "ERROR"
+    return output if output in STATUSES else ""
+
+
+def _slim(r):
+    """Registro sin los campos pesados; `output` queda reducido al desenlace."""
+    slim = {k: v for k, v in r.items() if k not in results_store.LOG_FIELDS}
+    slim["output"] = _status(r)
+    runner = _runner_of(r)
+    if runner:
+        slim.update(_measured_with(r, runner))
+    return slim
+
+
+def _runner_of(r):
+    return next((name for name, module in RUNNERS.items() if r["planner"] in module.CONFIGS), None)
+
+
+def _measured_with(r, runner):
+    """Mode or backend a result was measured with; old records predate the field."""
+    if runner == "fast_downward":
+        return {"backend": r.get("backend", "docker")}
+    return {"mode": r.get("mode") or ("inprocess" if "ground_time" in r else "subprocess")}
+
+
+def _store(module):
+    return os.path.join(module.RESULTS_DIR, module.STORE_FILE)
+
+
+def _read(path):
+    if path.endswith(".json"):
+        with open(path) as f:
+            return json.load(f)
+    return results_store.load(path)
+
+
+def _in_suite(records, suite):
+    instances = {(domain, prob_id) for domain, info in suites.load(suite).items()
+                 for prob_id, _, _ in info["instances"]}
+    return [r for r in records if (r["domain"], r["problem"]) in instances]
+
+
+def save(args):
+    if args.source:
+        records = _read(args.source)
+    else:
+        records = [r for name in args.runner for r in results_store.load_any(_store(RUNNERS[name]))]
+    records = results_store.latest(records)
+    if args.suite:
+        records = _in_suite(records, args.suite)
+    if not records:
+        log("ERROR: no hay resultados para la linea base")
+        return 2
+    path = baseline_path(args.name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        for r in sorted(records, key=lambda r: (r["planner"], r["domain"], r["problem"], r.get("rep", 0))):
+            f.write(json.dumps(_slim(r)) + "\n")
+    os.replace(tmp, path)
+    planners = sorted({r["planner"] for r in records})
+    log(f"Linea base {path}: {len(records)} resultados de {', '.join(planners)}")
+    return 0
+
+
+def _planner_version(args):
+    if args.runner == "pyperplan":
+        return version("pyperplan")
+    return run_fast_downward.planner_version(args.backend)
+
+
+def _setup(args):
+    """Runner options that enter the configuration hash (see build_jobs of each runner)."""
+    return {"mode": args.mode} if args.runner == "pyperplan" else {"backend": args.backend}
+
+
+def candidate_results(args, extra):
+    """Lanzar (salvo --no-run) el barrido de la suite y devolver sus resultados."""
+    module = RUNNERS[args.runner]
+    if not args.no_run:
+        argv = ["--suite", args.suite, "--repeat", str(args.repeat), *extra]
+        if not args.reuse:
+            argv.append("--rerun")
+        if args.runner == "fast_downward":
+            argv += ["--backend", args.backend]
+        else:
+            argv += ["--mode", args.mode]
+        module.main(argv)
+    store = _store(module)
+    _, keys = module.build_jobs(args.suite, args.repeat, store, _planner_version(args), rerun=True, **_setup(args))
+    return [r for r in results_store.load(store) if results_store.result_key(r) in keys]
+
+
+def _group(records):
+    groups = {}
+    for r in records:
+        if _status(r) not in _NOT_RUN:
+            groups.setdefault((r["planner"], r["domain"], r["problem"]), []).append(r)
+    return groups
+
+
+def _solved(r):
+    return bool(r.get("solved")) and r.get("plan_valid") is not False
+
+
+def _samples(runs, metric):
+    # Anytime runs that hit the limit solved the instance, but their time is the whole budget
+    return [r[metric] for r in runs
+            if _solved(r) and _status(r) not in ("TIMEOUT", "ABORTED") and r.get(metric) is not None]
+
+
+def compare_metric(base, cand, metric, tolerance):
+    """Comparacion de una metrica -> dict, o None si falta un lado."""
+    if not base or not cand:
+        return None
+    mb, mc = float(np.median(base)), float(np.median(cand))
+    delta = MIN_DELTA[metric]
+    worse = mc > mb * (1 + tolerance) and mc - mb >= delta
+    better = mc * (1 + tolerance) < mb and mb - mc >= delta
+    p_value = None
+    if len(base) >= MIN_SAMPLES and len(cand) >= MIN_SAMPLES:
+        _, p_value = stats.mann_whitney(base, cand)
+        worse = worse and p_value < ALPHA
+        better = better and p_value < ALPHA
+    return {
+        "metric": metric, "baseline": round(mb, 4), "candidate": round(mc, 4),
+        "ratio": round(mc / mb, 4) if mb > 0 else None,
+        "p_value": None if p_value is None else round(p_value, 4),
+        "test": "mann-whitney" if p_value is not None else "umbral",
+        "n_baseline": len(base), "n_candidate": len(cand),
+        "verdict": "regression" if worse else ("improvement" if better else "same"),
+    }
+
+
+def compare(baseline, candidate, tolerances):
+    """Informe de regresiones de `candidate` frente a `baseline` (listas de resultados)."""
+    base, cand = _group(baseline), _group(candidate)
+    planners = {planner for planner, _, _ in cand}
+    regressions, improvements, missing = [], [], []
+    per_planner = {}
+    for key in sorted(set(base) | set(cand)):
+        planner, domain, problem = key
+        if planner not in planners:
+            continue  # another runner's configuration
+        where = {"planner": planner, "domain": domain, "problem": problem}
+        if key not in cand:
+            missing.append(where)
+            continue
+        summary = per_planner.setdefault(planner, {"instances": 0, "solved_baseline": 0, "solved_candidate": 0,
+                                                   "time_ratios": []})
+        if key not in base:
+            continue
+        summary["instances"] += 1
+        b_rate = sum(map(_solved, base[key])) / len(base[key])
+        c_rate = sum(map(_solved, cand[key])) / len(cand[key])
+        summary["solved_baseline"] += b_rate
+        summary["solved_candidate"] += c_rate
+        if abs(b_rate - c_rate) >= COVERAGE_DROP:
+            entry = {**where, "metric": "coverage", "baseline": round(b_rate, 4), "candidate": round(c_rate, 4),
+                     "outcomes": sorted({_status(r) or ("OK" if _solved(r) else "NO PLAN") for r in cand[key]})}
+            (regressions if c_rate < b_rate else improvements).append(entry)
+        for metric in METRICS:
+            result = compare_metric(_samples(base[key], metric), _samples(cand[key], metric),
+                                    metric, tolerances[metric])
+            if result is None:
+                continue
+            if metric == "time" and result["ratio"]:
+                summary["time_ratios"].append(result["ratio"])
+            verdict = result.pop("verdict")
+            if verdict != "same":
+                (regressions if verdict == "regression" else improvements).append({**where, **result})
+
+    for summary in per_planner.values():
+        ratios = summary.pop("time_ratios")
+        # Geometric mean: a 2x slowdown and a 2x speedup cancel out
+        summary["time_ratio_gmean"] = round(math.exp(sum(map(math.log, ratios)) / len(ratios)), 4) if ratios else None
+        summary["solved_baseline"] = round(summary["solved_baseline"], 2)
+        summary["solved_candidate"] = round(summary["solved_candidate"], 2)
+    compared = sum(s["instances"] for s in per_planner.values())
+    return {
+        "summary": {"compared": compared, "regressions": len(regressions), "improvements": len(improvements),
+                    "missing": len(missing), "new": sum(1 for key in cand if key not in base)},
+        "per_planner": per_planner,
+        "regressions": regressions,
+        "improvements": improvements,
+        "missing": missing,
+    }
+
+
+def _describe(entry):
+    where = f"{entry['planner']:15s} {entry['domain']}/{entry['problem']}"
+    if entry["metric"] == "coverage":
+        return f"{where}: resueltas {entry['baseline']:.0%} -> {entry['candidate']:.0%} ({', '.join(entry['outcomes'])})"
+    p = "" if entry.get("p_value") is None else f", p={entry['p_value']}"
+    return f"{where}: {entry['metric']} {entry['baseline']} -> {entry['candidate']} (x{entry['ratio']}{p})"
+
+
+def _expected(args, planner):
+    if args.runner == "fast_downward":
+        return {"backend": args.backend}
+    return {"mode": run_pyperplan.run_mode(planner, args.mode)}
+
+
+def _mismatches(baseline, args):
+    """(planner, measured with) of the baseline records this sweep would not measure the same way."""
+    return sorted({(r["planner"], json.dumps(_measured_with(r, args.runner))) for r in baseline
+                   if _runner_of(r) == args.runner and _measured_with(r, args.runner) != _expected(args, r["planner"])})
+
+
+def _reused(baseline, candidate):
+    """True if every candidate result is one the baseline was saved from."""
+    saved = {(results_store.run_id(r), r.get("time")) for r in baseline}
+    return bool(candidate) and all((results_store.run_id(r), r.get("time")) in saved for r in candidate)
+
+
+def check(args, extra):
+    path = baseline_path(args.name)
+    if not os.path.exists(path):
+        log(f"ERROR: no existe la linea base {path} (crearla con `save`)")
+        return 2
+    baseline = results_store.load(path)
+    mismatches = _mismatches(baseline, args)
+    if mismatches:
+        for planner, measured in mismatches:
+            log(f"ERROR: {planner} se midio en la linea base con {measured}, este barrido con "
+                f"{json.dumps(_expected(args, planner))}")
+        return 2
+    candidate = candidate_results(args, extra)
+    if (args.reuse or args.no_run) and _reused(baseline, candidate):
+        log("ERROR: los resultados del barrido son los mismos de los que se guardo la linea base "
+            "(volver a medir sin --reuse/--no-run)")
+        return 2
+    tolerances = {**TOLERANCE, "time": args.tolerance, "cpu_time": args.tolerance}
+    report = compare(baseline, candidate, tolerances)
+    report.update({
+        "baseline": path, "runner": args.runner, **_setup(args), "suite": args.suite, "repeat": args.repeat,
+        "planner_version": _planner_version(args), "created": datetime.now().isoformat(timespec="seconds"),
+        "thresholds": {"tolerance": tolerances, "min_delta": MIN_DELTA, "alpha": ALPHA,
+                       "min_samples": MIN_SAMPLES, "coverage_drop": COVERAGE_DROP},
+    })
+    report_file = args.report or os.path.join(RESULTS_DIR, f"regression_{os.path.splitext(os.path.basename(path))[0]}"
+                                                           f"_{args.runner}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(report_file)), exist_ok=True)
+    with open(report_file, "w") as f:
+        json.dump(report, f, indent=1)
+
+    summary = report["summary"]
+    log(f"\nREGRESION frente a {path}: {summary['compared']} instancias comparadas, "
+        f"{summary['regressions']} regresiones, {summary['improvements']} mejoras, "
+        f"{summary['missing']} sin resultado nuevo, {summary['new']} nuevas")
+    for planner, s in sorted(report["per_planner"].items()):
+        gmean = "-" if s["time_ratio_gmean"] is None else f"x{s['time_ratio_gmean']}"
+        log(f"  {planner:15s} resueltas {s['solved_baseline']} -> {s['solved_candidate']}, tiempo {gmean}")
+    for entry in report["regressions"]:
+        log(f"  REGRESION {_describe(entry)}")
+    for entry in report["improvements"]:
+        log(f"  mejora    {_describe(entry)}")
+    log(f"Informe en {report_file}")
+    if not summary["compared"]:
+        log("ERROR: ninguna instancia del barrido esta en la linea base")
+        return 2
+    return 1 if report["regressions"] else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    snap = sub.add_parser("save", help="guardar los resultados actuales como linea base")
+    snap.add_argument("name", help="nombre de la linea base (o ruta a un .jsonl)")
+    snap.add_argument("--runner", nargs="+", choices=tuple(RUNNERS), default=list(RUNNERS),
+                      help="almacenes de los que se toman los resultados")
+    snap.add_argument("--suite", default=None, help="guardar solo las instancias de esta suite")
+    snap.add_argument("--from", dest="source", default=None,
+                      help="tomar los resultados de este fichero (JSON o JSONL) en vez del almacen")
+
+    chk = sub.add_parser("check", help="ejecutar una suite y compararla con una linea base",
+                         epilog="las opciones no reconocidas se pasan al runner (p.ej. --workers)")
+    chk.add_argument("name", help="nombre de la linea base (o ruta a un .jsonl)")
+    chk.add_argument("--runner", choices=tuple(RUNNERS), required=True)
+    chk.add_argument("--suite", default=suites.DEFAULT_SUITE, help="suite de instancias (JSON, ver suites/)")
+    chk.add_argument("--repeat", type=int, default=1,
+                     help=f"repeticiones de cada ejecucion (>= {MIN_SAMPLES} para el test de significacion)")
+    chk.add_argument("--reuse", action="store_true",
+                     help="reutilizar el almacen y el cache si ya hay resultados con esta version")
+    chk.add_argument("--no-run", action="store_true", help="comparar los resultados que ya hay en el almacen")
+    chk.add_argument("--backend", choices=run_fast_downward.BACKENDS, default="docker",
+                     help="backend de Fast Downward")
+    chk.add_argument("--mode", choices=tuple(run_pyperplan.RUNNERS), default="subprocess",
+                     help="modo de ejecucion de pyperplan")
+    chk.add_argument("--tolerance", type=float, default=TOLERANCE["time"],
+                     help="empeoramiento relativo tolerado en time y cpu_time")
+    chk.add_argument("--report", default=None, help="fichero del informe JSON")
+    args, extra = parser.parse_known_args(argv)
+    if extra and args.command != "check":
+        parser.error(f"opciones no reconocidas: {' '.join(extra)}")
+    return args, extra
+
+
+def main(argv=None):
+    args, extra = parse_args(argv)
+    if args.command == "save":
+        return save(args)
+    return check(args, extra)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""
+Almacen de resultados incremental (JSONL, solo append).
+
+Cada ejecucion terminada se anade como una linea JSON y se sincroniza a disco,
+de modo que un fallo o un Ctrl-C no pierde el barrido. Un resultado se
+identifica por (planner, domain, problem, config_hash, planner_version, rep);
+`rep` es el indice de repeticion con --repeat (0 en los registros antiguos).
+Al relanzar un barrido se saltan las claves que ya tienen un resultado valido.
+
+Para el analisis, `compact` pasa las lineas nuevas del JSONL a un formato
+columnar (Parquet, requiere pyarrow: extra `columnar`) en
+`<almacen>_columnar/`: las metricas en `metrics-NNNNN.parquet` y los campos
+pesados (salida del planificador, plan, telemetria, incumbentes) en
+`logs-NNNNN.parquet`, enlazados por `run_id`.
+El JSONL sigue siendo el registro de escritura; leer las metricas no toca
+los logs y los filtros (dominio, planificador) se aplican al leer.
+"""
+
+import glob
+import hashlib
+import json
+import os
+
+
+def config_hash(cfg):
+    """Hash estable de la configuracion de un planificador (args + timeout)."""
+    blob = json.dumps(cfg, sort_keys=True).encode()
+    return hashlib.sha256(blob).hexdigest()[:12]
+
+
+def result_key(r):
+    return (r["planner"], r["domain"], r["problem"], r.get("config_hash"), r.get("planner_version"),
+            r.get("rep", 0))
+
+
+def is_valid(r):
+    """Un resultado es valido si la ejecucion termino con el TIMEOUT de su clave
+    (resuelta, sin plan o TIMEOUT).
+
+    Las decisiones del predictor (SKIPPED, ABORTED o un TIMEOUT con el
+    presupuesto recortado) no cuentan como hechas: un barrido sin
+    --adaptive-timeout/--early-abort las vuelve a lanzar, igual que
+    run_cache.cacheable no las guarda.
+    """
+    output = str(r.get("output", ""))
+    if output == "TIMEOUT" and "timeout_budget" in r:
+        return False
+    return not output.startswith("ERROR") and output not in ("ABORTED", "SKIPPED")
+
+
+def append(path, record):
+    """Anadir un resultado al almacen y forzarlo a disco."""
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load(path):
+    """Leer todos los registros; si una clave aparece varias veces gana la ultima.
+
+    Las lineas corruptas (p.ej. una escritura cortada por un crash) se ignoran.
+    """
+    records = {}
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                r = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[result_key(r)] = r
+    return list(records.values())
+
+
+def load_any(path):
+    """Como `load`, pero si el almacen aun no existe lee el `.json` antiguo."""
+    if os.path.exists(path):
+        return load(path)
+    legacy = os.path.splitext(path)[0] + ".json"
+    if os.path.exists(legacy):
+        with open(legacy) as f:
+            return json.load(f)
+    return []
+
+
+def completed_keys(path):
+    """Claves que ya tienen un resultado valido en el almacen."""
+    return {result_key(r) for r in load(path) if is_valid(r)}
+
+
+def latest(records):
+    """Quedarse con el ultimo resultado de cada (planner, domain, problem, rep)."""
+    by_run = {}
+    for r in records:
+        by_run[(r["planner"], r["domain"], r["problem"], r.get("rep", 0))] = r
+    return list(by_run.values())
+
+
+# Fields moved to the logs side file by `compact`
+LOG_FIELDS = ("output", "plan_actions", "progress", "telemetry", "incumbents")
+MAX_PARTS = 16  # compacted parts before they are merged into one
+
+
+def run_id(r):
+    """Id estable de un resultado (hash de su clave)."""
+    return hashlib.sha256(json.dumps(result_key(r)).encode()).hexdigest()[:16]
+
+
+def columnar_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def columnar_dir(path):
+    return os.path.splitext(path)[0] + "_columnar"
+
+
+def _table(rows):
+    """Arrow table from dicts with heterogeneous keys; mixed-type columns become strings."""
+    import pyarrow as pa
+
+    names = list(dict.fromkeys(k for r in rows for k in r))
+    columns = {}
+    for name in names:
+        values = [r.get(name) for r in rows]
+        try:
+            columns[name] = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            columns[name] = pa.array([None if v is None else str(v) for v in values], pa.string())
+    return pa.table(columns)
+
+
+def _parts(directory, kind):
+    return sorted(glob.glob(os.path.join(directory, f"{kind}-*.parquet")))
+
+
+def _write_part(directory, kind, table):
+    import pyarrow.parquet as pq
+
+    index = len(_parts(directory, kind))
+    tmp = os.path.join(directory, f".{kind}-{index:05d}.tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, os.path.join(directory, f"{kind}-{index:05d}.parquet"))
+
+
+def compact(path):
+    """Anadir al formato columnar las lineas del JSONL aun no compactadas.
+
+    El desplazamiento ya procesado se guarda en `offset`; si el JSONL encoge
+    (reescrito a mano) se compacta desde cero. Devuelve las filas nuevas.
+    """
+    directory = columnar_dir(path)
+    offset_file = os.path.join(directory, "offset")
+    if not os.path.exists(path):
+        return 0
+    os.makedirs(directory, exist_ok=True)
+    offset = 0
+    if os.path.exists(offset_file):
+        with open(offset_file) as f:
+            offset = int(f.read().strip() or 0)
+    if os.path.getsize(path) < offset:
+        for part in _parts(directory, "metrics") + _parts(directory, "logs"):
+            os.remove(part)
+        offset = 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    # Only whole lines: a run may be appending right now
+    data = data[:data.rfind(b"\n") + 1]
+    if not data:
+        return 0
+
+    metrics, logs = [], []
+    seq = offset
+    for line in data.splitlines(keepends=True):
+        position, seq = seq, seq + len(line)
+        try:
+            r = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        rid = run_id(r)
+        m = {"run_id": rid, "seq": position, "n_incumbents": len(r.get("incumbents") or []),
+             "telemetry_points": len((r.get("telemetry") or {}).get("t_ms", []))}
+        log = {"run_id": rid, "seq": position}
+        for k, v in r.items():
+            if k in LOG_FIELDS:
+                log[k] = json.dumps(v)
+            else:
+                m[k] = json.dumps(v) if isinstance(v, (list, dict)) else v
+        metrics.append(m)
+        logs.append(log)
+
+    if metrics:
+        _write_part(directory, "metrics", _table(metrics))
+        _write_part(directory, "logs", _table(logs))
+    tmp = offset_file + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(str(seq))
+    os.replace(tmp, offset_file)
+    if len(_parts(directory, "metrics")) > MAX_PARTS:
+        _merge(directory)
+    return len(metrics)
+
+
+def _dataset(directory, kind):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    parts = _parts(directory, kind)
+    if not parts:
+        return None
+    # Parts written at different times may have different columns and types
+    schema = pa.unify_schemas([pq.read_schema(p) for p in parts], promote_options="permissive")
+    return ds.dataset(parts, schema=schema, format="parquet")
+
+
+def _merge(directory):
+    """Juntar las partes compactadas en una sola por tipo."""
+    import pyarrow.parquet as pq
+
+    for kind in ("metrics", "logs"):
+        parts = _parts(directory, kind)
+        table = _dataset(directory, kind).to_table()
+        tmp = os.path.join(directory, f".{kind}-merged.tmp")
+        pq.write_table(table, tmp)
+        for part in parts:
+            os.remove(part)
+        os.replace(tmp, os.path.join(directory, f"{kind}-00000.parquet"))
+
+
+def read_metrics(path, columns=None, domains=None, planners=None):
+    """DataFrame con el ultimo resultado de cada (planner, domain, problem, rep),
+    sin los campos de log. Los filtros se aplican al escanear el Parquet."""
+    import pandas as pd
+    import pyarrow.dataset as ds
+
+    dataset = _dataset(columnar_dir(path), "metrics")
+    if dataset is None:
+        return pd.DataFrame()
+    expr = None
+    for field, values in (("domain", domains), ("planner", planners)):
+        if values is not None:
+            cond = ds.field(field).isin(list(values))
+            expr = cond if expr is None else expr & cond
+    if columns is not None:
+        wanted = ["run_id", "seq", "planner", "domain", "problem", "rep", *columns]
+        columns = [c for c in dict.fromkeys(wanted) if c in dataset.schema.names]
+    df = dataset.to_table(columns=columns, filter=expr).to_pandas()
+    if "rep" not in df:
+        df["rep"] = 0
+    df["rep"] = df["rep"].fillna(0).astype(int)
+    df = df.sort_values("seq").drop_duplicates(["planner", "domain", "problem", "rep"], keep="last")
+    return df.reset_index(drop=True)
+
+
+def read_logs(path, run_ids, fields=LOG_FIELDS):
+    """Campos de log (decodificados) de los `run_ids` dados -> {run_id: {campo: valor}}."""
+    import pyarrow.dataset as ds
+
+    dataset = _dataset(columnar_dir(path), "logs")
+    if dataset is None or not len(run_ids):
+        return {}
+    fields = [f for f in fields if f in dataset.schema.names]
+    table = dataset.to_table(columns=["run_id", "seq", *fields], filter=ds.field("run_id").isin(list(run_ids)))
+    logs = {}
+    for row in sorted(table.to_pylist(), key=lambda row: row["seq"]):
+        logs[row["run_id"]] = {f: json.loads(row[f]) if row[f] is not None else None for f in fields}
+    return logs
@@ -0,0 +1,146 @@
+"""
+Cache de ejecuciones direccionada por contenido (results/run_cache/), comun a
+ambos runners.
+
+La clave de una ejecucion es el sha256 del contenido de dominio + problema
+(suites.content_hash), los argumentos de la configuracion, el TIMEOUT, la
+version del planificador (version del paquete pyperplan, id de la imagen
+Docker o `--version` de FD nativo) y la repeticion. Si nada de eso cambia,
+el resultado guardado se reutiliza sin ejecutar, aunque el almacen JSONL sea
+otro (CI, otro RESULTS_DIR) o se haya renombrado la instancia; editar un PDDL
+cambia la clave y fuerza la ejecucion. Con --rerun no se lee el cache (solo
+se actualiza) y --no-cache lo desactiva del todo.
+
+Cada entrada es un JSON en `<clave[:2]>/<clave>.json`, escrito de forma
+atomica. Un acierto actualiza su mtime, y `evict` borra por antiguedad y/o
+por tamano total empezando por las entradas usadas hace mas tiempo.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import generators
+import suites
+
+CACHE_DIR = "run_cache"  # under the runner's RESULTS_DIR
+
+# (domain file, problem, mtimes) -> content hash, so a sweep reads each instance once
+_CONTENT = {}
+
+
+def _content_hash(domain_file, problem):
+    # A generated ref is deterministic, so it is its own version stamp
+    stamp = None if generators.is_generated(problem) else os.path.getmtime(problem)
+    key = (domain_file, problem, os.path.getmtime(domain_file), stamp)
+    if key not in _CONTENT:
+        _CONTENT[key] = suites.content_hash(domain_file, problem)
+    return _CONTENT[key]
+
+
+def key(domain_file, problem, cfg, timeout, planner_version, rep=0):
+    """Clave de una ejecucion (hex)."""
+    blob = json.dumps({
+        "instance": _content_hash(domain_file, problem), "config": cfg, "timeout": timeout,
+        "planner_version": planner_version, "rep": rep,
+    }, sort_keys=True).encode()
+    return hashlib.sha256(blob).hexdigest()
+
+
+def add_arguments(parser):
+    """Opciones del cache comunes a ambos runners."""
+    parser.add_argument("--no-cache", action="store_true",
+                        help="no leer ni escribir el cache de ejecuciones (results/run_cache/)")
+    parser.add_argument("--cache-max-age", type=float, default=None,
+                        help="al terminar, borrar entradas del cache sin usar en mas de N dias")
+    parser.add_argument("--cache-max-size", type=float, default=None,
+                        help="al terminar, reducir el cache a N MB borrando las entradas menos usadas")
+
+
+def _path(cache_dir, run_key):
+    return os.path.join(cache_dir, run_key[:2], run_key + ".json")
+
+
+def get(cache_dir, run_key):
+    """Resultado guardado para una clave, o None."""
+    path = _path(cache_dir, run_key)
+    try:
+        with open(path) as f:
+            result = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    try:
+        os.utime(path)  # recently used: evicted last
+    except OSError:
+        pass
+    return result
+
+
+def cacheable(result):
+    """Solo ejecuciones terminadas con el TIMEOUT de la clave: ni errores, ni carreras
+    canceladas por el portfolio, ni decisiones del predictor (SKIPPED, ABORTED o un
+    TIMEOUT con el presupuesto recortado)."""
+    output = str(result.get("output", ""))
+    if output == "TIMEOUT" and "timeout_budget" in result:
+        return False
+    return not output.startswith("ERROR") and output not in ("CANCELLED", "ABORTED", "SKIPPED")
+
+
+def put(cache_dir, run_key, result):
+    if not cacheable(result):
+        return
+    path = _path(cache_dir, run_key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({k: v for k, v in result.items() if k != "from_cache"}, f)
+    os.replace(tmp, path)
+
+
+def split(cache_dir, jobs, key_of):
+    """Separar los (job, rep) pendientes de los que ya estan en el cache.
+
+    Devuelve (pendientes, aciertos) con aciertos como (job, rep, resultado).
+    """
+    pending, hits = [], []
+    for job, rep in jobs:
+        result = get(cache_dir, key_of(job, rep))
+        if result is None:
+            pending.append((job, rep))
+        else:
+            hits.append((job, rep, result))
+    return pending, hits
+
+
+def evict(cache_dir, max_age_days=None, max_size_mb=None):
+    """Borrar entradas mas viejas que `max_age_days` y, si el cache sigue ocupando
+    mas de `max_size_mb`, las usadas hace mas tiempo. Devuelve (borradas, bytes)."""
+    entries = []
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            if name.endswith(".json"):
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()
+    now = time.time()
+    total = sum(size for _, size, _ in entries)
+    removed = freed = 0
+    for mtime, size, path in entries:
+        too_old = max_age_days is not None and now - mtime > max_age_days * 86400
+        too_big = max_size_mb is not None and total > max_size_mb * 1024 * 1024
+        if not (too_old or too_big):
+            # Oldest first and the total only shrinks: no later entry is affected
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+        freed += size
+    return removed, freed
@@ -1,163 +1,909 @@
 """
 Ejecuta Fast Downward via Docker en paralelo con logging detallado.
 Requiere: docker pull aibasel/downward:latest
+
+Backends:
+- docker: un `docker run --rm` por ejecucion (~2s de arranque cada vez).
+- pool: N contenedores persistentes arrancados una sola vez; cada ejecucion se
+  despacha con `docker exec`. El arranque se reporta en `container_startup_time`.
+- native: `fast-downward.py` local en el PATH, sin Docker.
+Solo con docker el `time` incluye el arranque, asi que los demas backends
+entran en el hash de configuracion (hashed_config).
+
+La CLI de Docker se puede sustituir con FD_DOCKER (p.ej. tools/fake_docker.py)
+y el ejecutable nativo con FD_NATIVE.
+
+Con --translate-cache la ejecucion se hace en dos fases: el traductor se
+ejecuta una sola vez por instancia y su output.sas se guarda en una cache
+direccionada por contenido (hash de dominio + problema + version
+de FD, para no reutilizar el .sas de otro traductor); despues cada
+configuracion ejecuta solo la busqueda sobre el .sas cacheado.
+
+Resultados en results/fast_downward_results.jsonl (results_store.py) y en el
+cache de ejecuciones (run_cache.py); pool, orden y --repeat en scheduler.py.
+
+Cada resultado incluye el tiempo de pared (`time`, perf_counter), la CPU
+user+sys y el pico de RSS del planificador (`cpu_*`, `peak_rss_kb`; dentro del
+contenedor se miden con un wrapper wait4) y los tiempos que reporta FD.
+
+La salida del planificador se lee mientras se ejecuta: cada plan mejorado se
+registra con su instante en `incumbents`. Con FD-LAMA-ANYTIME (alias `lama`
+completo) eso da curvas coste-tiempo, y si se agota el TIMEOUT se conserva el
+mejor plan encontrado en vez de un fallo todo-o-nada.
+
+Las instancias salen de una suite declarativa (--suite, por defecto
+suites/default.json). Las generadas (`gen:...`) se materializan bajo demanda
+en un directorio temporal montado en /gen, justo antes de la primera
+ejecucion que las usa.
+
+Con --batch N los trabajos del mismo dominio, configuracion y repeticion se
+agrupan en lotes de hasta N problemas que un solo contenedor (o un solo
+proceso en nativo) resuelve seguidos con BATCH_DRIVER: se paga un arranque
+por lote, cada problema tiene su directorio y su timeout y un fallo solo
+afecta a su resultado, que llega al almacen en cuanto termina. El traductor
+de FD parsea el dominio con cada problema; con --translate-cache solo se
+ejecuta una vez por instancia. --early-abort no se aplica dentro de un lote.
 """
 
+import argparse
+import hashlib
 import json
 import os
-import re
+import queue
+import shutil
+import signal
 import subprocess
+import sys
+import tempfile
+import threading
 import time
+import uuid
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import partial
+
+import generators
+import log_parser
+import measure
+import predictor
+import results_store
+import run_cache
+import scheduler
+import suites
+import validate
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RESULTS_DIR = os.path.join(BASE_DIR, "results")
 DOMAINS_DIR = os.path.join(BASE_DIR, "domains")
+SAS_CACHE_DIR = os.path.join(RESULTS_DIR, "sas_cache")
 TIMEOUT = 120  # 2 min per run (includes Docker overhead)
+ANYTIME_LIMIT = TIMEOUT - 10  # FD stops itself before TIMEOUT, keeping its plans
+MEMORY_LIMIT = "4g"
+IMAGE = "aibasel/downward"
+FD_IN_IMAGE = "/workspace/downward/fast-downward.py"  # entrypoint of IMAGE
+DOCKER = os.environ.get("FD_DOCKER", "docker")
+FD_NATIVE = os.environ.get("FD_NATIVE", "fast-downward.py")
+STORE_FILE = "fast_downward_results.jsonl"
+REPLACE_ATTEMPTS = 2  # container starts tried before a pool slot is dropped
 
 # "pre" args go BEFORE domain/problem, "post" args go AFTER
 CONFIGS = {
     "FD-LAMA": {"pre": ["--alias", "lama-first"], "post": []},
     "FD-ASTAR-LM": {"pre": [], "post": ["--search", "astar(lmcut())"]},
     "FD-GBFS-FF": {"pre": [], "post": ["--search", "eager_greedy([ff()])"]},
+    "FD-LAMA-ANYTIME": {"pre": ["--alias", "lama", "--overall-time-limit", f"{ANYTIME_LIMIT}s"], "post": []},
 }
 
-PROBLEMS = {
-    "blocksworld": {
-        "domain": "blocksworld/domain.pddl",
-        "instances": [
-            ("BW-1", "blocksworld/instances/instance-4.pddl", 5),
-            ("BW-2", "blocksworld/instances/instance-10.pddl", 7),
-            ("BW-3", "blocksworld/instances/instance-17.pddl", 9),
-            ("BW-4", "blocksworld/instances/instance-25.pddl", 12),
-            ("BW-5", "blocksworld/instances/instance-35.pddl", 17),
-        ],
-    },
-    "gripper": {
-        "domain": "gripper/domain.pddl",
-        "instances": [
-            ("GR-1", "gripper/instances/instance-1.pddl", 4),
-            ("GR-2", "gripper/instances/instance-4.pddl", 10),
-            ("GR-3", "gripper/instances/instance-7.pddl", 16),
-            ("GR-4", "gripper/instances/instance-10.pddl", 22),
-            ("GR-5", "gripper/instances/instance-14.pddl", 30),
-        ],
-    },
-}
+# Instances come from a declarative suite (suites/*.json, see suites.py)
+PROBLEMS = suites.load()
+
+
+BACKENDS = ("docker", "pool", "native")
+
+BATCH_MARKER = "@@batch "
+BATCH_SLACK = 30  # seconds over the summed per-problem timeouts before a whole batch is killed
+
+# Runs argv[1] (the FD driver) once per problem of the JSON list in argv[2], each
+# in its own cwd and process group under its own timeout, and brackets its
+# output with marker lines carrying the outcome and the rusage of that run.
+# Executed with the container's own python3, so it must stay self-contained.
+BATCH_DRIVER = (
+    "import json,os,signal,subprocess,sys,threading,time\n"
+    "def mark(d):\n"
+    "    sys.stdout.write('" + BATCH_MARKER + "'+json.dumps(d)+'\\n');sys.stdout.flush()\n"
+    "def kill(p,fired):\n"
+    "    fired.append(1)\n"
+    "    try:os.killpg(p.pid,signal.SIGKILL)\n"
+    "    except ProcessLookupError:pass\n"
+    "for i,job in enumerate(json.loads(sys.argv[2])):\n"
+    "    mark({'begin':i})\n"
+    "    start=time.perf_counter()\n"
+    "    try:\n"
+    "        os.makedirs(job['cwd'],exist_ok=True)\n"
+    "        p=subprocess.Popen([sys.argv[1]]+job['args'],cwd=job['cwd'],stderr=subprocess.STDOUT,"
+    "start_new_session=True)\n"
+    "    except OSError as e:\n"
+    "        mark({'end':i,'error':str(e)});continue\n"
+    "    mark({'pgid':p.pid})\n"
+    "    fired=[]\n"
+    "    timer=threading.Timer(job['timeout'],kill,(p,fired));timer.start()\n"
+    "    _,st,ru=os.wait4(p.pid,0);timer.cancel()\n"
+    "    mark({'end':i,'timeout':bool(fired),'code':os.waitstatus_to_exitcode(st),"
+    "'wall':time.perf_counter()-start,'cpu_user':ru.ru_utime,'cpu_sys':ru.ru_stime,'maxrss':ru.ru_maxrss})\n"
+)
+
+# Free cores when runs are pinned (--pin-cpus), None otherwise
+_CPUS = None
 
 
 def log(msg):
     print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
 
 
-def run_single(domain_path, problem_path, fd_pre_args, fd_post_args, config_name, prob_id, domain_name, complexity):
-    label = f"{config_name}/{prob_id}"
-    log(f"START  {label} ({domain_name}, {complexity} objs)")
+_GEN_DIR = []
+
+
+def gen_dir():
+    """Directory where generated instances are materialised (created on first use)."""
+    if not _GEN_DIR:
+        _GEN_DIR.append(tempfile.mkdtemp(prefix="fd_gen_"))
+    return _GEN_DIR[0]
+
 
-    cmd = [
-        "docker", "run", "--rm",
+def _mounts():
+    return [
         "-v", f"{DOMAINS_DIR}:/data:ro",
-        "--memory=4g",
-        "aibasel/downward",
-    ] + fd_pre_args + [
-        f"/data/{domain_path}",
-        f"/data/{problem_path}",
-    ] + fd_post_args
-
-    start = time.time()
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=TIMEOUT)
-        elapsed = time.time() - start
-        output = result.stdout + "\n" + result.stderr
-
-        plan_length = nodes_expanded = nodes_generated = search_time = total_time = plan_cost = None
-        solved = False
-
-        for line in output.split("\n"):
-            if "Solution found" in line:
-                solved = True
-            m = re.search(r"Plan length: (\d+)", line)
-            if m: plan_length = int(m.group(1))
-            m = re.search(r"Plan cost: (\d+)", line)
-            if m: plan_cost = int(m.group(1))
-            m = re.search(r"Expanded (\d+) state", line)
-            if m: nodes_expanded = int(m.group(1))
-            m = re.search(r"Generated (\d+) state", line)
-            if m: nodes_generated = int(m.group(1))
-            m = re.search(r"Search time: ([\d.]+)s", line)
-            if m: search_time = float(m.group(1))
-            m = re.search(r"Total time: ([\d.]+)s", line)
-            if m: total_time = float(m.group(1))
-
-        status = f"plan={plan_length}, cost={plan_cost}" if solved else "NO SOLUTION"
-        log(f"DONE   {label} -> {status}, {elapsed:.2f}s, nodes={nodes_expanded}")
+        "-v", f"{SAS_CACHE_DIR}:/cache",
+        "-v", f"{gen_dir()}:/gen:ro",
+    ]
 
-        return {
-            "planner": config_name, "domain": domain_name, "problem": prob_id,
-            "complexity": complexity, "solved": solved,
-            "plan_length": plan_length, "plan_cost": plan_cost,
-            "time": round(elapsed, 4), "search_time": search_time,
-            "total_time_fd": total_time,
-            "nodes_expanded": nodes_expanded, "nodes_generated": nodes_generated,
-            "output": output[:2000],
-        }
+
+def instance_hash(domain_path, problem_path, version):
+    """Key of the translator cache: domain/problem content plus the FD version that translates it."""
+    content = suites.content_hash(os.path.join(DOMAINS_DIR, domain_path), suites.resolve(problem_path, DOMAINS_DIR))
+    return hashlib.sha256(f"{content}\0{version}".encode()).hexdigest()
+
+
+class ContainerPool:
+    """Long-lived FD containers that receive jobs through `docker exec`.
+
+    Every container mounts the domains read-only at /data, the SAS cache at
+    /cache and a host scratch directory at /work, where each job gets its own working directory (FD
+    writes output.sas and sas_plan to its cwd).
+    """
+
+    def __init__(self, size, docker=DOCKER, cpus=None):
+        self.size = size
+        self.docker = docker
+        self.cpus = cpus or [None] * size
+        self.workdir = tempfile.mkdtemp(prefix="fd_pool_")
+        self._free = queue.Queue()
+        self._lock = threading.Lock()
+        self._containers = set()
+        self._jobs = 0
+
+    def _start_container(self, cpu=None):
+        cmd = [
+            self.docker, "run", "-d", "--rm",
+        ] + _mounts() + [
+            "-v", f"{self.workdir}:/work",
+            f"--memory={MEMORY_LIMIT}",
+        ] + ([f"--cpuset-cpus={cpu}"] if cpu is not None else []) + [
+            "--entrypoint", "sleep",
+            IMAGE, "infinity",
+        ]
+        start = time.perf_counter()
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=TIMEOUT)
+        startup = time.perf_counter() - start
+        cid = result.stdout.strip().splitlines()[-1]
+        with self._lock:
+            self._containers.add(cid)
+        # `startup` is charged to the first job that runs on this container
+        return {"id": cid, "startup": startup, "cpu": cpu}
+
+    def start(self):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            for slot in executor.map(self._start_container, self.cpus):
+                self._free.put(slot)
+        log(f"Pool: {self.size} contenedores arrancados en {time.perf_counter() - start:.2f}s")
+        return self
+
+    def acquire(self):
+        slot = self._free.get()
+        if slot is None:
+            self._free.put(None)  # wake the next waiter too
+            raise RuntimeError("el pool se ha quedado sin contenedores")
+        return slot
+
+    def release(self, slot):
+        self._free.put(slot)
+
+    def replace(self, slot):
+        """Kill a container (e.g. after a timeout) and put a fresh one in its slot.
+
+        The caller must not release `slot` afterwards. If no container starts
+        after REPLACE_ATTEMPTS tries the slot is dropped and the pool shrinks;
+        once it is empty acquire() raises instead of blocking.
+        """
+        self._remove(slot["id"])
+        for attempt in range(1, REPLACE_ATTEMPTS + 1):
+            try:
+                self._free.put(self._start_container(slot["cpu"]))
+                return
+            except Exception as e:
+                log(f"Pool: no se pudo arrancar un contenedor nuevo ({attempt}/{REPLACE_ATTEMPTS}): {e}")
+        with self._lock:
+            self.size -= 1
+            size = self.size
+        log(f"Pool: se descarta el contenedor, quedan {size}")
+        if size == 0:
+            self._free.put(None)
+
+    def job_dir(self):
+        """Create a fresh job directory; returns (host_path, container_path)."""
+        with self._lock:
+            self._jobs += 1
+            name = f"job-{self._jobs}"
+        host = os.path.join(self.workdir, name)
+        os.makedirs(host)
+        return host, f"/work/{name}"
+
+    def _remove(self, cid):
+        subprocess.run([self.docker, "rm", "-f", cid], capture_output=True, timeout=30)
+        with self._lock:
+            self._containers.discard(cid)
+
+    def close(self):
+        for cid in list(self._containers):
+            self._remove(cid)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _fd_inputs(backend, domain_path, problem_path, sas_name):
+    """Planner input files as seen by the backend (PDDL pair or cached .sas)."""
+    if backend == "native":
+        if sas_name:
+            return [os.path.join(SAS_CACHE_DIR, sas_name)]
+        if generators.is_generated(problem_path):
+            return [os.path.join(DOMAINS_DIR, domain_path),
+                    os.path.join(gen_dir(), suites.materialize(problem_path, gen_dir()))]
+        return [os.path.join(DOMAINS_DIR, domain_path), os.path.join(DOMAINS_DIR, problem_path)]
+    if sas_name:
+        return [f"/cache/{sas_name}"]
+    if generators.is_generated(problem_path):
+        return [f"/data/{domain_path}", f"/gen/{suites.materialize(problem_path, gen_dir())}"]
+    return [f"/data/{domain_path}", f"/data/{problem_path}"]
+
+
+def _prepare(backend, pool, fd_args, label, wrap_rusage=False, name=None, cpu=None, driver=None):
+    """Build the command for `fd_args` on a backend.
+
+    With `wrap_rusage`, container backends run FD under measure.RUSAGE_WRAPPER
+    so CPU and peak RSS come from inside the container, not the docker CLI.
+    `driver` is a python script run instead, on every backend, with the path
+    of FD and `fd_args` as its arguments (BATCH_DRIVER).
+    `name` names the container of the docker backend, so it can be removed
+    if the run is killed, and `cpu` pins it to one core. Returns (cmd, cwd, workdir, slot, container_startup);
+    `workdir` must be removed and `slot` released back to the pool by the caller.
+    """
+    slot = None
+    container_startup = 0.0
+    workdir = cwd = None
+    script = driver or (measure.RUSAGE_WRAPPER if wrap_rusage else None)
+    wrapper = ["python3", "-c", script] if script else []
+    if backend == "docker":
+        # Host scratch directory as the container's cwd, so sas_plan can be read back
+        workdir = tempfile.mkdtemp(prefix=f"fd_{label.replace('/', '_')}_")
+        cmd = [
+            DOCKER, "run", "--rm",
+        ] + (["--name", name] if name else []) + _mounts() + [
+            "-v", f"{workdir}:/work", "-w", "/work",
+            f"--memory={MEMORY_LIMIT}",
+        ] + ([f"--cpuset-cpus={cpu}"] if cpu is not None else []) + (["--entrypoint", "python3", IMAGE, "-c", script, FD_IN_IMAGE] if script
+             else [IMAGE]) + fd_args
+    elif backend == "pool":
+        slot = pool.acquire()
+        container_startup, slot["startup"] = slot["startup"], 0.0
+        workdir, container_dir = pool.job_dir()
+        cmd = [pool.docker, "exec", "-w", container_dir, slot["id"]] + wrapper + [FD_IN_IMAGE] + fd_args
+    else:
+        workdir = cwd = tempfile.mkdtemp(prefix=f"fd_{label.replace('/', '_')}_")
+        cmd = ([sys.executable, "-c", driver] if driver else []) + [FD_NATIVE] + fd_args
+    return cmd, cwd, workdir, slot, container_startup
+
+
+def _remove_container(name):
+    # Killing `docker run` leaves the container running
+    subprocess.run([DOCKER, "rm", "-f", name], capture_output=True, timeout=30)
+
+
+def translate(domain_path, problem_path, prob_id, version, backend="docker", pool=None):
+    """Phase 1: translate an instance once into the content-addressed SAS cache.
+
+    `version` is the planner_version() of the backend, so a new image or
+    translator never reuses .sas files produced by an older one. Returns (sas_name, translate_time, cached); sas_name is None on failure.
+    """
+    os.makedirs(SAS_CACHE_DIR, exist_ok=True)
+    sas_name = instance_hash(domain_path, problem_path, version) + ".sas"
+    if os.path.exists(os.path.join(SAS_CACHE_DIR, sas_name)):
+        log(f"SAS    {prob_id} -> cache hit {sas_name[:12]}")
+        return sas_name, 0.0, True
+
+    # Write to a temp name and rename, so a partial file is never a cache hit
+    tmp_name = f"tmp-{os.getpid()}-{threading.get_ident()}-{sas_name}"
+    if backend == "native":
+        sas_arg = os.path.join(SAS_CACHE_DIR, tmp_name)
+    else:
+        sas_arg = f"/cache/{tmp_name}"
+    fd_args = ["--sas-file", sas_arg, "--translate"] + _fd_inputs(backend, domain_path, problem_path, None)
+    # Named, so a translation killed at the timeout does not leave its container running
+    name = f"fd-{uuid.uuid4().hex[:12]}" if backend == "docker" else None
+    cmd, cwd, workdir, slot, container_startup = _prepare(backend, pool, fd_args, f"translate/{prob_id}", name=name)
+    if slot is not None:
+        # Leave the startup charge for the first search job on this container
+        slot["startup"] = container_startup
+
+    start = time.perf_counter()
+    try:
+        result, _ = measure.run_measured(cmd, TIMEOUT, cwd=cwd,
+                                         on_kill=(lambda: _remove_container(name)) if name else None)
+        if result.returncode:
+            raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
+        elapsed = time.perf_counter() - start
+        os.replace(os.path.join(SAS_CACHE_DIR, tmp_name), os.path.join(SAS_CACHE_DIR, sas_name))
+        log(f"SAS    {prob_id} -> traducido en {elapsed:.2f}s ({sas_name[:12]})")
+        return sas_name, elapsed, False
     except subprocess.TimeoutExpired:
-        elapsed = time.time() - start
-        log(f"TIMEOUT {label} after {elapsed:.1f}s")
-        return {
-            "planner": config_name, "domain": domain_name, "problem": prob_id,
-            "complexity": complexity, "solved": False,
-            "plan_length": None, "plan_cost": None,
-            "time": round(elapsed, 4), "search_time": None, "total_time_fd": None,
-            "nodes_expanded": None, "nodes_generated": None, "output": "TIMEOUT",
-        }
+        log(f"ERROR  traduccion {prob_id}: TIMEOUT")
+        if slot is not None:
+            dead, slot = slot, None
+            pool.replace(dead)
     except Exception as e:
-        elapsed = time.time() - start
-        log(f"ERROR  {label}: {e}")
+        log(f"ERROR  traduccion {prob_id}: {e}")
+    finally:
+        if slot is not None:
+            pool.release(slot)
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+        tmp_path = os.path.join(SAS_CACHE_DIR, tmp_name)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return None, time.perf_counter() - start, False
+
+
+def _plan_actions(workdir):
+    """Best plan FD left in its working directory (last sas_plan.N for anytime)."""
+    if workdir is None or not os.path.isdir(workdir):
+        return []
+    name = validate.latest_plan_file(os.listdir(workdir))
+    return validate.read_plan(os.path.join(workdir, name)) if name else []
+
+
+def search_command(job, backend, pool=None, sas_name=None, name=None, cpu=None):
+    """Command of one search run (on `sas_name` if given); returns _prepare()'s tuple."""
+    domain_path, problem_path, fd_pre_args, fd_post_args, config_name, prob_id = job[:6]
+    fd_args = fd_pre_args + _fd_inputs(backend, domain_path, problem_path, sas_name) + fd_post_args
+    return _prepare(backend, pool, fd_args, f"{config_name}/{prob_id}", wrap_rusage=True, name=name, cpu=cpu)
+
+
+def run_base(job, backend, container_startup=0.0, sas=None):
+    """Fields every result of `job` carries; `sas` as in run_single."""
+    _, _, _, _, config_name, prob_id, domain_name, complexity = job
+    _, translate_time, translate_cached = sas or (None, None, None)
+    return {
+        "planner": config_name, "domain": domain_name, "problem": prob_id,
+        "complexity": complexity, "backend": backend,
+        "container_startup_time": round(container_startup, 4),
+        "translate_time": None if translate_time is None else round(translate_time, 4),
+        "translate_cached": translate_cached,
+    }
+
+
+def run_result(label, base, parser, usage, workdir, status=None, note=""):
+    """Result of a run that finished (`status` None) or was killed (TIMEOUT, CANCELLED, ABORTED).
+
+    A killed run keeps the best plan it found (anytime configurations);
+    `note` is appended to its log line.
+    """
+    elapsed = usage["wall_time"]
+    if status is not None:
+        incumbents = parser.incumbents
+        best = incumbents[-1] if incumbents else {"cost": None, "length": None}
+        log(f"{status} {label} after {elapsed:.1f}s" + (f" (mejor plan: cost={best['cost']})" if incumbents else "")
+            + note)
         return {
-            "planner": config_name, "domain": domain_name, "problem": prob_id,
-            "complexity": complexity, "solved": False,
-            "plan_length": None, "plan_cost": None,
+            **base, "solved": bool(incumbents),
+            "plan_length": best["length"], "plan_cost": best["cost"],
             "time": round(elapsed, 4), "search_time": None, "total_time_fd": None,
-            "nodes_expanded": None, "nodes_generated": None, "output": f"ERROR: {e}",
+            "peak_memory_fd_kb": None, **measure.rounded(usage),
+            "nodes_expanded": None, "nodes_generated": None,
+            "incumbents": incumbents, "telemetry": parser.telemetry.encode(), "output": status,
+            "plan_actions": _plan_actions(workdir),
         }
 
+    stats = parser.stats
+    solved = stats["solved"]
+    outcome = f"plan={stats['plan_length']}, cost={stats['plan_cost']}" if solved else "NO SOLUTION"
+    log(f"DONE   {label} -> {outcome}, {elapsed:.2f}s (cpu {usage['cpu_time'] or 0:.2f}s), "
+        f"nodes={stats['nodes_expanded']}")
+    return {
+        **base, "solved": solved,
+        "plan_length": stats["plan_length"], "plan_cost": stats["plan_cost"],
+        "time": round(elapsed, 4), "search_time": stats["search_time"],
+        "total_time_fd": stats["total_time"], "peak_memory_fd_kb": stats["peak_memory_kb"],
+        **measure.rounded(usage),
+        "nodes_expanded": stats["nodes_expanded"], "nodes_generated": stats["nodes_generated"],
+        "incumbents": parser.incumbents, "telemetry": parser.telemetry.encode(),
+        "output": parser.output, "plan_actions": _plan_actions(workdir),
+    }
 
-def main():
-    os.makedirs(RESULTS_DIR, exist_ok=True)
 
-    # Quick Docker check
+def error_result(label, base, elapsed, e):
+    log(f"ERROR  {label}: {e}")
+    return {
+        **base, "solved": False,
+        "plan_length": None, "plan_cost": None,
+        "time": round(elapsed, 4), "search_time": None, "total_time_fd": None,
+        "nodes_expanded": None, "nodes_generated": None, "output": f"ERROR: {e}",
+        "plan_actions": [],
+    }
+
+
+def run_single(domain_path, problem_path, fd_pre_args, fd_post_args, config_name, prob_id, domain_name, complexity,
+               backend="docker", pool=None, sas=None, timeout=None, cancel=None, on_incumbent=None, abort=None):
+    """Run one FD configuration; with `sas=(sas_name, translate_time, cached)`
+    only the search component runs, on the cached translator output.
+
+    `timeout` overrides TIMEOUT, `cancel` (threading.Event) kills the run early
+    and `on_incumbent(inc)` is called for every improved plan as it appears.
+    `abort` (predictor.Budget) kills a run whose expansion rate, read from the
+    progress lines, can no longer reach the predicted node count in time.
+    """
+    job = (domain_path, problem_path, fd_pre_args, fd_post_args, config_name, prob_id, domain_name, complexity)
+    label = f"{config_name}/{prob_id}"
+    log(f"START  {label} ({domain_name}, {complexity} objs, {backend}{', sas' if sas else ''})")
+
+    name = f"fd-{uuid.uuid4().hex[:12]}" if backend == "docker" else None
+    # Pool containers carry their own core; other backends borrow one per run
+    cpu = _CPUS.get() if _CPUS is not None and backend != "pool" else None
+    cmd, cwd, workdir, slot, container_startup = search_command(job, backend, pool, sas[0] if sas else None,
+                                                                name=name, cpu=cpu)
+    pin = (lambda: scheduler.pin_to_cpu(cpu)) if backend == "native" and cpu is not None else None
+
+    base = run_base(job, backend, container_startup, sas)
+    container_usage = []
+
+    def report(inc):
+        log(f"PLAN   {label} -> cost={inc['cost']} a los {inc['time']:.2f}s")
+        if on_incumbent is not None:
+            on_incumbent(inc)
+
+    parser = log_parser.LogParser(on_incumbent=report)
+    aborted = []
+    if abort is not None and cancel is None:
+        cancel = threading.Event()
+    else:
+        abort = None  # a portfolio race owns `cancel`
+
+    def on_line(line, t):
+        found = measure.wrapper_usage(line)
+        if found is not None:
+            container_usage[:] = [found]
+            return
+        parser.feed(line, t)
+        point = parser.telemetry.latest()
+        if abort is not None and not aborted and point is not None and abort.hopeless(t, point[1]):
+            aborted.append(point[1])
+            cancel.set()
+
+    start = time.perf_counter()
+    try:
+        _, usage = measure.run_measured(cmd, timeout or TIMEOUT, on_line=on_line, cancel=cancel,
+                                        on_kill=(lambda: _remove_container(name)) if name else None, cwd=cwd,
+                                        preexec_fn=pin)
+        if backend != "native":
+            # The local rusage belongs to the docker CLI, not to the planner
+            usage.update(container_usage[0] if container_usage else measure.NO_USAGE)
+        return run_result(label, base, parser, usage, workdir)
+    except subprocess.TimeoutExpired as e:
+        status = "TIMEOUT"
+        if isinstance(e, measure.MeasuredCancelled):
+            status = "ABORTED" if aborted else "CANCELLED"
+        usage = {**(getattr(e, "usage", {}) if backend == "native" else measure.NO_USAGE),
+                 "wall_time": time.perf_counter() - start}
+        if slot is not None:
+            # Killing `docker exec` does not stop the planner inside the container
+            dead, slot = slot, None
+            pool.replace(dead)
+        r = run_result(label, base, parser, usage, workdir, status,
+                       f" ({aborted[0]} nodos, se necesitan al menos {abort.nodes:.0f})" if aborted else "")
+        r["nodes_expanded"] = aborted[0] if aborted else None
+        return r
+    except Exception as e:
+        return error_result(label, base, time.perf_counter() - start, e)
+    finally:
+        if slot is not None:
+            pool.release(slot)
+        if cpu is not None:
+            _CPUS.put(cpu)
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _batch_result(base, parser, mark, workdir):
+    """Result of one problem of a batch, from its parser and the driver's end marker."""
+    label = f"{base['planner']}/{base['problem']}"
+    if "error" in mark:
+        log(f"ERROR  {label}: {mark['error']}")
+        return _batch_failure(base, f"ERROR: {mark['error']}")
+    # The driver runs on Linux (container or native host): ru_maxrss is already KB
+    usage = {"wall_time": mark["wall"], "cpu_user": mark["cpu_user"], "cpu_sys": mark["cpu_sys"],
+             "cpu_time": mark["cpu_user"] + mark["cpu_sys"], "peak_rss_kb": mark["maxrss"]}
+    return run_result(label, base, parser, usage, workdir, "TIMEOUT" if mark["timeout"] else None)
+
+
+def _batch_failure(base, output, elapsed=None):
+    return {
+        **base, "solved": False,
+        "plan_length": None, "plan_cost": None,
+        "time": None if elapsed is None else round(elapsed, 4), "search_time": None, "total_time_fd": None,
+        "nodes_expanded": None, "nodes_generated": None, "output": output,
+        "plan_actions": [],
+    }
+
+
+def run_batch(batch_id, items, backend="docker", pool=None, sas=None, results=None):
+    """Solve several problems of one domain and configuration with a single FD
+    container (or a single driver process on the native backend).
+
+    `items` are (job, timeout); `sas` maps (domain, problem) to translate()
+    output as in run_single. BATCH_DRIVER runs FD on each problem in turn,
+    in its own working directory and under its own timeout, so a failure only
+    affects that problem. Each result is built as soon as its end marker
+    arrives and put on `results` as (batch_id, index, result); the list is
+    returned as well. The container start-up goes to the first result.
+    """
+    sas = sas or {}
+    job0 = items[0][0]
+    label = f"{job0[4]}/{job0[6]}"
+    log(f"BATCH  {label}: {len(items)} problemas ({backend})")
+    spec, bases = [], []
+    for i, (job, timeout) in enumerate(items):
+        domain_path, problem_path, pre, post = job[:4]
+        translated = sas.get((domain_path, problem_path))
+        # Relative: the driver's cwd is the batch's working directory on every backend
+        spec.append({"cwd": f"p{i}", "timeout": timeout,
+                     "args": pre + _fd_inputs(backend, domain_path, problem_path,
+                                              translated[0] if translated else None) + post})
+        bases.append({**run_base(job, backend, sas=translated), "batch_size": len(items)})
+
+    name = f"fd-{uuid.uuid4().hex[:12]}" if backend == "docker" else None
+    cpu = _CPUS.get() if _CPUS is not None and backend != "pool" else None
+    cmd, cwd, workdir, slot, container_startup = _prepare(backend, pool, [json.dumps(spec)], f"batch/{label}",
+                                                          name=name, cpu=cpu, driver=BATCH_DRIVER)
+    pin = (lambda: scheduler.pin_to_cpu(cpu)) if backend == "native" and cpu is not None else None
+    out = [None] * len(items)
+    current = {}  # index, parser and start offset of the problem being solved
+
+    def emit(i, r):
+        out[i] = r
+        if results is not None:
+            results.put((batch_id, i, r))
+
+    def on_line(line, t):
+        if line.startswith(BATCH_MARKER):
+            mark = json.loads(line[len(BATCH_MARKER):])
+            if "pgid" in mark:
+                current["pgid"] = mark["pgid"]
+            elif "begin" in mark:
+                i = mark["begin"]
+                pid = items[i][0][5]
+                parser = log_parser.LogParser(
+                    on_incumbent=lambda inc: log(f"PLAN   {job0[4]}/{pid} -> cost={inc['cost']} a los {inc['time']:.2f}s"))
+                current.update(index=i, parser=parser, start=t)
+                if i == 0 and backend != "native":
+                    bases[0]["container_startup_time"] = round(container_startup + t, 4)
+                log(f"START  {job0[4]}/{pid} (lote {label}, {i + 1}/{len(items)})")
+            else:
+                i = mark["end"]
+                emit(i, _batch_result(bases[i], current["parser"], mark, os.path.join(workdir, f"p{i}")))
+                current.clear()
+            return
+        if current:
+            current["parser"].feed(line, t - current["start"])
+
+    def on_kill():
+        if name:
+            _remove_container(name)
+        elif backend == "native" and "pgid" in current:
+            # Each problem runs in its own process group, out of reach of the driver's kill
+            try:
+                os.killpg(current["pgid"], signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    start = time.perf_counter()
+    try:
+        try:
+            measure.run_measured(cmd, sum(timeout for _, timeout in items) + BATCH_SLACK, on_line=on_line,
+                                 on_kill=on_kill, cwd=cwd, preexec_fn=pin)
+            failure = "ERROR: el lote termino antes de este problema"
+        except subprocess.TimeoutExpired:
+            failure = "TIMEOUT"
+            if slot is not None:
+                # Killing `docker exec` does not stop the driver inside the container
+                dead, slot = slot, None
+                pool.replace(dead)
+        except Exception as e:
+            failure = f"ERROR: {e}"
+        if None in out:
+            log(f"ERROR  lote {label}: {out.count(None)} problemas sin resultado ({failure})")
+        for i, r in enumerate(out):
+            if r is None:
+                running = current.get("index") == i
+                elapsed = time.perf_counter() - start - current["start"] if running else None
+                emit(i, _batch_failure(bases[i], failure if running else "ERROR: lote interrumpido", elapsed))
+    finally:
+        if slot is not None:
+            pool.release(slot)
+        if cpu is not None:
+            _CPUS.put(cpu)
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return out
+
+
+def planner_version(backend):
+    """Image id for the Docker backends, `--version` output for native FD."""
+    if backend == "native":
+        cmd = [FD_NATIVE, "--version"]
+    else:
+        cmd = [DOCKER, "image", "inspect", "--format", "{{.Id}}", IMAGE]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        lines = result.stdout.strip().splitlines()
+        if result.returncode == 0 and lines:
+            return lines[-1].strip()
+    except Exception:
+        pass
+    return "unknown"
+
+
+def check_backend(backend):
+    """Quick availability check for the selected backend."""
+    if backend == "native":
+        return shutil.which(FD_NATIVE) is not None
     try:
-        subprocess.run(["docker", "info"], capture_output=True, check=True, timeout=10)
+        subprocess.run([DOCKER, "info"], capture_output=True, check=True, timeout=10)
+        return True
     except Exception:
-        log("ERROR: Docker no disponible"); return
+        return False
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=BACKENDS, default="docker",
+                        help="docker: un contenedor por ejecucion; pool: contenedores "
+                             "persistentes + docker exec; native: fast-downward.py local")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="numero de workers (por defecto segun cores y RAM disponibles)")
+    parser.add_argument("--memory", default=MEMORY_LIMIT,
+                        help="limite de memoria por contenedor/ejecucion (p.ej. 4g)")
+    parser.add_argument("--translate-cache", action="store_true",
+                        help="traducir cada instancia una sola vez y reutilizar el .sas "
+                             "cacheado en todas las configuraciones")
+    parser.add_argument("--rerun", action="store_true",
+                        help="repetir tambien las ejecuciones que ya estan en el almacen")
+    parser.add_argument("--suite", default=suites.DEFAULT_SUITE,
+                        help="suite de instancias (JSON, ver suites/)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="repeticiones de cada ejecucion (cada muestra se guarda con su `rep`)")
+    parser.add_argument("--warmup", type=int, default=0,
+                        help="rondas de calentamiento descartadas antes de medir")
+    parser.add_argument("--batch", type=int, default=1,
+                        help="resolver hasta N problemas del mismo dominio y configuracion seguidos en un "
+                             "solo contenedor (o proceso nativo)")
+    parser.add_argument("--pin-cpus", action="store_true",
+                        help="fijar cada ejecucion/contenedor a un core distinto (--cpuset-cpus)")
+    run_cache.add_arguments(parser)
+    predictor.add_arguments(parser)
+    return parser.parse_args(argv)
+
 
+def hashed_config(config_name, backend="docker"):
+    """Configuration as it enters the store and cache keys.
+
+    With docker, `time` includes the `docker run` start-up; the other backends
+    do not pay it, so they carry their backend. Docker keeps the bare
+    configuration, and with it the keys of the existing results.
+    """
+    cfg = CONFIGS[config_name]
+    return cfg if backend == "docker" else {**cfg, "backend": backend}
+
+
+def config_hashes(backend="docker"):
+    return {cn: results_store.config_hash({**hashed_config(cn, backend), "timeout": TIMEOUT}) for cn in CONFIGS}
+
+
+def build_jobs(suite, repeat, store, version, rerun=False, backend="docker"):
+    """Pending (job, rep) pairs of a suite in launch order, plus every key of the sweep."""
+    hashes = config_hashes(backend)
+    done = set() if rerun else results_store.completed_keys(store)
     jobs = []
-    for dn, info in PROBLEMS.items():
+    keys = set()
+    for dn, info in suites.load(suite).items():
         dp = info["domain"]
         for pid, pp, cx in info["instances"]:
             for cn, cfg in CONFIGS.items():
-                jobs.append((dp, pp, cfg["pre"], cfg["post"], cn, pid, dn, cx))
+                job = (dp, pp, cfg["pre"], cfg["post"], cn, pid, dn, cx)
+                for rep in range(repeat):
+                    key = (cn, dn, pid, hashes[cn], version, rep)
+                    keys.add(key)
+                    if key not in done:
+                        jobs.append((job, rep))
+
+    # Longest predicted jobs first, so the hardest instances don't stretch the tail.
+    # Repetitions go in rounds, so slow drift on the machine spreads over all configs.
+    history = results_store.load_any(store)
+    jobs = [jr for rep in range(repeat)
+            for jr in scheduler.order_jobs([jr for jr in jobs if jr[1] == rep],
+                                           lambda jr: (jr[0][4], jr[0][6], jr[0][5], jr[0][7]), history, TIMEOUT)]
+    return jobs, keys
+
+
+def finish(r, job, rep, version, backend="docker"):
+    """Validate the plan of a result and tag it with the rest of its store key."""
+    r.update(validate.check(os.path.join(DOMAINS_DIR, job[0]), suites.resolve(job[1], DOMAINS_DIR),
+                            r.get("plan_actions")))
+    r.update(config_hash=config_hashes(backend)[r["planner"]], planner_version=version, rep=rep)
+    return r
+
+
+def _failure(r):
+    return r["output"] if r["output"] in ("ABORTED", "SKIPPED") else "TIMEOUT/FAIL"
+
+
+def cache_key(job, rep, version, backend="docker"):
+    return run_cache.key(os.path.join(DOMAINS_DIR, job[0]), suites.resolve(job[1], DOMAINS_DIR),
+                         hashed_config(job[4], backend), TIMEOUT, version, rep)
+
+
+def from_cache(r, job, rep, version, backend="docker"):
+    """A cached result tagged with this sweep's names and store key."""
+    r.update(planner=job[4], problem=job[5], domain=job[6], complexity=job[7], from_cache=True)
+    r.update(config_hash=config_hashes(backend)[r["planner"]], planner_version=version, rep=rep)
+    return r
+
+
+def main(argv=None):
+    global MEMORY_LIMIT, _CPUS
+    args = parse_args(argv)
+    MEMORY_LIMIT = args.memory
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+
+    if not check_backend(args.backend):
+        log(f"ERROR: backend {args.backend} no disponible"); return
+
+    store = os.path.join(RESULTS_DIR, STORE_FILE)
+    version = planner_version(args.backend)
+    jobs, keys = build_jobs(args.suite, args.repeat, store, version, rerun=args.rerun, backend=args.backend)
+    cache_dir = None if args.no_cache else os.path.join(RESULTS_DIR, run_cache.CACHE_DIR)
+    if cache_dir and not args.rerun:
+        jobs, hits = run_cache.split(cache_dir, jobs, lambda job, rep: cache_key(job, rep, version, args.backend))
+        for job, rep, r in hits:
+            results_store.append(store, from_cache(r, job, rep, version, args.backend))
+        if hits:
+            log(f"{len(hits)} ejecuciones servidas desde {cache_dir}")
+    model = predictor.Predictor(results_store.load_any(store)) if predictor.enabled(args) else None
+    planned, skipped = predictor.plan_jobs(model, jobs, lambda job: (job[4], job[6], job[7]), TIMEOUT, args)
+    for job, rep, p_solve in skipped:
+        r = predictor.skipped_result(run_base(job, args.backend), p_solve)
+        results_store.append(store, finish(r, job, rep, version, args.backend))
+    if skipped:
+        log(f"{len(skipped)} ejecuciones sin esperanza segun el predictor: no se lanzan (SKIPPED)")
+    jobs = [(job, rep) for job, rep, _, _ in planned]
+    args.workers = args.workers or scheduler.pool_size(args.memory)
+    cores = None
+    if args.pin_cpus:
+        cores = scheduler.pinnable_cpus(args.workers)
+        args.workers = max(1, len(cores))
+        if args.backend != "pool":
+            _CPUS = queue.Queue()
+            for core in cores:
+                _CPUS.put(core)
+    log(f"Lanzando {len(jobs)} ejecuciones con {args.workers} workers, {args.memory}/contenedor "
+        f"({args.backend}{', 1 core/worker' if cores else ''}{f', lotes de {args.batch}' if args.batch > 1 else ''}, "
+        f"{args.repeat} rep.), "
+        f"{len(keys) - len(jobs)} ya en {store}...")
+
+    os.makedirs(SAS_CACHE_DIR, exist_ok=True)
+    pool = ContainerPool(args.workers, cpus=cores).start() if args.backend == "pool" else None
+    runner = partial(run_single, backend=args.backend, pool=pool)
+    # Jobs hold the config's argument lists, so dedupe by (config, domain, problem)
+    distinct = list({(job[4], job[6], job[5]): job for job, _ in jobs}.values())
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            sas = {}
+            if args.translate_cache:
+                # Phase 1: one translation per distinct instance
+                instances = {(j[0], j[1]): j[5] for j in distinct}
+                tfutures = {
+                    executor.submit(translate, dp, pp, pid, version, args.backend, pool): (dp, pp)
+                    for (dp, pp), pid in instances.items()
+                }
+                for f in as_completed(tfutures):
+                    if f.result()[0] is not None:
+                        sas[tfutures[f]] = f.result()
+
+            if args.warmup and distinct:
+                # Discarded runs: image layers, page cache, container start-up paths
+                log(f"Calentamiento: {args.warmup} x {len(distinct)} ejecuciones descartadas")
+                for _ in range(args.warmup):
+                    for f in as_completed([executor.submit(runner, *j, sas=sas.get((j[0], j[1])))
+                                           for j in distinct]):
+                        f.result()
 
-    log(f"Lanzando {len(jobs)} ejecuciones con 4 workers (Docker)...")
-    all_results = []
+            def record(r, job, rep, timeout):
+                r = finish(r, job, rep, version, args.backend)
+                if timeout < TIMEOUT:
+                    r["timeout_budget"] = round(timeout, 2)
+                results_store.append(store, r)
+                if cache_dir:
+                    run_cache.put(cache_dir, cache_key(job, rep, version, args.backend), r)
 
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        futures = {executor.submit(run_single, *j): j for j in jobs}
-        for f in as_completed(futures):
-            all_results.append(f.result())
+            # Phase 2: searches (instances whose translation failed run the full pipeline)
+            try:
+                if args.batch > 1:
+                    # Same domain, configuration and repetition per batch
+                    batches = scheduler.batches(planned, lambda p: (p[0][0], p[0][4], p[1]), args.batch)
+                    results = queue.Queue()
+                    futures = [executor.submit(run_batch, bid, [(j, timeout) for j, _, timeout, _ in batch],
+                                               backend=args.backend, pool=pool, sas=sas, results=results)
+                               for bid, batch in enumerate(batches)]
+                    for bid, i, r in scheduler.stream_results(results, futures, len(planned)):
+                        job, rep, timeout, _ = batches[bid][i]
+                        record(r, job, rep, timeout)
+                else:
+                    futures = {executor.submit(runner, *j, sas=sas.get((j[0], j[1])), abort=budget,
+                                               timeout=timeout if timeout < TIMEOUT else None): (j, rep, timeout)
+                               for j, rep, timeout, budget in planned}
+                    for f in as_completed(futures):
+                        record(f.result(), *futures[f])
+            except KeyboardInterrupt:
+                log("Interrumpido: los resultados terminados ya estan en el almacen")
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+    finally:
+        if pool is not None:
+            pool.close()
+        shutil.rmtree(gen_dir(), ignore_errors=True)
+        _GEN_DIR.clear()
+        _CPUS = None
+    if cache_dir and (args.cache_max_age is not None or args.cache_max_size is not None):
+        removed, freed = run_cache.evict(cache_dir, args.cache_max_age, args.cache_max_size)
+        log(f"Cache: {removed} entradas borradas ({freed / 1024 / 1024:.1f} MB)")
 
-    all_results.sort(key=lambda r: (r["domain"], r["problem"], r["planner"]))
-    out = os.path.join(RESULTS_DIR, "fast_downward_results.json")
-    with open(out, "w") as f:
-        json.dump(all_results, f, indent=2)
+    all_results = [r for r in results_store.load(store) if results_store.result_key(r) in keys]
+    all_results.sort(key=lambda r: (r["domain"], r["problem"], r["planner"], r.get("rep", 0)))
+    out = store
 
     solved = sum(1 for r in all_results if r["solved"])
     log(f"\nRESUMEN: {solved}/{len(all_results)} resueltos")
+    startup = sum(r.get("container_startup_time") or 0 for r in all_results)
+    if startup:
+        log(f"Arranque de contenedores: {startup:.2f}s en total (fuera de 'time')")
     for r in all_results:
-        s = "OK" if r["solved"] else "TIMEOUT/FAIL"
-        log(f"  {r['planner']:15s} {r['problem']:5s} -> {s:12s} plan={str(r['plan_length']):>5s} t={r['time']:.2f}s nodes={r['nodes_expanded']}")
+        s = "INVALID" if r.get("plan_valid") is False else ("OK" if r["solved"] else _failure(r))
+        rep = f" #{r.get('rep', 0)}" if args.repeat > 1 else ""
+        t = "-" if r["time"] is None else f"{r['time']:.2f}s"
+        log(f"  {r['planner']:15s} {r['problem']:5s}{rep} -> {s:12s} plan={str(r['plan_length']):>5s} t={t} nodes={r['nodes_expanded']}")
     log(f"Guardado en {out}")
 
 
@@ -1,67 +1,132 @@
 """
 Ejecuta pyperplan en paralelo con timeouts agresivos y logging detallado.
+
+Dos modos de ejecucion:
+- subprocess: un interprete `python -m pyperplan` nuevo por ejecucion.
+- inprocess: cada worker importa pyperplan una sola vez y llama a su API
+  (parser, grounder, busqueda); la tarea grounded se cachea por instancia.
+
+Resultados en results/pyperplan_results.jsonl (results_store.py) y en el
+cache de ejecuciones (run_cache.py); pool, orden y --repeat en scheduler.py.
+
+Cada resultado incluye el tiempo de pared (`time`, perf_counter), la CPU
+user+sys (`cpu_user`, `cpu_sys`, `cpu_time`) y el pico de memoria residente
+(`peak_rss_kb`) de la ejecucion, ademas del `search_time` que reporta pyperplan.
+
+PP-IWASTAR-FF es una configuracion anytime (weighted A* iterado con pesos
+decrecientes, siempre en proceso): cada plan mejorado se registra con su
+instante en `incumbents`, y si se agota el TIMEOUT se conserva el mejor.
+
+Las configuraciones PP-*-NP usan el front end de fast_ground.py (grounding
+por alcanzabilidad y h_add / h_FF en NumPy) con las busquedas de pyperplan, y
+las PP-*-CS el backend de busqueda compacto de compact_search.py (estados
+como bitsets). Ambas se ejecutan siempre en proceso. En proceso se guarda
+tambien la memoria de la busqueda (`search_memory_kb`) y `bytes_per_node` por
+nodo expandido: el pico de tracemalloc, exacto pero varias veces mas lento,
+en las PP-*-CS y sus equivalentes de pyperplan (PP-ASTAR-FF, PP-ASTAR-ADD) o
+con --trace-memory; en el resto el pico de RSS sobre el RSS al empezar (None
+si crece menos de RSS_NOISE_KB) (`search_memory_source`).
+
+Las instancias salen de una suite declarativa (--suite, por defecto
+suites/default.json); las generadas (`gen:...`) se parsean en memoria en modo
+inprocess y solo se escriben al directorio temporal de la ejecucion en modo
+subprocess.
+
+Con --batch N los trabajos del mismo dominio, configuracion y repeticion se
+agrupan en lotes de hasta N problemas que un worker resuelve seguidos en
+proceso (run_batch): el dominio se parsea una vez, cada problema tiene su
+propio timeout y un fallo solo afecta a su resultado, que llega al almacen
+en cuanto termina.
 """
 
-import json
+import argparse
+import logging
+import multiprocessing
 import os
 import shutil
+import signal
 import sys
 import tempfile
 import time
-import subprocess
+import tracemalloc
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from importlib.metadata import version
+
+import compact_search
+import fast_ground
+import generators
+import log_parser
+import measure
+import predictor
+import results_store
+import run_cache
+import scheduler
+import suites
+import telemetry
+import validate
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RESULTS_DIR = os.path.join(BASE_DIR, "results")
 DOMAINS_DIR = os.path.join(BASE_DIR, "domains")
 TIMEOUT = 60  # 60s per run — plenty for pyperplan
+MEMORY_LIMIT = "4g"  # per run, same cap as the FD containers
+TASK_CACHE_SIZE = 8  # grounded tasks kept per worker in inprocess mode
+RSS_NOISE_KB = 1024  # RSS growth below this is allocator noise, not the search
+STORE_FILE = "pyperplan_results.jsonl"
 
 CONFIGS = {
     "PP-ASTAR-FF": {"search": "astar", "heuristic": "hff"},
     "PP-GBF-FF": {"search": "gbf", "heuristic": "hff"},
     "PP-ASTAR-ADD": {"search": "astar", "heuristic": "hadd"},
+    "PP-IWASTAR-FF": {"search": "iwastar", "heuristic": "hff"},
+    # Fast front end (fast_ground.py): reachability grounder + NumPy hadd/hff
+    "PP-ASTAR-FF-NP": {"search": "astar", "heuristic": "hff", "frontend": "numpy"},
+    "PP-GBF-FF-NP": {"search": "gbf", "heuristic": "hff", "frontend": "numpy"},
+    "PP-ASTAR-ADD-NP": {"search": "astar", "heuristic": "hadd", "frontend": "numpy"},
+    # Memory-lean search (compact_search.py): bitset states, array-backed nodes
+    "PP-ASTAR-FF-CS": {"search": "astar", "heuristic": "hff", "search_backend": "compact"},
+    "PP-ASTAR-ADD-CS": {"search": "astar", "heuristic": "hadd", "search_backend": "compact"},
 }
 
-PROBLEMS = {
-    "blocksworld": {
-        "domain": os.path.join(DOMAINS_DIR, "blocksworld", "domain.pddl"),
-        "instances": [
-            ("BW-1", "instance-4.pddl", 5),
-            ("BW-2", "instance-10.pddl", 7),
-            ("BW-3", "instance-17.pddl", 9),
-            ("BW-4", "instance-25.pddl", 12),
-            ("BW-5", "instance-35.pddl", 17),
-        ],
-    },
-    "gripper": {
-        "domain": os.path.join(DOMAINS_DIR, "gripper", "domain.pddl"),
-        "instances": [
-            ("GR-1", "instance-1.pddl", 4),
-            ("GR-2", "instance-4.pddl", 10),
-            ("GR-3", "instance-7.pddl", 16),
-            ("GR-4", "instance-10.pddl", 22),
-            ("GR-5", "instance-14.pddl", 30),
-        ],
-    },
-}
+# Weights of the anytime search, one restart per weight
+ANYTIME_WEIGHTS = (5, 3, 2, 1.5, 1)
+
+# Instances come from a declarative suite (suites/*.json, see suites.py)
+PROBLEMS = suites.load()
 
 
 def log(msg):
     print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
 
 
-def run_single(domain_file, problem_file, search, heuristic, config_name, prob_id, domain_name, complexity):
-    """Run one pyperplan configuration on one problem."""
-    label = f"{config_name}/{prob_id}"
-    log(f"START  {label} ({domain_name}, {complexity} objs, {search}+{heuristic})")
+# Per-worker settings, filled in by init_worker
+_MEMORY_LIMIT = MEMORY_LIMIT
+_TRACE_MEMORY = False
+
+
+def _link(src, dst):
+    """Symlink an input into a run's temp dir; copy where links are not allowed."""
+    try:
+        os.symlink(os.path.abspath(src), dst)
+    except OSError:
+        shutil.copy2(src, dst)
 
-    # Copy files to temp dir to avoid .soln race conditions between parallel runs
+
+def cli_command(job):
+    """Temp dir with the inputs of a CLI run and its command -> (cmd, tmpdir, plan_file)."""
+    domain_file, problem_file, search, heuristic, config_name, prob_id = job[:6]
+    # Link files into a temp dir to avoid .soln race conditions between parallel runs
     tmpdir = tempfile.mkdtemp(prefix=f"pp_{config_name}_{prob_id}_")
     tmp_domain = os.path.join(tmpdir, "domain.pddl")
     tmp_problem = os.path.join(tmpdir, "problem.pddl")
-    shutil.copy2(domain_file, tmp_domain)
-    shutil.copy2(problem_file, tmp_problem)
+    _link(domain_file, tmp_domain)
+    if generators.is_generated(problem_file):
+        # The CLI needs a file: generated instances only exist in this temp dir
+        with open(tmp_problem, "w") as f:
+            f.write(generators.generate(problem_file))
+    else:
+        _link(problem_file, tmp_problem)
 
     cmd = [
         sys.executable, "-m", "pyperplan",
@@ -70,100 +135,614 @@ def run_single(domain_file, problem_file, search, heuristic, config_name, prob_i
         tmp_domain,
         tmp_problem,
     ]
+    return cmd, tmpdir, tmp_problem + ".soln"
+
+
+def run_base(job):
+    """Fields every result of `job` carries."""
+    _, _, search, heuristic, config_name, prob_id, domain_name, complexity = job
+    return {"planner": config_name, "domain": domain_name, "problem": prob_id,
+            "complexity": complexity, "search": search, "heuristic": heuristic}
+
+
+def run_result(label, base, parser, usage, plan_file, status=None):
+    """Result of a CLI run that finished (`status` None) or was killed (TIMEOUT, CANCELLED)."""
+    elapsed = usage["wall_time"]
+    if status is not None:
+        log(f"{status} {label} after {elapsed:.1f}s")
+        return {
+            **base, "solved": False, "plan_length": None,
+            "time": round(elapsed, 4), "search_time": None, **measure.rounded(usage),
+            "nodes_expanded": parser.stats["nodes_expanded"],
+            "output": status, "plan_actions": [],
+        }
+
+    stats = parser.stats
+    memout = stats["memout"]
+    plan_length = None
+    plan_actions = []
+    if os.path.exists(plan_file):
+        plan_actions = validate.read_plan(plan_file)
+        plan_length = len(plan_actions)
 
-    start = time.time()
+    outcome = f"plan={plan_length}" if plan_length else ("MEMOUT" if memout else "NO PLAN")
+    log(f"DONE   {label} -> {outcome}, {elapsed:.2f}s (cpu {usage['cpu_time'] or 0:.2f}s), "
+        f"nodes={stats['nodes_expanded']}")
+    return {
+        **base, "solved": plan_length is not None, "plan_length": plan_length,
+        "time": round(elapsed, 4), "search_time": stats["search_time"], **measure.rounded(usage),
+        "nodes_expanded": stats["nodes_expanded"], "memout": memout,
+        "incumbents": ([{"time": round(elapsed, 4), "cost": plan_length, "length": plan_length}]
+                       if plan_length is not None else []),
+        "output": parser.output, "plan_actions": plan_actions,
+    }
+
+
+def error_result(label, base, elapsed, e):
+    log(f"ERROR  {label}: {e}")
+    return {
+        **base, "solved": False, "plan_length": None,
+        "time": round(elapsed, 4), "nodes_expanded": None,
+        "output": f"ERROR: {e}", "plan_actions": [],
+    }
+
+
+def run_single(domain_file, problem_file, search, heuristic, config_name, prob_id, domain_name, complexity,
+               timeout=None, cancel=None):
+    """Run one pyperplan configuration on one problem.
+
+    `timeout` overrides TIMEOUT and `cancel` (threading.Event) kills the run early.
+    """
+    job = (domain_file, problem_file, search, heuristic, config_name, prob_id, domain_name, complexity)
+    label = f"{config_name}/{prob_id}"
+    log(f"START  {label} ({domain_name}, {complexity} objs, {search}+{heuristic})")
+    base = run_base(job)
+    tmpdir = None
+    parser = log_parser.LogParser()
+    start = time.perf_counter()
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=TIMEOUT)
-        elapsed = time.time() - start
-        output = result.stdout + "\n" + result.stderr
-
-        # Read plan file from temp dir
-        plan_file = tmp_problem + ".soln"
-        plan_length = None
-        plan_actions = []
-        if os.path.exists(plan_file):
-            with open(plan_file) as f:
-                plan_actions = [l.strip() for l in f if l.strip()]
-            plan_length = len(plan_actions)
-
-        # Parse nodes from output
-        nodes_expanded = None
-        for line in output.split("\n"):
-            if "expanded" in line.lower():
-                nums = [int(w) for w in line.split() if w.isdigit()]
-                if nums:
-                    nodes_expanded = nums[0]
+        cmd, tmpdir, plan_file = cli_command(job)
+        _, usage = measure.run_measured(cmd, timeout or TIMEOUT, on_line=parser.feed, cancel=cancel,
+                                        preexec_fn=scheduler.memory_limiter(_MEMORY_LIMIT))
+        return run_result(label, base, parser, usage, plan_file)
+    except measure.MeasuredTimeout as e:
+        status = "CANCELLED" if isinstance(e, measure.MeasuredCancelled) else "TIMEOUT"
+        return run_result(label, base, parser, e.usage, None, status)
+    except Exception as e:
+        return error_result(label, base, time.perf_counter() - start, e)
+    finally:
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir, ignore_errors=True)
 
-        status = f"plan={plan_length}" if plan_length else "NO PLAN"
-        log(f"DONE   {label} -> {status}, {elapsed:.2f}s, nodes={nodes_expanded}")
-        shutil.rmtree(tmpdir, ignore_errors=True)
 
+class _Timeout(Exception):
+    pass
+
+
+def _alarm_handler(signum, frame):
+    raise _Timeout()
+
+
+class _ParserHandler(logging.Handler):
+    """logging handler that streams formatted records into a LogParser."""
+
+    def __init__(self, parser, clock):
+        super().__init__()
+        self.parser = parser
+        self.clock = clock
+
+    def emit(self, record):
+        self.parser.feed(self.format(record), self.clock())
+
+
+# Per-worker cache: (domain_file, problem_file, mtimes) -> grounded task
+_TASK_CACHE = {}
+
+# Queue where run_batch streams (batch_id, index, result), filled in by init_worker
+_RESULTS = None
+
+
+def init_worker(memory_limit=MEMORY_LIMIT, inprocess=False, cpus=None, results=None, trace_memory=False):
+    """Set the per-run memory cap; in inprocess mode also import pyperplan once
+    and route its logging. The cap then applies to the worker itself.
+
+    With `cpus` (a queue of core ids) the worker pins itself to one core; the
+    planner subprocesses it launches inherit the affinity. `results` is the
+    queue run_batch reports to, and `trace_memory` measures in-process
+    searches with tracemalloc.
+    """
+    global _MEMORY_LIMIT, _RESULTS, _TRACE_MEMORY
+    _MEMORY_LIMIT = memory_limit
+    _RESULTS = results
+    _TRACE_MEMORY = trace_memory
+    if cpus is not None:
+        scheduler.pin_to_cpu(cpus.get())
+    if not inprocess:
+        return
+    import pyperplan.planner  # noqa: F401
+
+    scheduler.set_memory_limit(memory_limit)
+
+
+def _grounded_task(domain_file, problem_file, frontend=None):
+    """Parse and ground an instance, reusing the worker cache when possible.
+
+    Generated instances (`gen:` refs) are parsed straight from memory. With
+    `frontend` the task comes from the reachability grounder of fast_ground.
+    """
+    from pyperplan.planner import _ground
+
+    # A generated ref is deterministic, so it is its own version stamp
+    stamp = None if generators.is_generated(problem_file) else os.path.getmtime(problem_file)
+    key = (domain_file, problem_file, os.path.getmtime(domain_file), stamp, frontend)
+    if key in _TASK_CACHE:
+        return _TASK_CACHE[key], 0.0, True
+
+    start = time.perf_counter()
+    task = (fast_ground.ground if frontend else _ground)(suites.parse(domain_file, problem_file))
+    ground_time = time.perf_counter() - start
+    if len(_TASK_CACHE) >= TASK_CACHE_SIZE:
+        _TASK_CACHE.pop(next(iter(_TASK_CACHE)))
+    _TASK_CACHE[key] = task
+    return task, ground_time, False
+
+
+def iterated_weighted_astar(task, heuristic, on_plan, weights=ANYTIME_WEIGHTS):
+    """Restarting weighted A*: one search per weight, reporting each improved plan."""
+    from pyperplan.search import weighted_astar_search
+
+    best = None
+    for weight in weights:
+        plan = weighted_astar_search(task, heuristic, weight)
+        if plan is not None and (best is None or len(plan) < len(best)):
+            best = plan
+            on_plan(plan, weight)
+    return best
+
+
+def traced(config_name):
+    """CS configurations and their stock counterparts always measure memory with tracemalloc.
+
+    Their searches are mostly too small to move the RSS, and bytes_per_node is
+    the comparison they exist for.
+    """
+    return config_name.endswith("-CS") or f"{config_name}-CS" in CONFIGS
+
+
+def _start_memory(config_name):
+    """Start measuring the search: tracemalloc if traced, else the current RSS."""
+    if _TRACE_MEMORY or traced(config_name):
+        tracemalloc.start()
+        return None
+    return measure.rss_kb()
+
+
+def _node_memory(usage, base_rss, nodes_expanded):
+    """Memory taken by the search and per expanded node.
+
+    Traced: peak of the Python allocations since _start_memory. Otherwise peak
+    RSS over the RSS at the start, None under RSS_NOISE_KB (small searches fit
+    in memory the worker already had).
+    """
+    if tracemalloc.is_tracing():
+        grown = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        source = "tracemalloc"
+    else:
+        peak = usage.get("peak_rss_kb")
+        grown = None if peak is None or base_rss is None else (peak - base_rss) * 1024
+        if grown is not None and grown < RSS_NOISE_KB * 1024:
+            grown = None
+        source = "rss"
+    if grown is None:
+        return {"search_memory_kb": None, "bytes_per_node": None, "search_memory_source": source}
+    return {"search_memory_kb": round(grown / 1024),
+            "bytes_per_node": round(grown / nodes_expanded) if nodes_expanded else None,
+            "search_memory_source": source}
+
+
+# Searches implemented here rather than in pyperplan (inprocess only)
+ANYTIME_SEARCHES = {"iwastar": iterated_weighted_astar}
+
+
+def run_single_inprocess(domain_file, problem_file, search, heuristic, config_name, prob_id, domain_name, complexity,
+                         timeout=None, abort=None):
+    """Run one pyperplan configuration inside the current worker process.
+
+    `time` only covers heuristic setup + search; parsing and grounding are
+    reported in `ground_time` (0 when the grounded task came from the cache).
+    The TIMEOUT budget (or `timeout`) covers both and is enforced with SIGALRM.
+    CPU and peak RSS are measured on the worker itself over the same span as
+    `time`. `abort` (predictor.Budget) stops a search that can no longer
+    finish in time.
+    """
+    from pyperplan.planner import HEURISTICS, SEARCHES
+
+    job = (domain_file, problem_file, search, heuristic, config_name, prob_id, domain_name, complexity)
+    cfg = CONFIGS.get(config_name, {})
+    frontend = cfg.get("frontend")
+    heuristics = fast_ground.HEURISTICS if frontend else HEURISTICS
+    compact = cfg.get("search_backend") == "compact"
+    searches = compact_search.SEARCHES if compact else SEARCHES
+    label = f"{config_name}/{prob_id}"
+    log(f"START  {label} ({domain_name}, {complexity} objs, {search}+{heuristic}, inprocess"
+        f"{', ' + frontend if frontend else ''})")
+    signal.signal(signal.SIGALRM, _alarm_handler)
+
+    # Feed pyperplan's log lines to the parser the same way the CLI prints them
+    parser = log_parser.LogParser()
+    handler = _ParserHandler(parser, lambda: meter.elapsed())
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-8s %(message)s"))
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(handler)
+
+    base = run_base(job)
+    ground_time = 0.0
+    cached = False
+    incumbents = []
+    best_plan = []
+    probe = None
+    base_rss = None
+
+    def on_plan(plan, weight):
+        t = meter.elapsed()
+        incumbents.append({"time": round(t, 4), "cost": len(plan), "length": len(plan), "weight": weight})
+        best_plan[:] = plan
+        log(f"PLAN   {label} -> cost={len(plan)} (w={weight}) a los {t:.2f}s")
+
+    meter = measure.SelfUsage().start()
+    signal.setitimer(signal.ITIMER_REAL, timeout or TIMEOUT)
+    try:
+        task, ground_time, cached = _grounded_task(domain_file, problem_file, frontend)
+        meter.start()
+        # The search structures include the compact encoding and the heuristic's tables
+        base_rss = _start_memory(config_name)
+        # The search sees probed task/heuristic: expansions, evaluations, best h and f layer over time
+        search_task = compact_search.CompactTask(task) if compact else task
+        probe = telemetry.SearchProbe(search_task, heuristics[heuristic](task), meter.elapsed,
+                                      watch=abort.check if abort is not None else None)
+        search_start = time.process_time()
+        if search in ANYTIME_SEARCHES:
+            solution = ANYTIME_SEARCHES[search](probe.task, probe.heuristic, on_plan)
+        else:
+            solution = searches[search](probe.task, probe.heuristic)
+            if solution is not None:
+                incumbents.append({"time": round(meter.elapsed(), 4), "cost": len(solution),
+                                   "length": len(solution)})
+        search_time = time.process_time() - search_start
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        usage = meter.stop()
+        elapsed = usage["wall_time"]
+
+        plan_actions = [op.name for op in solution] if solution is not None else []
+        plan_length = len(plan_actions) if solution is not None else None
+        nodes_expanded = parser.stats["nodes_expanded"]
+
+        status = f"plan={plan_length}" if plan_length else "NO PLAN"
+        log(f"DONE   {label} -> {status}, {elapsed:.2f}s (+{ground_time:.2f}s ground, cpu {usage['cpu_time'] or 0:.2f}s), "
+            f"nodes={nodes_expanded}")
         return {
-            "planner": config_name, "domain": domain_name, "problem": prob_id,
-            "complexity": complexity, "search": search, "heuristic": heuristic,
+            **base,
             "solved": plan_length is not None, "plan_length": plan_length,
-            "time": round(elapsed, 4), "nodes_expanded": nodes_expanded,
-            "output": output[:1500], "plan_actions": plan_actions[:5],
+            "time": round(elapsed, 4), "search_time": round(search_time, 4), **measure.rounded(usage),
+            "nodes_expanded": nodes_expanded, **_node_memory(usage, base_rss, nodes_expanded),
+            "ground_time": round(ground_time, 4), "task_cached": cached, "memout": False,
+            "incumbents": incumbents, "telemetry": probe.encode(),
+            "output": parser.output, "plan_actions": plan_actions,
         }
-
-    except subprocess.TimeoutExpired:
-        elapsed = time.time() - start
-        log(f"TIMEOUT {label} after {elapsed:.1f}s")
-        shutil.rmtree(tmpdir, ignore_errors=True)
+    except (_Timeout, predictor.Aborted) as e:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        usage = meter.stop()
+        elapsed = usage["wall_time"]
+        status = "ABORTED" if isinstance(e, predictor.Aborted) else "TIMEOUT"
+        log(f"{status} {label} after {elapsed + ground_time:.1f}s" + (f" ({e})" if status == "ABORTED" else "")
+            + (f" (mejor plan: cost={len(best_plan)})" if incumbents else ""))
+        plan_actions = [op.name for op in best_plan]
+        # pyperplan only logs its expansions when a search ends: take them from the probe
+        nodes_expanded = parser.stats["nodes_expanded"] or (probe.expanded if probe else None)
         return {
-            "planner": config_name, "domain": domain_name, "problem": prob_id,
-            "complexity": complexity, "search": search, "heuristic": heuristic,
+            **base,
+            "solved": bool(incumbents), "plan_length": len(best_plan) if incumbents else None,
+            "time": round(elapsed, 4), "search_time": None, **measure.rounded(usage),
+            "nodes_expanded": nodes_expanded, **_node_memory(usage, base_rss, nodes_expanded),
+            "ground_time": round(ground_time, 4), "task_cached": cached, "memout": False,
+            "incumbents": incumbents, "telemetry": probe.encode() if probe else None,
+            "output": status, "plan_actions": plan_actions,
+        }
+    except MemoryError:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        # Drop cached tasks so the worker can recover for the next job
+        _TASK_CACHE.clear()
+        usage = meter.stop()
+        elapsed = usage["wall_time"]
+        log(f"MEMOUT {label} after {elapsed:.1f}s (limite {_MEMORY_LIMIT})")
+        return {
+            **base,
             "solved": False, "plan_length": None,
-            "time": round(elapsed, 4), "nodes_expanded": None,
-            "output": "TIMEOUT", "plan_actions": [],
+            "time": round(elapsed, 4), "search_time": None, **measure.rounded(usage),
+            "nodes_expanded": probe.expanded if probe else None,
+            **_node_memory(usage, base_rss, probe.expanded if probe else None),
+            "ground_time": round(ground_time, 4), "task_cached": cached, "memout": True,
+            "telemetry": probe.encode() if probe else None,
+            "output": "MEMOUT", "plan_actions": [],
         }
     except Exception as e:
-        elapsed = time.time() - start
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        elapsed = meter.stop()["wall_time"]
         log(f"ERROR  {label}: {e}")
-        shutil.rmtree(tmpdir, ignore_errors=True)
         return {
-            "planner": config_name, "domain": domain_name, "problem": prob_id,
-            "complexity": complexity, "search": search, "heuristic": heuristic,
+            **base,
             "solved": False, "plan_length": None,
             "time": round(elapsed, 4), "nodes_expanded": None,
+            "ground_time": round(ground_time, 4), "task_cached": cached,
             "output": f"ERROR: {e}", "plan_actions": [],
         }
+    finally:
+        tracemalloc.stop()  # no-op unless an error left it tracing
+        root.removeHandler(handler)
 
 
-def main():
-    os.makedirs(RESULTS_DIR, exist_ok=True)
+RUNNERS = {
+    "subprocess": run_single,
+    "inprocess": run_single_inprocess,
+}
+
+
+def run_batch(batch_id, items):
+    """Solve several problems of one domain in sequence inside this worker.
+
+    `items` are (job, timeout, budget). The domain is parsed once
+    (suites.parse_domain) and each problem runs in process with its own
+    timeout; a failure only affects its own result. Each result goes to the
+    worker's results queue as (batch_id, index, result) as soon as it is
+    ready; without a queue the results are returned as a list.
+    """
+    label = f"{items[0][0][4]}/{items[0][0][6]}"
+    log(f"BATCH  {label}: {len(items)} problemas en el worker {os.getpid()}")
+    out = []
+    for i, (job, timeout, budget) in enumerate(items):
+        kwargs = {"timeout": timeout} if timeout < TIMEOUT else {}
+        if budget is not None:
+            kwargs["abort"] = budget
+        try:
+            r = run_single_inprocess(*job, **kwargs)
+        except Exception as e:  # not caught by the run itself: keep the rest of the batch going
+            log(f"ERROR  {job[4]}/{job[5]}: {e}")
+            r = {**run_base(job), "solved": False, "plan_length": None,
+                 "time": None, "nodes_expanded": None, "output": f"ERROR: {e}", "plan_actions": []}
+        r["batch_size"] = len(items)
+        if _RESULTS is not None:
+            _RESULTS.put((batch_id, i, r))
+        else:
+            out.append(r)
+    return out
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", choices=RUNNERS, default="subprocess",
+                        help="subprocess: un interprete por ejecucion; "
+                             "inprocess: API de pyperplan con tareas cacheadas")
+    parser.add_argument("--rerun", action="store_true",
+                        help="repetir tambien las ejecuciones que ya estan en el almacen")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="numero de workers (por defecto segun cores y RAM disponibles)")
+    parser.add_argument("--memory", default=MEMORY_LIMIT,
+                        help="limite de memoria por ejecucion (p.ej. 4g)")
+    parser.add_argument("--suite", default=suites.DEFAULT_SUITE,
+                        help="suite de instancias (JSON, ver suites/)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="repeticiones de cada ejecucion (cada muestra se guarda con su `rep`)")
+    parser.add_argument("--warmup", type=int, default=0,
+                        help="rondas de calentamiento descartadas antes de medir")
+    parser.add_argument("--batch", type=int, default=1,
+                        help="resolver hasta N problemas del mismo dominio y configuracion seguidos en un "
+                             "worker (en proceso, el dominio se parsea una vez)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="medir la memoria de la busqueda en proceso con tracemalloc en todas las "
+                             "configuraciones, no solo en las PP-*-CS y sus equivalentes (exacto, pero varias "
+                             "veces mas lento: no usar para comparar tiempos)")
+    parser.add_argument("--pin-cpus", action="store_true",
+                        help="fijar cada worker a un core distinto")
+    run_cache.add_arguments(parser)
+    predictor.add_arguments(parser)
+    return parser.parse_args(argv)
+
 
-    # Build all jobs
+def run_mode(config_name, mode):
+    """Mode a configuration actually runs in with --mode `mode`."""
+    return "inprocess" if mode == "inprocess" or inprocess_only(config_name) else "subprocess"
+
+
+def hashed_config(config_name, mode="subprocess"):
+    """Configuration as it enters the store and cache keys.
+
+    In process, `time` leaves out interpreter start-up and grounding (that is
+    `ground_time`), so a CLI configuration run in process is a different
+    measurement and carries its mode. In-process-only configurations have a
+    single mode and no field. Traced runs pay the tracemalloc overhead in
+    `time`, so they carry it too.
+    """
+    cfg = CONFIGS[config_name]
+    inprocess = run_mode(config_name, mode) == "inprocess"
+    if inprocess and not inprocess_only(config_name):
+        cfg = {**cfg, "mode": "inprocess"}
+    if inprocess and traced(config_name):
+        cfg = {**cfg, "memory": "tracemalloc"}
+    return cfg
+
+
+def config_hashes(mode="subprocess"):
+    return {name: results_store.config_hash({**hashed_config(name, mode), "timeout": TIMEOUT}) for name in CONFIGS}
+
+
+def build_jobs(suite, repeat, store, planner_version, rerun=False, mode="subprocess"):
+    """Pending (job, rep) pairs of a suite in launch order, plus every key of the sweep."""
+    hashes = config_hashes(mode)
+    done = set() if rerun else results_store.completed_keys(store)
     jobs = []
-    for domain_name, info in PROBLEMS.items():
-        domain_file = info["domain"]
-        for prob_id, inst_file, complexity in info["instances"]:
-            problem_file = os.path.join(DOMAINS_DIR, domain_name, "instances", inst_file)
+    keys = set()
+    for domain_name, info in suites.load(suite).items():
+        domain_file = os.path.join(DOMAINS_DIR, info["domain"])
+        for prob_id, problem, complexity in info["instances"]:
+            problem_file = suites.resolve(problem, DOMAINS_DIR)
             for config_name, cfg in CONFIGS.items():
-                jobs.append((domain_file, problem_file, cfg["search"], cfg["heuristic"],
-                             config_name, prob_id, domain_name, complexity))
+                job = (domain_file, problem_file, cfg["search"], cfg["heuristic"],
+                       config_name, prob_id, domain_name, complexity)
+                for rep in range(repeat):
+                    key = (config_name, domain_name, prob_id, hashes[config_name], planner_version, rep)
+                    keys.add(key)
+                    if key not in done:
+                        jobs.append((job, rep))
 
-    log(f"Lanzando {len(jobs)} ejecuciones en paralelo (max 6 workers)...")
-    all_results = []
+    # Longest predicted jobs first, so the hardest instances don't stretch the tail.
+    # Repetitions go in rounds, so slow drift on the machine spreads over all configs.
+    history = results_store.load_any(store)
+    jobs = [jr for rep in range(repeat)
+            for jr in scheduler.order_jobs([jr for jr in jobs if jr[1] == rep],
+                                           lambda jr: (jr[0][4], jr[0][6], jr[0][5], jr[0][7]), history, TIMEOUT)]
+    return jobs, keys
 
-    with ProcessPoolExecutor(max_workers=6) as executor:
-        futures = {executor.submit(run_single, *job): job for job in jobs}
-        for future in as_completed(futures):
-            all_results.append(future.result())
 
-    # Sort for consistent output
-    all_results.sort(key=lambda r: (r["domain"], r["problem"], r["planner"]))
+def inprocess_only(config_name):
+    """Anytime searches, the fast front end and the compact backend are not in the pyperplan CLI."""
+    cfg = CONFIGS[config_name]
+    return cfg["search"] in ANYTIME_SEARCHES or "frontend" in cfg or "search_backend" in cfg
+
+
+def runner_for(job, mode):
+    return run_single_inprocess if inprocess_only(job[4]) else RUNNERS[mode]
+
+
+def finish(r, job, rep, planner_version, mode="subprocess"):
+    """Validate the plan of a result and tag it with the rest of its store key."""
+    r.update(validate.check(job[0], job[1], r.get("plan_actions")))
+    r.update(config_hash=config_hashes(mode)[r["planner"]], planner_version=planner_version, rep=rep,
+             mode=run_mode(r["planner"], mode))
+    return r
+
+
+def submit(executor, job, mode, timeout, budget):
+    """Submit a job with its (possibly adapted) timeout; only in-process runs can abort early."""
+    runner = runner_for(job, mode)
+    kwargs = {"timeout": timeout} if timeout < TIMEOUT else {}
+    if budget is not None and runner is run_single_inprocess:
+        kwargs["abort"] = budget
+    return executor.submit(runner, *job, **kwargs)
+
 
-    output_file = os.path.join(RESULTS_DIR, "pyperplan_results.json")
-    with open(output_file, "w") as f:
-        json.dump(all_results, f, indent=2)
+def _failure(r):
+    return r["output"] if r["output"] in ("ABORTED", "SKIPPED") else "TIMEOUT/FAIL"
+
+
+def cache_key(job, rep, planner_version, mode="subprocess"):
+    return run_cache.key(job[0], job[1], hashed_config(job[4], mode), TIMEOUT, planner_version, rep)
+
+
+def from_cache(r, job, rep, planner_version, mode="subprocess"):
+    """A cached result tagged with this sweep's names and store key."""
+    r.update(run_base(job), from_cache=True)
+    r.update(config_hash=config_hashes(mode)[r["planner"]], planner_version=planner_version, rep=rep,
+             mode=run_mode(r["planner"], mode))
+    return r
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+
+    store = os.path.join(RESULTS_DIR, STORE_FILE)
+    planner_version = version("pyperplan")
+    # Batches always run in process, and are stored as in-process runs
+    mode = "inprocess" if args.batch > 1 else args.mode
+    jobs, keys = build_jobs(args.suite, args.repeat, store, planner_version, rerun=args.rerun, mode=mode)
+    cache_dir = None if args.no_cache else os.path.join(RESULTS_DIR, run_cache.CACHE_DIR)
+    if cache_dir and not args.rerun:
+        jobs, hits = run_cache.split(cache_dir, jobs, lambda job, rep: cache_key(job, rep, planner_version, mode))
+        for job, rep, r in hits:
+            results_store.append(store, from_cache(r, job, rep, planner_version, mode))
+        if hits:
+            log(f"{len(hits)} ejecuciones servidas desde {cache_dir}")
+    model = predictor.Predictor(results_store.load_any(store)) if predictor.enabled(args) else None
+    planned, skipped = predictor.plan_jobs(model, jobs, lambda job: (job[4], job[6], job[7]), TIMEOUT, args)
+    for job, rep, p_solve in skipped:
+        r = predictor.skipped_result(run_base(job), p_solve)
+        results_store.append(store, finish(r, job, rep, planner_version, mode))
+    if skipped:
+        log(f"{len(skipped)} ejecuciones sin esperanza segun el predictor: no se lanzan (SKIPPED)")
+    jobs = [(job, rep) for job, rep, _, _ in planned]
+    workers = args.workers or scheduler.pool_size(args.memory)
+    cpus = None
+    if args.pin_cpus:
+        cores = scheduler.pinnable_cpus(workers)
+        workers = max(1, len(cores))
+        cpus = multiprocessing.Queue()
+        for core in cores:
+            cpus.put(core)
+    batched = args.batch > 1
+    results = multiprocessing.Queue() if batched else None
+    log(f"Lanzando {len(jobs)} ejecuciones en paralelo ({workers} workers, {args.memory}/worker, "
+        f"modo {'inprocess, lotes de ' + str(args.batch) if batched else args.mode}"
+        f"{', 1 core/worker' if cpus else ''}, {args.repeat} rep.), "
+        f"{len(keys) - len(jobs)} ya en {store}...")
+
+    def record(r, job, rep, timeout):
+        r = finish(r, job, rep, planner_version, mode)
+        if timeout < TIMEOUT:
+            r["timeout_budget"] = round(timeout, 2)
+        results_store.append(store, r)
+        if cache_dir:
+            run_cache.put(cache_dir, cache_key(job, rep, planner_version, mode), r)
+
+    # Batches always run in process: that is where the domain parse is shared
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                   initargs=(args.memory, args.mode == "inprocess" or batched, cpus, results,
+                                             args.trace_memory))
+    try:
+        if args.warmup and jobs:
+            # Discarded runs: page cache, bytecode and (inprocess) grounded tasks
+            distinct = list({job: None for job, _ in jobs})
+            log(f"Calentamiento: {args.warmup} x {len(distinct)} ejecuciones descartadas")
+            for _ in range(args.warmup):
+                for future in as_completed([executor.submit(runner_for(job, args.mode), *job) for job in distinct]):
+                    future.result()
+
+        if batched:
+            # Same domain file, configuration and repetition per batch
+            batches = scheduler.batches(planned, lambda p: (p[0][0], p[0][4], p[1]), args.batch)
+            futures = [executor.submit(run_batch, bid, [(job, timeout, budget) for job, _, timeout, budget in batch])
+                       for bid, batch in enumerate(batches)]
+            for bid, i, r in scheduler.stream_results(results, futures, len(planned)):
+                job, rep, timeout, _ = batches[bid][i]
+                record(r, job, rep, timeout)
+        else:
+            futures = {submit(executor, job, args.mode, timeout, budget): (job, rep, timeout)
+                       for job, rep, timeout, budget in planned}
+            for future in as_completed(futures):
+                record(future.result(), *futures[future])
+    except KeyboardInterrupt:
+        log("Interrumpido: los resultados terminados ya estan en el almacen")
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    if cache_dir and (args.cache_max_age is not None or args.cache_max_size is not None):
+        removed, freed = run_cache.evict(cache_dir, args.cache_max_age, args.cache_max_size)
+        log(f"Cache: {removed} entradas borradas ({freed / 1024 / 1024:.1f} MB)")
+
+    all_results = [r for r in results_store.load(store) if results_store.result_key(r) in keys]
+    # Sort for consistent output
+    all_results.sort(key=lambda r: (r["domain"], r["problem"], r["planner"], r.get("rep", 0)))
+    output_file = store
 
     # Quick summary
     solved = sum(1 for r in all_results if r["solved"])
     log(f"\nRESUMEN: {solved}/{len(all_results)} resueltos")
     for r in all_results:
-        s = "OK" if r["solved"] else "TIMEOUT/FAIL"
-        log(f"  {r['planner']:15s} {r['problem']:5s} -> {s:7s} plan={str(r['plan_length']):>5s} t={r['time']:.2f}s")
+        s = "INVALID" if r.get("plan_valid") is False else ("OK" if r["solved"] else _failure(r))
+        rep = f" #{r.get('rep', 0)}" if args.repeat > 1 else ""
+        t = "-" if r["time"] is None else f"{r['time']:.2f}s"
+        log(f"  {r['planner']:15s} {r['problem']:5s}{rep} -> {s:7s} plan={str(r['plan_length']):>5s} t={t}")
     log(f"Guardado en {output_file}")
 
 
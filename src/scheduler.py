@@ -0,0 +1,196 @@
+"""
+Planificacion de recursos para los barridos.
+
+- Tamano del pool a partir de los cores disponibles y la RAM libre
+  (MEMORY_LIMIT por worker o contenedor), y fijacion opcional de cada worker
+  a un core (--pin-cpus).
+- Limite de memoria por ejecucion (RLIMIT_AS) para los procesos de pyperplan.
+- Orden longest-job-first: los trabajos se lanzan de mayor a menor coste
+  estimado, usando tiempos de barridos anteriores y la complejidad.
+- Repeticiones (--repeat K en los runners): las K repeticiones se lanzan en
+  rondas (primero todas las 0, luego las 1...), cada una ordenada como arriba,
+  y cada muestra se guarda con su `rep`. --warmup N lanza antes N rondas de
+  calentamiento que no se guardan.
+- Lotes (--batch): trabajos del mismo dominio y configuracion agrupados para
+  un solo worker o contenedor, cuyos resultados llegan por una cola.
+"""
+
+import math
+import os
+import queue
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def parse_size(size):
+    """'4g' / '512m' / '1024k' / bytes -> bytes."""
+    if isinstance(size, (int, float)):
+        return int(size)
+    units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+    size = size.strip().lower()
+    if size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+
+def cpu_count():
+    """Cores usables por este proceso (respeta el affinity en Linux)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def available_memory():
+    """RAM disponible en bytes (MemAvailable en Linux, RAM fisica si no)."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def pool_size(memory_per_job, max_workers=None):
+    """Numero de workers que caben en los cores y en la RAM disponible."""
+    workers = cpu_count()
+    mem = available_memory()
+    if mem is not None:
+        workers = min(workers, mem // parse_size(memory_per_job))
+    if max_workers is not None:
+        workers = min(workers, max_workers)
+    return max(1, int(workers))
+
+
+def pinnable_cpus(n):
+    """Hasta `n` cores del affinity actual para fijar un worker a cada uno."""
+    if not hasattr(os, "sched_getaffinity"):
+        return []
+    return sorted(os.sched_getaffinity(0))[:n]
+
+
+def pin_to_cpu(cpu):
+    """Fijar el proceso actual (y sus hijos futuros) a un core (no-op si no se puede)."""
+    if cpu is None or not hasattr(os, "sched_setaffinity"):
+        return
+    try:
+        os.sched_setaffinity(0, {cpu})
+    except OSError:
+        pass
+
+
+def set_memory_limit(limit):
+    """Limitar el espacio de direcciones del proceso actual (no-op si no se puede)."""
+    if resource is None or limit is None:
+        return
+    limit = parse_size(limit)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass  # e.g. macOS does not enforce RLIMIT_AS
+
+
+def memory_limiter(limit):
+    """preexec_fn para subprocess que aplica el limite de memoria en el hijo."""
+    if resource is None or limit is None:
+        return None
+    return lambda: set_memory_limit(limit)
+
+
+def fit_log_linear(points):
+    """Minimos cuadrados de log(t) = a + b * complexity; None si no hay datos suficientes."""
+    if len({c for c, _ in points}) < 2:
+        return None
+    n = len(points)
+    xs = [c for c, _ in points]
+    ys = [math.log(max(t, 1e-3)) for _, t in points]
+    mx, my = sum(xs) / n, sum(ys) / n
+    sxx = sum((x - mx) ** 2 for x in xs)
+    b = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+    return my - b * mx, max(b, 0.0)
+
+
+class CostModel:
+    """Coste estimado de (planner, domain, problem, complexity).
+
+    Usa el tiempo observado en barridos anteriores si existe (un TIMEOUT cuenta
+    como el tiempo consumido); si no, extrapola un ajuste log-lineal sobre la
+    complejidad para ese planificador y dominio; como ultimo recurso, la
+    propia complejidad.
+    """
+
+    def __init__(self, history):
+        self.observed = {}
+        points = {}
+        for r in history:
+            if r.get("time") is None or str(r.get("output", "")).startswith("ERROR"):
+                continue
+            self.observed[(r["planner"], r["domain"], r["problem"])] = r["time"]
+            points.setdefault((r["planner"], r["domain"]), []).append((r["complexity"], r["time"]))
+        self.fits = {k: fit_log_linear(v) for k, v in points.items()}
+
+    def predict(self, planner, domain, problem, complexity, timeout=None):
+        if (planner, domain, problem) in self.observed:
+            cost = self.observed[(planner, domain, problem)]
+        elif self.fits.get((planner, domain)):
+            a, b = self.fits[(planner, domain)]
+            cost = math.exp(a + b * complexity)
+        else:
+            cost = float(complexity)
+        return min(cost, timeout) if timeout else cost
+
+
+def order_jobs(jobs, describe, history, timeout=None):
+    """Ordenar trabajos de mayor a menor coste estimado (longest-job-first).
+
+    `describe(job)` devuelve (planner, domain, problem, complexity).
+    """
+    model = CostModel(history)
+    return sorted(jobs, key=lambda job: model.predict(*describe(job), timeout=timeout), reverse=True)
+
+
+def batches(items, key, size):
+    """Agrupar `items` por `key(item)` en lotes de hasta `size`, conservando el orden.
+
+    Cada lote sale en la posicion de su primer elemento, asi que el orden
+    longest-job-first se mantiene entre lotes.
+    """
+    groups = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    out = []
+    for group in groups.values():
+        out.extend(group[i:i + size] for i in range(0, len(group), size))
+    first = {id(item): n for n, item in enumerate(items)}
+    return sorted(out, key=lambda batch: first[id(batch[0])])
+
+
+def stream_results(results, futures, expected, poll=1.0):
+    """Sacar `expected` elementos de la cola `results` que llenan los lotes.
+
+    Relanza la excepcion de un lote que fallo y termina si todos acabaron sin
+    entregar lo que faltaba (p.ej. un worker muerto).
+    """
+    idle = False
+    while expected:
+        try:
+            item = results.get(timeout=poll)
+        except queue.Empty:
+            for f in futures:
+                if f.done() and f.exception() is not None:
+                    raise f.exception()
+            if all(f.done() for f in futures):
+                if idle:
+                    return
+                idle = True  # one more poll for items still in flight
+            continue
+        idle = False
+        expected -= 1
+        yield item
@@ -0,0 +1,76 @@
+"""
+Estadistica para las repeticiones de un barrido (--repeat): mediana, IQR,
+intervalos de confianza bootstrap y el test de Mann-Whitney U para decidir si
+la diferencia entre dos configuraciones es real o ruido.
+
+Solo depende de numpy (ya lo trae pandas).
+"""
+
+import math
+
+import numpy as np
+
+BOOTSTRAP_SAMPLES = 2000
+
+
+def iqr(samples):
+    q1, q3 = np.percentile(samples, [25, 75])
+    return float(q3 - q1)
+
+
+def bootstrap_ci(samples, stat=np.median, alpha=0.05, n=BOOTSTRAP_SAMPLES, seed=0):
+    """Intervalo de confianza percentil bootstrap de `stat` -> (lo, hi)."""
+    samples = np.asarray(samples, dtype=float)
+    if len(samples) < 2:
+        value = float(stat(samples)) if len(samples) else float("nan")
+        return value, value
+    rng = np.random.default_rng(seed)
+    resamples = rng.choice(samples, size=(n, len(samples)), replace=True)
+    estimates = stat(resamples, axis=1)
+    lo, hi = np.percentile(estimates, [100 * alpha / 2, 100 * (1 - alpha / 2)])
+    return float(lo), float(hi)
+
+
+def summarize(samples):
+    """n, mediana, IQR e IC95 bootstrap de la mediana."""
+    samples = [s for s in samples if s is not None and not math.isnan(s)]
+    if not samples:
+        return {"n": 0, "median": None, "iqr": None, "ci_lo": None, "ci_hi": None}
+    lo, hi = bootstrap_ci(samples)
+    return {"n": len(samples), "median": float(np.median(samples)), "iqr": iqr(samples),
+            "ci_lo": lo, "ci_hi": hi}
+
+
+def mann_whitney(x, y):
+    """Test de Mann-Whitney U bilateral -> (U de x, p-valor).
+
+    Aproximacion normal con correccion de empates y de continuidad; con
+    muestras pequenas (< 8 por lado) el p-valor es solo orientativo.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n1, n2 = len(x), len(y)
+    if n1 == 0 or n2 == 0:
+        return None, None
+    values = np.concatenate([x, y])
+    # Average ranks (1-based) with ties sharing the mean of their positions
+    order = values.argsort(kind="mergesort")
+    ranks = np.empty(len(values))
+    sorted_values = values[order]
+    i = 0
+    while i < len(values):
+        j = i
+        while j + 1 < len(values) and sorted_values[j + 1] == sorted_values[i]:
+            j += 1
+        ranks[order[i:j + 1]] = (i + j) / 2 + 1
+        i = j + 1
+    u1 = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    mean = n1 * n2 / 2
+    _, counts = np.unique(values, return_counts=True)
+    n = n1 + n2
+    var = n1 * n2 / 12 * ((n + 1) - ((counts ** 3 - counts).sum()) / (n * (n - 1)))
+    if var <= 0:
+        return float(u1), 1.0
+    z = (abs(u1 - mean) - 0.5) / math.sqrt(var)
+    p = math.erfc(max(z, 0) / math.sqrt(2))
+    return float(u1), min(1.0, p)
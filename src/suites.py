@@ -0,0 +1,116 @@
+"""
+Suites de benchmark declarativas (suites/*.json), comunes a ambos runners.
+
+Una suite lista, por dominio, el fichero de dominio (relativo a domains/), las
+instancias fijas y opcionalmente barridos generados:
+
+    {
+      "domains": {
+        "blocksworld": {
+          "domain": "blocksworld/domain.pddl",
+          "instances": [{"id": "BW-1", "file": "blocksworld/instances/instance-4.pddl", "complexity": 5}],
+          "generate": {"generator": "blocksworld", "prefix": "BW", "sizes": [50, 100], "seeds": [1, 2]}
+        }
+      }
+    }
+
+`load` la expande a la forma de PROBLEMS: {dominio: {"domain": ruta,
+"instances": [(id, problema, complejidad)]}}, donde el problema es una ruta
+relativa a domains/ o una referencia `gen:...` (ver generators.py) que solo
+se materializa en disco si el planificador necesita un fichero.
+"""
+
+import hashlib
+import json
+import os
+
+import generators
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOMAINS_DIR = os.path.join(BASE_DIR, "domains")
+SUITES_DIR = os.path.join(BASE_DIR, "suites")
+DEFAULT_SUITE = os.path.join(SUITES_DIR, "default.json")
+
+
+def load(path=DEFAULT_SUITE):
+    """Leer una suite y expandir sus barridos generados."""
+    with open(path) as f:
+        spec = json.load(f)
+    problems = {}
+    for domain_name, info in spec["domains"].items():
+        instances = [(i["id"], i["file"], i["complexity"]) for i in info.get("instances", [])]
+        gen = info.get("generate")
+        if gen:
+            prefix = gen.get("prefix", domain_name)
+            for n in gen["sizes"]:
+                for seed in gen.get("seeds", [0]):
+                    instances.append((f"{prefix}-n{n}-s{seed}", generators.ref(gen["generator"], n, seed), n))
+        problems[domain_name] = {"domain": info["domain"], "instances": instances}
+    return problems
+
+
+def resolve(problem, domains_dir=DOMAINS_DIR):
+    """Ruta absoluta de un problema en fichero; las referencias `gen:` no cambian."""
+    return problem if generators.is_generated(problem) else os.path.join(domains_dir, problem)
+
+
+def problem_text(problem):
+    """PDDL de un problema (ruta absoluta o referencia generada)."""
+    if generators.is_generated(problem):
+        return generators.generate(problem)
+    with open(problem) as f:
+        return f.read()
+
+
+def content_hash(domain_file, problem):
+    """Hash del contenido de dominio + problema."""
+    h = hashlib.sha256()
+    with open(domain_file, "rb") as f:
+        h.update(f.read())
+    h.update(b"\0")
+    h.update(problem_text(problem).encode())
+    h.update(b"\0")
+    return h.hexdigest()
+
+
+def materialize(problem, directory):
+    """Escribir un problema generado en `directory` (una vez) y devolver su nombre."""
+    text = generators.generate(problem)
+    name = hashlib.sha256(text.encode()).hexdigest()[:16] + ".pddl"
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    return name
+
+
+# (domain file, mtime) -> parsed domain, so a worker parses each domain once
+_DOMAINS = {}
+
+
+def parse_domain(domain_file):
+    """Dominio parseado con pyperplan, cacheado por fichero y mtime.
+
+    El objeto se comparte entre todos los problemas del dominio: no modificarlo.
+    """
+    from pyperplan.pddl.parser import Parser
+
+    key = (domain_file, os.path.getmtime(domain_file))
+    if key not in _DOMAINS:
+        _DOMAINS[key] = Parser(domain_file).parse_domain()
+    return _DOMAINS[key]
+
+
+def parse(domain_file, problem):
+    """Parsear con pyperplan (el dominio sale de la cache de `parse_domain`) sin
+    pasar por disco si el problema es generado."""
+    from pyperplan.pddl.parser import Parser
+
+    domain = parse_domain(domain_file)
+    if not generators.is_generated(problem):
+        return Parser(domain_file, problem).parse_problem(domain)
+    parser = Parser(domain_file)
+    parser.probInput = generators.generate(problem)
+    return parser.parse_problem(domain, read_from_file=False)
@@ -0,0 +1,184 @@
+"""
+Telemetria de la busqueda: serie temporal por ejecucion con nodos expandidos,
+nodos evaluados, mejor h y capa f (g + h del nodo que se expande).
+
+- Fast Downward: la serie sale de las lineas de progreso que lee log_parser
+  (`f = ...` / `g=...` con `N evaluated, M expanded`, `New best heuristic value`).
+- pyperplan (modo inprocess): `SearchProbe` envuelve la tarea y la heuristica
+  que recibe la busqueda, asi que cuenta expansiones y evaluaciones dentro del
+  propio bucle de busqueda y muestrea la serie cada SAMPLE_INTERVAL.
+
+La serie vive en arrays (`array`) y se diezma al superar `max_points`. Se
+guarda en el resultado (`telemetry`) codificada en deltas: el tiempo en ms y
+cada columna como lista de diferencias con el punto anterior (-1 = sin dato).
+"""
+
+from array import array
+
+FIELDS = ("expanded", "evaluated", "h", "f")
+MAX_POINTS = 256
+SAMPLE_INTERVAL = 0.05  # seconds between samples of the pyperplan probe
+MISSING = -1
+
+
+class Series:
+    """Serie temporal acotada: tiempo en ms y columnas enteras en arrays."""
+
+    def __init__(self, max_points=MAX_POINTS):
+        self.max_points = max_points
+        self.t = array("q")
+        self.columns = {name: array("q") for name in FIELDS}
+        self._stride = 1
+        self._seen = 0
+        self._last = None
+
+    def __len__(self):
+        return len(self.t)
+
+    def add(self, t, expanded, evaluated, h=None, f=None):
+        """Anadir un punto (`t` en segundos); los `None` se guardan como MISSING."""
+        point = (MISSING if t is None else int(round(t * 1000)),
+                 expanded, evaluated, h, f)
+        self._last = point
+        self._seen += 1
+        if self._seen % self._stride:
+            return
+        self._append(point)
+        if len(self.t) > self.max_points:
+            # Keep every other point and sample half as often from now on
+            self.t = self.t[::2]
+            self.columns = {name: column[::2] for name, column in self.columns.items()}
+            self._stride *= 2
+
+    def latest(self):
+        """(t en s, expanded) del ultimo punto ofrecido, o None."""
+        if self._last is None or self._last[0] == MISSING:
+            return None
+        return self._last[0] / 1000, self._last[1]
+
+    def _append(self, point):
+        self.t.append(point[0])
+        for name, value in zip(FIELDS, point[1:]):
+            self.columns[name].append(MISSING if value is None else int(value))
+
+    def encode(self):
+        """Forma compacta para el almacen: deltas de cada columna."""
+        if self._last is not None and (not len(self.t) or self._last[0] != self.t[-1]):
+            # The last point offered may have been skipped by the stride: keep the end of the run
+            self._append(self._last)
+        if not len(self.t):
+            return None
+        blob = {"t_ms": _deltas(self.t)}
+        for name, column in self.columns.items():
+            blob[name] = _deltas(column)
+        return blob
+
+
+def _deltas(values):
+    return [values[0]] + [b - a for a, b in zip(values, values[1:])]
+
+
+def decode(blob):
+    """{campo: lista} con `t` en segundos y None donde no habia dato."""
+    if not blob:
+        return None
+    series = {}
+    for name, deltas in blob.items():
+        values = []
+        total = 0
+        for d in deltas:
+            total += d
+            values.append(None if total == MISSING else total)
+        series["t" if name == "t_ms" else name] = values
+    series["t"] = [None if t is None else t / 1000 for t in series["t"]]
+    return series
+
+
+def expansion_rates(series):
+    """(t, expansiones/s) entre puntos consecutivos; los reinicios de contador se saltan."""
+    times, rates = [], []
+    points = [(t, e) for t, e in zip(series["t"], series["expanded"]) if t is not None and e is not None]
+    for (t0, e0), (t1, e1) in zip(points, points[1:]):
+        if t1 > t0 and e1 >= e0:
+            times.append(t1)
+            rates.append((e1 - e0) / (t1 - t0))
+    return times, rates
+
+
+class _ProbedTask:
+    """Task proxy that counts expansions (successor generation) for a probe."""
+
+    def __init__(self, task, probe):
+        self._task = task
+        self._probe = probe
+
+    def __getattr__(self, name):
+        return getattr(self._task, name)
+
+    def get_successor_states(self, state):
+        self._probe.expanded += 1
+        self._probe.sample()
+        return self._task.get_successor_states(state)
+
+
+class _ProbedHeuristic:
+    """Heuristic proxy that counts evaluations and tracks best h and the f layer."""
+
+    def __init__(self, heuristic, probe):
+        self._heuristic = heuristic
+        self._probe = probe
+        self._parent = None
+
+    def __getattr__(self, name):
+        return getattr(self._heuristic, name)
+
+    def __call__(self, node):
+        h = self._heuristic(node)
+        probe = self._probe
+        probe.evaluated += 1
+        node.h = h
+        if h != float("inf") and (probe.best_h is None or h < probe.best_h):
+            probe.best_h = h
+        parent = node.parent
+        if parent is not None and parent is not self._parent:
+            # First child of a new expansion: the f layer is g + h of the expanded node
+            self._parent = parent
+            parent_h = getattr(parent, "h", None)
+            probe.f = None if parent_h is None else parent.g + parent_h
+        return h
+
+
+class SearchProbe:
+    """Hook en el bucle de busqueda de pyperplan.
+
+    La busqueda recibe `probe.task` y `probe.heuristic` en lugar de los
+    originales; `clock()` da los segundos desde el inicio de la ejecucion.
+    `watch(t, expanded)` se llama en cada muestra y puede lanzar una excepcion
+    para cortar la busqueda (p.ej. predictor.Budget.check).
+    """
+
+    def __init__(self, task, heuristic, clock, interval=SAMPLE_INTERVAL, max_points=MAX_POINTS, watch=None):
+        self.series = Series(max_points)
+        self.clock = clock
+        self.interval = interval
+        self.expanded = 0
+        self.evaluated = 0
+        self.best_h = None
+        self.f = None
+        self._next = 0.0
+        self.watch = watch
+        self.task = _ProbedTask(task, self)
+        self.heuristic = _ProbedHeuristic(heuristic, self)
+
+    def sample(self, force=False):
+        t = self.clock()
+        if force or t >= self._next:
+            self._next = t + self.interval
+            self.series.add(t, self.expanded, self.evaluated, self.best_h, self.f)
+            if self.watch is not None and not force:
+                self.watch(t, self.expanded)
+
+    def encode(self):
+        """Serie codificada, con un ultimo punto en el instante actual."""
+        self.sample(force=True)
+        return self.series.encode()
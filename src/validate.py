@@ -0,0 +1,104 @@
+"""
+Validacion de planes contra el dominio y el problema PDDL.
+
+Los operadores se obtienen con el grounder de pyperplan (sin podar los
+irrelevantes, para no rechazar planes validos que los usen) y se compilan a
+mascaras de bits: el estado es un entero y aplicar una accion es
+`(estado & ~del) | add` tras comprobar `estado & pre == pre`. La tarea
+compilada se cachea por hash del contenido de dominio + problema, asi que
+validar todas las configuraciones de una instancia solo la grounda una vez.
+
+Los dominios del estudio son de coste unitario: el coste validado es el
+numero de acciones.
+"""
+
+import re
+
+import suites
+
+VALIDATOR_CACHE_SIZE = 32
+
+_CACHE = {}
+
+
+class Validator:
+    """Tarea STRIPS grounded con hechos como bits de un entero."""
+
+    def __init__(self, task):
+        bit = {fact: 1 << i for i, fact in enumerate(sorted(task.facts))}
+
+        def mask(facts):
+            m = 0
+            for fact in facts:
+                # Facts outside task.facts are static or irrelevant: never change
+                m |= bit.get(fact, 0)
+            return m
+
+        self.init = mask(task.initial_state)
+        self.goal = mask(task.goals)
+        self.ops = {
+            _normalize(op.name): (mask(op.preconditions), mask(op.add_effects), mask(op.del_effects))
+            for op in task.operators
+        }
+
+    def check(self, plan):
+        """(valido, coste, error) de una lista de acciones `(nombre args...)`."""
+        state = self.init
+        steps = [_normalize(a) for a in plan if a.strip() and not a.lstrip().startswith(";")]
+        for i, action in enumerate(steps, 1):
+            op = self.ops.get(action)
+            if op is None:
+                return False, None, f"paso {i}: accion desconocida o inaplicable {action}"
+            pre, add, delete = op
+            if state & pre != pre:
+                return False, None, f"paso {i}: precondiciones no satisfechas en {action}"
+            state = (state & ~delete) | add
+        if state & self.goal != self.goal:
+            return False, None, "el plan no alcanza la meta"
+        return True, len(steps), None
+
+
+def _normalize(action):
+    action = " ".join(action.strip().lower().split())
+    return action if action.startswith("(") else f"({action})"
+
+
+def validator(domain_file, problem_file):
+    """Validator de una instancia (fichero o referencia `gen:`), cacheado por contenido."""
+    key = suites.content_hash(domain_file, problem_file)
+    if key not in _CACHE:
+        from pyperplan.planner import _ground
+
+        task = _ground(suites.parse(domain_file, problem_file), remove_irrelevant_operators=False)
+        if len(_CACHE) >= VALIDATOR_CACHE_SIZE:
+            _CACHE.pop(next(iter(_CACHE)))
+        _CACHE[key] = Validator(task)
+    return _CACHE[key]
+
+
+def read_plan(path):
+    """Acciones de un fichero de plan (.soln de pyperplan o sas_plan de FD)."""
+    with open(path) as f:
+        return [l.strip() for l in f if l.strip() and not l.lstrip().startswith(";")]
+
+
+def latest_plan_file(files):
+    """El ultimo plan de FD: `sas_plan`, o el `sas_plan.N` de mayor N (anytime)."""
+    if "sas_plan" in files:
+        return "sas_plan"
+    numbered = [(int(m.group(1)), f) for f in files for m in [re.fullmatch(r"sas_plan\.(\d+)", f)] if m]
+    return max(numbered)[1] if numbered else None
+
+
+def check(domain_file, problem_file, plan):
+    """Campos de validacion para un resultado; sin plan no hay veredicto."""
+    if not plan:
+        return {"plan_valid": None, "validated_cost": None}
+    try:
+        valid, cost, error = validator(domain_file, problem_file).check(plan)
+    except Exception as e:
+        return {"plan_valid": None, "validated_cost": None, "validation_error": f"ERROR: {e}"}
+    result = {"plan_valid": valid, "validated_cost": cost}
+    if error:
+        result["validation_error"] = error
+    return result
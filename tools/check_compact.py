@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Comprobacion del backend de busqueda compacto (compact_search.py): una
+configuracion PP-*-CS tiene que expandir los mismos nodos y devolver el mismo
+plan que su equivalente con la busqueda de pyperplan.
+
+Ejecuta en proceso las dos configuraciones sobre cada instancia de la suite
+y compara `nodes_expanded`, `plan_length` y el plan. Las instancias en las
+que alguna de las dos no termina dentro de --timeout no se comparan.
+
+Uso:
+    python tools/check_compact.py
+    python tools/check_compact.py --config PP-ASTAR-ADD-CS --suite suites/default.json --timeout 120
+Sale con codigo 1 si alguna comprobacion falla o no se pudo comparar nada.
+"""
+
+import argparse
+import os
+import sys
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TOOLS_DIR), "src"))
+
+import run_pyperplan as pp  # noqa: E402
+import suites  # noqa: E402
+
+COMPACT_CONFIGS = [name for name, cfg in pp.CONFIGS.items() if cfg.get("search_backend") == "compact"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--config", choices=COMPACT_CONFIGS, default="PP-ASTAR-FF-CS",
+                        help="configuracion compacta; se compara con la misma sin el sufijo -CS")
+    parser.add_argument("--suite", default=suites.DEFAULT_SUITE, help="suite de instancias (JSON, ver suites/)")
+    parser.add_argument("--timeout", type=float, default=pp.TIMEOUT, help="segundos por ejecucion")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stock = args.config.removesuffix("-CS")
+    failures = []
+    compared = 0
+
+    def expect(ok, msg):
+        pp.log(f"{'OK   ' if ok else 'FALLO'}  {msg}")
+        if not ok:
+            failures.append(msg)
+
+    for domain_name, info in suites.load(args.suite).items():
+        domain_file = os.path.join(pp.DOMAINS_DIR, info["domain"])
+        for prob_id, problem, complexity in info["instances"]:
+            runs = {}
+            for config_name in (stock, args.config):
+                cfg = pp.CONFIGS[config_name]
+                job = (domain_file, suites.resolve(problem, pp.DOMAINS_DIR), cfg["search"], cfg["heuristic"],
+                       config_name, prob_id, domain_name, complexity)
+                runs[config_name] = pp.run_single_inprocess(*job, timeout=args.timeout)
+            a, b = runs[stock], runs[args.config]
+            errors = [f"{name}: {r['output']}" for name, r in runs.items() if r["output"].startswith("ERROR")]
+            if errors:
+                expect(False, f"{prob_id}: {'; '.join(errors)}")
+                continue
+            if a["output"] in ("TIMEOUT", "MEMOUT") or b["output"] in ("TIMEOUT", "MEMOUT"):
+                pp.log(f"-      {prob_id}: sin comparar ({stock} {a['output'][:7]}, {args.config} {b['output'][:7]})")
+                continue
+            compared += 1
+            expect(a["nodes_expanded"] == b["nodes_expanded"],
+                   f"{prob_id}: mismos nodos expandidos ({a['nodes_expanded']} / {b['nodes_expanded']})")
+            expect(a["plan_length"] == b["plan_length"],
+                   f"{prob_id}: misma longitud de plan ({a['plan_length']} / {b['plan_length']})")
+            expect(a["plan_actions"] == b["plan_actions"], f"{prob_id}: mismo plan")
+
+    if not compared:
+        pp.log(f"FALLO  ninguna instancia termino con las dos configuraciones en {args.timeout:g}s")
+        return 1
+    if failures:
+        pp.log(f"{len(failures)} comprobaciones fallidas")
+        return 1
+    pp.log(f"Backend compacto: {compared} instancias iguales a {stock}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Comprobacion del front end acelerado (fast_ground.py) frente al de pyperplan
+en cada instancia de una suite:
+
+1. `ground` produce la misma tarea que el grounder de pyperplan: mismos
+   hechos, operadores, estado inicial y metas.
+2. NumpyHAdd y NumpyHFF dan los mismos valores que hadd y hff de pyperplan en
+   los primeros --states estados de un recorrido en anchura desde el inicial.
+3. Las busquedas A* y GBF de pyperplan sobre la tarea de pyperplan expanden
+   los mismos nodos y devuelven un plan de la misma longitud con la
+   heuristica NumPy que con la de pyperplan. Las busquedas que no terminan
+   dentro de --timeout no se comparan.
+
+Los PP-*-NP no se comparan con sus configuraciones de pyperplan: el orden de
+los operadores de las dos tareas es distinto (el de pyperplan depende incluso
+de PYTHONHASHSEED), y con el los desempates de la busqueda y los nodos
+expandidos.
+
+Uso:
+    python tools/check_fast_ground.py
+    python tools/check_fast_ground.py --suite suites/default.json --states 1000 --timeout 60
+Sale con codigo 1 si alguna comprobacion falla.
+"""
+
+import argparse
+import os
+import signal
+import sys
+import time
+from collections import deque
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TOOLS_DIR), "src"))
+
+import fast_ground  # noqa: E402
+import run_pyperplan as pp  # noqa: E402
+import suites  # noqa: E402
+import telemetry  # noqa: E402
+
+SEARCHES = ("astar", "gbf")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--suite", default=suites.DEFAULT_SUITE, help="suite de instancias (JSON, ver suites/)")
+    parser.add_argument("--states", type=int, default=500, help="estados por instancia en los que comparar h")
+    parser.add_argument("--timeout", type=float, default=20, help="segundos por busqueda al comparar nodos")
+    return parser.parse_args(argv)
+
+
+def same_task(a, b):
+    """Fields that differ between two grounded tasks (by operator name)."""
+    fields = {
+        "hechos": (a.facts, b.facts),
+        "operadores": ({op.name for op in a.operators}, {op.name for op in b.operators}),
+        "estado inicial": (a.initial_state, b.initial_state),
+        "metas": (a.goals, b.goals),
+    }
+    return [name for name, (x, y) in fields.items() if x != y]
+
+
+def states(task, limit):
+    """First `limit` states of a breadth-first walk from the initial state."""
+    seen = {task.initial_state}
+    queue = deque([task.initial_state])
+    while queue and len(seen) < limit:
+        for _, succ in task.get_successor_states(queue.popleft()):
+            if succ not in seen and len(seen) < limit:
+                seen.add(succ)
+                queue.append(succ)
+    return seen
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _alarm(signum, frame):
+    raise _Timeout()
+
+
+def search(search_fn, task, heuristic, timeout):
+    """(nodes expanded, plan length) of one search, or None if it does not finish in `timeout`."""
+    start = time.perf_counter()
+    probe = telemetry.SearchProbe(task, heuristic, lambda: time.perf_counter() - start)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        plan = search_fn(probe.task, probe.heuristic)
+    except _Timeout:
+        return None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    return probe.expanded, None if plan is None else len(plan)
+
+
+def main(argv=None):
+    from pyperplan.heuristics.relaxation import hAddHeuristic, hFFHeuristic
+    from pyperplan.planner import SEARCHES as SEARCH_FNS
+    from pyperplan.planner import _ground
+    from pyperplan.search.searchspace import make_root_node
+
+    args = parse_args(argv)
+    stock_heuristics = {"hadd": hAddHeuristic, "hff": hFFHeuristic}
+    signal.signal(signal.SIGALRM, _alarm)
+    failures = []
+    compared = 0
+
+    def expect(ok, msg):
+        pp.log(f"{'OK   ' if ok else 'FALLO'}  {msg}")
+        if not ok:
+            failures.append(msg)
+
+    for info in suites.load(args.suite).values():
+        domain_file = os.path.join(pp.DOMAINS_DIR, info["domain"])
+        for prob_id, problem, _ in info["instances"]:
+            problem_file = suites.resolve(problem, pp.DOMAINS_DIR)
+            task = _ground(suites.parse(domain_file, problem_file))
+            diff = same_task(task, fast_ground.ground(suites.parse(domain_file, problem_file)))
+            expect(not diff, f"{prob_id}: misma tarea grounded" + (f" (distintos: {', '.join(diff)})" if diff else ""))
+
+            sample = states(task, args.states)
+            for name, numpy_heuristic in fast_ground.HEURISTICS.items():
+                stock, fast = stock_heuristics[name](task), numpy_heuristic(task)
+                wrong = sum(stock(make_root_node(s)) != fast(make_root_node(s)) for s in sample)
+                expect(not wrong, f"{prob_id}: {name} igual en {len(sample) - wrong}/{len(sample)} estados")
+
+            for search_name in SEARCHES:
+                for name, numpy_heuristic in fast_ground.HEURISTICS.items():
+                    runs = [search(SEARCH_FNS[search_name], task, h(task), args.timeout)
+                            for h in (stock_heuristics[name], numpy_heuristic)]
+                    label = f"{prob_id}: {search_name}+{name}"
+                    if None in runs:
+                        pp.log(f"-      {label} sin comparar (no termina en {args.timeout:g}s)")
+                        continue
+                    compared += 1
+                    (nodes, length), (fast_nodes, fast_length) = runs
+                    expect(runs[0] == runs[1], f"{label} mismos nodos expandidos ({nodes}/{fast_nodes}) "
+                                               f"y longitud de plan ({length}/{fast_length})")
+
+    if failures:
+        pp.log(f"{len(failures)} comprobaciones fallidas")
+        return 1
+    pp.log(f"Front end NumPy: todas las comprobaciones correctas ({compared} busquedas comparadas)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
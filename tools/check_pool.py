@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Comprobacion del backend pool de run_fast_downward.py sin Docker, con
+tools/fake_docker.py y un planificador que nunca termina.
+
+1. Un trabajo agota el timeout: su contenedor se borra (y con el el
+   planificador) y el pool arranca otro en su lugar.
+2. Con los arranques agotados (FAKE_DOCKER_MAX_STARTS) el siguiente timeout
+   no lanza excepcion: el pool descarta el contenedor, no lo devuelve a la
+   cola y acquire() falla en vez de bloquearse.
+
+Uso:
+    python tools/check_pool.py
+Sale con codigo 1 si alguna comprobacion falla.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TOOLS_DIR), "src"))
+
+import run_fast_downward as fd  # noqa: E402
+
+FAKE_DOCKER = os.path.join(TOOLS_DIR, "fake_docker.py")
+# Records its pid next to itself, then never finishes
+HANGING_FD = f"""#!{sys.executable}
+import os, time
+with open(os.path.join(os.path.dirname(__file__), "planner.pids"), "a") as f:
+    f.write(f"{{os.getpid()}}\\n")
+time.sleep(600)
+"""
+JOB = ("blocksworld/domain.pddl", "blocksworld/instances/instance-4.pddl", [], ["--search", "astar(lmcut())"],
+       "FD-ASTAR-LM", "BW-1", "blocksworld", 4)
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A killed child of the fake docker is reaped by init; a zombie is not running
+    with open(f"/proc/{pid}/stat") as f:
+        return f.read().split(")")[-1].split()[0] != "Z"
+
+
+def started(tmp):
+    """Pids of the hanging planners launched so far."""
+    path = os.path.join(tmp, "planner.pids")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="check_pool_")
+    state = os.path.join(tmp, "state")
+    planner = os.path.join(tmp, "fast-downward.py")
+    with open(planner, "w") as f:
+        f.write(HANGING_FD)
+    os.chmod(planner, 0o755)
+    os.environ.update(FAKE_DOCKER_STATE=state, FAKE_DOCKER_FD=planner)
+    os.environ.pop("FAKE_DOCKER_MAX_STARTS", None)
+    fd.DOCKER = FAKE_DOCKER
+    fd.RESULTS_DIR = tmp
+    fd.SAS_CACHE_DIR = os.path.join(tmp, "sas_cache")
+    fd.TIMEOUT = 2
+    os.makedirs(fd.SAS_CACHE_DIR)
+
+    failures = []
+
+    def expect(ok, msg):
+        fd.log(f"{'OK   ' if ok else 'FALLO'}  {msg}")
+        if not ok:
+            failures.append(msg)
+
+    pool = fd.ContainerPool(1, docker=FAKE_DOCKER).start()
+    try:
+        first = pool._free.queue[0]["id"]
+        r = fd.run_single(*JOB, backend="pool", pool=pool)
+        expect(r["output"] == "TIMEOUT", f"el trabajo termina en TIMEOUT ({r['output']})")
+        expect(not os.path.exists(os.path.join(state, first)), "el contenedor del timeout se borra")
+        planners = started(tmp)
+        expect(planners and not any(alive(pid) for pid in planners), "el planificador del contenedor muere")
+        slots = list(pool._free.queue)
+        expect(len(slots) == 1 and slots[0] is not None and slots[0]["id"] != first,
+               "el pool arranca un contenedor nuevo en su lugar")
+
+        # Two starts so far (initial + replacement): every further start fails
+        os.environ["FAKE_DOCKER_MAX_STARTS"] = "2"
+        second = slots[0]["id"]
+        try:
+            r = fd.run_single(*JOB, backend="pool", pool=pool)
+            expect(r["output"] == "TIMEOUT", f"un fallo al reponer no rompe el trabajo ({r['output']})")
+        except Exception as e:
+            expect(False, f"un fallo al reponer no rompe el trabajo ({e!r})")
+        slots = list(pool._free.queue)
+        expect(all(slot is None or slot["id"] != second for slot in slots),
+               "el contenedor borrado no vuelve a la cola")
+        expect(pool.size == 0, f"el pool se reduce a {pool.size} contenedores")
+        try:
+            pool.acquire()
+            expect(False, "acquire() falla con el pool vacio")
+        except RuntimeError:
+            expect(True, "acquire() falla con el pool vacio")
+    finally:
+        pool.close()
+        shutil.rmtree(fd.gen_dir(), ignore_errors=True)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if failures:
+        fd.log(f"{len(failures)} comprobaciones fallidas")
+        return 1
+    fd.log("Pool: todas las comprobaciones correctas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Sustituto de la CLI de Docker para probar los backends docker y pool sin
+Docker (FD_DOCKER=tools/fake_docker.py).
+
+Implementa lo que usa run_fast_downward.py: `info`, `image inspect`,
+`run` (en primer plano o `-d`), `exec` y `rm -f`. Los "contenedores" son
+procesos locales: las rutas de los volumenes (-v host:contenedor) se
+traducen a rutas del host y el Fast Downward de la imagen se sustituye por
+FAKE_DOCKER_FD (por defecto FD_NATIVE o fast-downward.py en el PATH).
+`rm -f` mata los procesos lanzados en el contenedor.
+
+Variables:
+    FAKE_DOCKER_FD          planificador que sustituye al de la imagen
+    FAKE_DOCKER_STATE       directorio de estado (por defecto en /tmp)
+    FAKE_DOCKER_MAX_STARTS  `run -d` falla despues de este numero de
+                            arranques, para probar fallos al reponer el pool
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import uuid
+
+FD_IN_IMAGE = "/workspace/downward/fast-downward.py"
+FD = os.environ.get("FAKE_DOCKER_FD", os.environ.get("FD_NATIVE", "fast-downward.py"))
+STATE = os.environ.get("FAKE_DOCKER_STATE", os.path.join(tempfile.gettempdir(), "fake_docker"))
+MAX_STARTS = os.environ.get("FAKE_DOCKER_MAX_STARTS")
+OPTIONS = ("--name", "-w", "--entrypoint", "--cpuset-cpus", "--memory", "--format")
+
+
+def parse(args):
+    """(options, volumes, rest) of `run`/`exec` arguments."""
+    opts, volumes, i = {}, [], 0
+    while i < len(args) and args[i].startswith("-"):
+        arg = args[i]
+        if arg == "-v":
+            host, container = args[i + 1].split(":")[:2]
+            volumes.append((host, container))
+            i += 2
+        elif arg in OPTIONS:
+            opts[arg] = args[i + 1]
+            i += 2
+        else:
+            opts[arg.split("=")[0]] = arg.split("=", 1)[-1]
+            i += 1
+    return opts, volumes, args[i:]
+
+
+def host_path(arg, volumes):
+    """Translate container paths (also inside a JSON batch spec) to host paths."""
+    if arg == FD_IN_IMAGE:
+        return FD
+    if arg.startswith("[{"):
+        spec = json.loads(arg)
+        for job in spec:
+            job["args"] = [host_path(a, volumes) for a in job["args"]]
+        return json.dumps(spec)
+    for host, container in volumes:
+        if arg == container or arg.startswith(container + "/"):
+            return host + arg[len(container):]
+    return arg
+
+
+def command(entrypoint, rest, volumes):
+    cmd = ([entrypoint] if entrypoint else []) + [host_path(a, volumes) for a in rest]
+    if cmd[0] in ("python", "python3"):
+        cmd[0] = sys.executable
+    elif cmd[0] == FD and FD.endswith(".py"):
+        cmd.insert(0, sys.executable)
+    return cmd
+
+
+def execute(container, cmd, cwd):
+    """Run `cmd` as a process of `container`.
+
+    Like in Docker, it runs in its own session and its output is relayed by
+    this CLI: killing the CLI closes the caller's pipes but does not stop the
+    process, only `rm -f` of the container does.
+    """
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+    with open(os.path.join(STATE, f"{container}.pids"), "a") as f:
+        f.write(f"{proc.pid}\n")
+    relays = [threading.Thread(target=relay, args=(src, dst), daemon=True)
+              for src, dst in ((proc.stdout, sys.stdout), (proc.stderr, sys.stderr))]
+    for t in relays:
+        t.start()
+    returncode = proc.wait()
+    for t in relays:
+        t.join()
+    return returncode
+
+
+def relay(src, dst):
+    for chunk in iter(lambda: os.read(src.fileno(), 65536), b""):
+        os.write(dst.fileno(), chunk)
+
+
+def run(args):
+    opts, volumes, rest = parse(args)
+    image, rest = rest[0], rest[1:]
+    container = opts.get("--name") or uuid.uuid4().hex
+    if "-d" in opts:
+        starts = os.path.join(STATE, "starts")
+        with open(starts, "a") as f:
+            f.write(container + "\n")
+        with open(starts) as f:
+            if MAX_STARTS is not None and len(f.readlines()) > int(MAX_STARTS):
+                print("fake_docker: no se pueden arrancar mas contenedores", file=sys.stderr)
+                return 125
+        with open(os.path.join(STATE, container), "w") as f:
+            json.dump(volumes, f)
+        print(container)
+        return 0
+    cwd = host_path(opts["-w"], volumes) if "-w" in opts else tempfile.mkdtemp(prefix="fake_docker_")
+    rest = rest if "--entrypoint" in opts else [FD_IN_IMAGE] + rest
+    return execute(container, command(opts.get("--entrypoint"), rest, volumes), cwd)
+
+
+def exec_(args):
+    opts, _, rest = parse(args)
+    container, rest = rest[0], rest[1:]
+    try:
+        with open(os.path.join(STATE, container)) as f:
+            volumes = json.load(f)
+    except FileNotFoundError:
+        print(f"fake_docker: no existe el contenedor {container}", file=sys.stderr)
+        return 1
+    cwd = host_path(opts["-w"], volumes) if "-w" in opts else None
+    return execute(container, command(None, rest, volumes), cwd)
+
+
+def rm(args):
+    for container in (a for a in args if not a.startswith("-")):
+        pids = os.path.join(STATE, f"{container}.pids")
+        if os.path.exists(pids):
+            with open(pids) as f:
+                for pid in f.read().split():
+                    try:
+                        os.killpg(int(pid), signal.SIGKILL)
+                    except (ProcessLookupError, PermissionError):
+                        pass
+            os.remove(pids)
+        if os.path.exists(os.path.join(STATE, container)):
+            os.remove(os.path.join(STATE, container))
+        print(container)
+    return 0
+
+
+def main(argv):
+    os.makedirs(STATE, exist_ok=True)
+    if not argv:
+        return 1
+    cmd, args = argv[0], argv[1:]
+    if cmd == "info":
+        print("fake_docker")
+        return 0
+    if cmd == "image":
+        print("sha256:fake")
+        return 0
+    handlers = {"run": run, "exec": exec_, "rm": rm}
+    if cmd not in handlers:
+        print(f"fake_docker: orden no soportada: {cmd}", file=sys.stderr)
+        return 1
+    return handlers[cmd](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))